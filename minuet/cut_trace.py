@@ -1,15 +1,59 @@
 import re
 import os
+import sys
 from collections import defaultdict
 
+import trace_index
+
+# Abertura de traces comprimidos (gzip/zstd/xz/bzip2) compartilhada com os scripts de log
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utils', 'log'))
+from log_open import is_compressed, open_log
+
 # --- CONFIGURAÇÕES ---
 START_TIME = 72000.0
 END_TIME = 72900.0
 ACTIVITY_INPUT_FILE = 'TraceActivity.tcl'
 MOBILITY_INPUT_FILE = 'TraceMobility.tcl'
 OUTPUT_SUFFIX = '_cut'
+# Modo em lote: lista de janelas (início, fim, sufixo) recortadas com uma única leitura de cada arquivo.
+# Se vazia, usa a janela única START_TIME/END_TIME/OUTPUT_SUFFIX.
+# ex: WINDOWS = [(72000.0, 72900.0, '_cut_v150'), (73000.0, 73900.0, '_cut_v300')]
+WINDOWS = []
+# Usa o índice binário '<trace>.idx' (ver trace_index.py), quando existir e estiver atualizado,
+# para ler direto as linhas dos nós selecionados em vez de varrer o arquivo inteiro.
+USE_TRACE_INDEX = True
+# Constrói o índice quando ele não existir (uma varredura completa; os recortes seguintes ficam baratos)
+BUILD_TRACE_INDEX = False
+# Acima desta fração das linhas indexadas, a leitura sequencial em blocos é mais rápida que os saltos
+INDEX_MAX_FRACTION = 0.5
 # --- FIM DAS CONFIGURAÇÕES ---
 
+# Regex para extrair tempo, ID e tipo de evento (start/stop)
+ACTIVITY_REGEX = re.compile(r'^\$ns_ at (\d+\.?\d*).*?\$g\((\d+)\) (start|stop)')
+
+def parse_node_lifetimes(lines):
+    """
+    Lê as linhas de TraceActivity e retorna os tempos de start e stop de cada nó.
+    ex: {1248: {'start': 71374.0, 'stop': 71926.0}}
+    """
+    node_events = defaultdict(dict)
+    for line in lines:
+        match = ACTIVITY_REGEX.search(line)
+        if match:
+            time, node_id_str, event_type = match.groups()
+            node_id = int(node_id_str)
+            node_events[node_id][event_type] = float(time)
+    return node_events
+
+def select_contained_nodes(node_events, start_t, end_t):
+    """Filtra os nós cujo 'start' E 'stop' ocorrem dentro da janela [start_t, end_t]."""
+    contained_ids = set()
+    for node_id, events in node_events.items():
+        if 'start' in events and 'stop' in events:
+            if start_t <= events['start'] <= end_t and start_t <= events['stop'] <= end_t:
+                contained_ids.add(node_id)
+    return contained_ids
+
 def find_fully_contained_nodes(activity_file, start_t, end_t):
     """
     Encontra IDs de nós cujo 'start' E 'stop' ocorrem dentro da janela de tempo.
@@ -20,85 +64,266 @@ def find_fully_contained_nodes(activity_file, start_t, end_t):
         print(f"ERRO: Arquivo de atividade '{activity_file}' não encontrado. Abortando.")
         return None
 
-    # Dicionário para armazenar os tempos de start e stop de cada nó
-    # ex: {1248: {'start': 71374.0, 'stop': 71926.0}}
-    node_events = defaultdict(dict)
-    
-    # Regex para extrair tempo, ID e tipo de evento (start/stop)
-    activity_regex = re.compile(r'^\$ns_ at (\d+\.?\d*).*?\$g\((\d+)\) (start|stop)')
-
-    with open(activity_file, 'r') as f:
-        for line in f:
-            match = activity_regex.search(line)
-            if match:
-                time, node_id_str, event_type = match.groups()
-                node_id = int(node_id_str)
-                node_events[node_id][event_type] = float(time)
+    with open_log(activity_file) as f:
+        node_events = parse_node_lifetimes(f)
 
     # Agora, filtre os nós que atendem à condição
-    contained_ids = set()
-    for node_id, events in node_events.items():
-        if 'start' in events and 'stop' in events:
-            if start_t <= events['start'] <= end_t and start_t <= events['stop'] <= end_t:
-                contained_ids.add(node_id)
+    contained_ids = select_contained_nodes(node_events, start_t, end_t)
     
     print(f"Concluído. {len(contained_ids)} nós encontrados com ciclo de vida completo na janela de tempo.")
     return contained_ids
 
+READ_BLOCK_SIZE = 1 << 23   # 8 MiB por leitura
+WRITE_BUFFER_SIZE = 1 << 23
+
+# Um único tokenizador por linha: IDs ($g(ID) / $node_(ID)) e o tempo de '$ns_ at T'
+LINE_TOKEN_REGEX = re.compile(r'\$(?:g|node_)\((\d+)\)|\$ns_ at (\d+\.?\d*)')
+
+def _digit_trie_pattern(ids):
+    """Alternância em forma de trie (um caractere por nível) para os IDs informados."""
+    trie = {}
+    for id_str in {str(i) for i in ids}:
+        node = trie
+        for ch in id_str:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def build(node):
+        alternatives = []
+        terminal = False
+        for ch, child in sorted(node.items()):
+            if ch == '':
+                terminal = True
+            else:
+                alternatives.append(ch + build(child))
+        if not alternatives:
+            return ''
+        body = alternatives[0] if len(alternatives) == 1 else '(?:' + '|'.join(alternatives) + ')'
+        return f'(?:{body})?' if terminal else body
+
+    return build(trie)
+
+def build_valid_id_regex(valid_ids):
+    """
+    Regex que só casa referências $g(ID)/$node_(ID) a IDs válidos (zeros à esquerda
+    aceitos, como em int()). Permite pular direto para as linhas relevantes de um bloco.
+    """
+    if not valid_ids:
+        return re.compile(r'(?!)')
+    return re.compile(r'\$(?:g|node_)\(0*' + _digit_trie_pattern(valid_ids) + r'\)')
+
+def iter_text_blocks(f, block_size=READ_BLOCK_SIZE):
+    """Lê o arquivo em blocos grandes, sempre terminados em fim de linha."""
+    while True:
+        block = f.read(block_size)
+        if not block:
+            return
+        yield block + f.readline()
+
+def iter_candidate_lines_in_blocks(blocks, valid_id_regex):
+    """Gera, na ordem dos blocos, cada linha que referencia ao menos um ID válido."""
+    search = valid_id_regex.search
+    for block in blocks:
+        match = search(block)
+        while match:
+            line_start = block.rfind('\n', 0, match.start()) + 1
+            line_end = block.find('\n', match.end())
+            line_end = len(block) if line_end < 0 else line_end + 1
+            yield block[line_start:line_end]
+            match = search(block, line_end)
+
+def iter_candidate_lines(input_path, valid_id_regex):
+    """Gera, na ordem do arquivo, cada linha que referencia ao menos um ID válido."""
+    with open_log(input_path) as f_in:
+        yield from iter_candidate_lines_in_blocks(iter_text_blocks(f_in), valid_id_regex)
+
+def load_trace_index(input_path):
+    """Retorna o índice binário do trace conforme USE_TRACE_INDEX/BUILD_TRACE_INDEX, ou None."""
+    if not USE_TRACE_INDEX:
+        return None
+    if is_compressed(input_path):
+        # Os offsets do índice valem para o texto descomprimido; o trace comprimido é lido em sequência
+        return None
+    return trace_index.get_index(input_path, build_if_missing=BUILD_TRACE_INDEX)
+
+def indexed_candidate_lines(index, node_ids):
+    """
+    Linhas dos nós lidas direto pelos offsets do índice, ou None quando não há índice
+    ou a seleção cobre boa parte do arquivo (aí a varredura em blocos é mais rápida).
+    """
+    if index is None:
+        return None
+    offsets = index.offsets_for_nodes(node_ids)
+    if len(offsets) > INDEX_MAX_FRACTION * len(index.offsets):
+        return None
+    print(f"Usando índice binário '{trace_index.index_path_for(index.trace_path)}' ({len(offsets)} linhas).")
+    return index.read_lines(offsets)
+
+def make_line_rewriter(id_map, start_t):
+    """
+    Retorna uma função que reescreve uma linha em uma única passada do tokenizador:
+    remapeia todos os IDs e normaliza o primeiro '$ns_ at T' (T - start_t, 4 casas decimais).
+    As substituições de cada token distinto ('$node_(12)', '$ns_ at 72001.0') são memorizadas.
+    """
+    replacements = {}
+    time_seen = [False]
+
+    def replace_token(match_obj):
+        token = match_obj.group(0)
+        if match_obj.lastindex == 2:
+            # Apenas o primeiro tempo da linha é normalizado
+            if time_seen[0]:
+                return token
+            time_seen[0] = True
+        new_token = replacements.get(token)
+        if new_token is None:
+            if match_obj.lastindex == 1:
+                old_id = int(match_obj.group(1))
+                prefix = token[:match_obj.start(1) - match_obj.start()]
+                new_token = f"{prefix}{id_map.get(old_id, old_id)})"
+            else:
+                new_token = '$ns_ at {:.4f}'.format(float(match_obj.group(2)) - start_t)
+            replacements[token] = new_token
+        return new_token
+
+    substitute = LINE_TOKEN_REGEX.sub
+
+    def rewrite_line(line):
+        time_seen[0] = False
+        return substitute(replace_token, line)
+
+    return rewrite_line
+
 def process_and_filter_file(input_path, output_path, valid_ids, id_map, start_t):
     """
     Filtra as linhas para manter apenas nós válidos, remapeia seus IDs e normaliza o tempo.
+    O arquivo é lido em blocos; só as linhas que citam um ID válido são tokenizadas (uma vez)
+    e reescritas, e a saída usa um buffer grande.
     """
     print(f"\n--- PASSO 3: Processando '{input_path}' -> '{output_path}' ---")
     if not os.path.exists(input_path):
         print(f"AVISO: Arquivo de entrada '{input_path}' não encontrado. Pulando.")
         return
 
-    # Regex para encontrar qualquer ID no formato $g(ID) ou $node_(ID)
-    id_regex = re.compile(r'(\$(?:g|node_)\()(\d+)(\))')
-    # Regex para encontrar o ID de um nó em qualquer linha
-    node_id_finder_regex = re.compile(r'\$(?:g|node_)\((\d+)\)')
-
-    def remap_id_in_line(match_obj):
-        """Função auxiliar para re.sub que substitui um ID antigo por um novo."""
-        prefix, old_id_str, suffix = match_obj.groups()
-        old_id = int(old_id_str)
-        # O ID deve estar no mapa, pois já filtramos
-        new_id = id_map.get(old_id, old_id) 
-        return f"{prefix}{new_id}{suffix}"
+    rewrite_line = make_line_rewriter(id_map, start_t)
+    candidate_lines = indexed_candidate_lines(load_trace_index(input_path), valid_ids)
+    if candidate_lines is None:
+        candidate_lines = iter_candidate_lines(input_path, build_valid_id_regex(valid_ids))
 
     lines_written = 0
-    with open(input_path, 'r') as f_in, open(output_path, 'w') as f_out:
-        for line in f_in:
-            # 1. Verificar se a linha pertence a um nó válido
-            found_ids_str = node_id_finder_regex.findall(line)
-            if not found_ids_str:
-                continue # Linha sem ID de nó, pular
-
-            # Converte para int e verifica se algum dos IDs encontrados é um nó que queremos manter
-            found_ids = {int(i) for i in found_ids_str}
-            if not found_ids.intersection(valid_ids):
-                continue # Nenhum dos nós nesta linha é válido, pular
-
-            # 2. Se a linha é válida, remapeie todos os IDs nela
-            processed_line = re.sub(id_regex, remap_id_in_line, line)
-
-            # 3. Verifique se a linha tem um timestamp para normalizar
-            time_match = re.search(r'(\$ns_ at )(\d+\.?\d*)', processed_line)
-            if time_match:
-                prefix = time_match.group(1)
-                current_time = float(time_match.group(2))
-                new_time = current_time - start_t
-                # Substitui o tempo antigo pelo novo tempo normalizado
-                processed_line = re.sub(r'(\$ns_ at )(\d+\.?\d*)', r'{}{:.4f}'.format(prefix, new_time), processed_line, 1)
-
-            f_out.write(processed_line)
+    with open(output_path, 'w', buffering=WRITE_BUFFER_SIZE) as f_out:
+        for line in candidate_lines:
+            f_out.write(rewrite_line(line))
             lines_written += 1
             
     print(f"Concluído. {lines_written} linhas relevantes escritas.")
 
+# --- MODO EM LOTE (várias janelas por leitura) ---
+# Regex para encontrar o ID de um nó em qualquer linha
+ID_FINDER_REGEX = re.compile(r'\$(?:g|node_)\((\d+)\)')
+
+# Extensões de arquivos comprimidos: o recorte é sempre gravado como texto
+COMPRESSED_EXTENSIONS = ('.gz', '.zst', '.xz', '.bz2')
+
+def output_name(input_file, suffix):
+    for extension in COMPRESSED_EXTENSIONS:
+        if input_file.endswith(extension):
+            input_file = input_file[:-len(extension)]
+            break
+    return input_file.replace('.tcl', f'{suffix}.tcl')
+
+def route_lines_to_windows(blocks, jobs, output_key, index=None):
+    """
+    Percorre os blocos uma única vez e envia cada linha relevante a todas as janelas
+    que contêm algum dos nós citados nela, já remapeada e normalizada para cada janela.
+    Com um índice (trace_index.TraceIndex), lê apenas as linhas dos nós das janelas.
+    Retorna o número de linhas escritas por janela.
+    """
+    owners = defaultdict(list)  # node_id -> índices das janelas que o contêm
+    for idx, job in enumerate(jobs):
+        for node_id in job['valid_ids']:
+            owners[node_id].append(idx)
+    candidate_lines = indexed_candidate_lines(index, owners)
+    if candidate_lines is None:
+        candidate_lines = iter_candidate_lines_in_blocks(blocks, build_valid_id_regex(owners.keys()))
+
+    lines_written = [0] * len(jobs)
+    outputs = [open(job[output_key], 'w', buffering=WRITE_BUFFER_SIZE) for job in jobs]
+    try:
+        for line in candidate_lines:
+            targets = set()
+            for id_str in ID_FINDER_REGEX.findall(line):
+                targets.update(owners.get(int(id_str), ()))
+            for idx in sorted(targets):
+                outputs[idx].write(jobs[idx]['rewrite'](line))
+                lines_written[idx] += 1
+    finally:
+        for f_out in outputs:
+            f_out.close()
+    return lines_written
+
+def cut_windows(activity_file, mobility_file, windows):
+    """
+    Recorta várias janelas [(start_t, end_t, sufixo), ...] lendo cada arquivo de entrada uma única vez.
+    Cada janela tem seu próprio conjunto de nós contidos e seu próprio mapa de IDs.
+    Retorna a lista de janelas processadas (dicionários com IDs, mapa e arquivos de saída).
+    """
+    print(f"--- PASSO 1: Lendo '{activity_file}' para {len(windows)} janelas ---")
+    if not os.path.exists(activity_file):
+        print(f"ERRO: Arquivo de atividade '{activity_file}' não encontrado. Abortando.")
+        return []
+
+    # O arquivo de atividade é pequeno: é lido uma vez e reaproveitado da memória
+    with open_log(activity_file) as f:
+        activity_text = f.read()
+    node_events = parse_node_lifetimes(activity_text.splitlines())
+
+    print("\n--- PASSO 2: Selecionando nós e mapeando IDs por janela ---")
+    jobs = []
+    for start_t, end_t, suffix in windows:
+        valid_ids = select_contained_nodes(node_events, start_t, end_t)
+        if not valid_ids:
+            print(f"[{start_t}s, {end_t}s] '{suffix}': nenhum nó com ciclo de vida completo. Janela ignorada.")
+            continue
+        id_map = {old_id: new_id for new_id, old_id in enumerate(sorted(valid_ids))}
+        jobs.append({
+            'start_t': start_t, 'end_t': end_t, 'suffix': suffix,
+            'valid_ids': valid_ids, 'id_map': id_map,
+            'rewrite': make_line_rewriter(id_map, start_t),
+            'activity_output': output_name(activity_file, suffix),
+            'mobility_output': output_name(mobility_file, suffix),
+        })
+        print(f"[{start_t}s, {end_t}s] '{suffix}': {len(valid_ids)} nós (0 a {len(valid_ids)-1})")
+
+    if not jobs:
+        return []
+
+    print(f"\n--- PASSO 3: Processando '{activity_file}' e '{mobility_file}' ---")
+    activity_counts = route_lines_to_windows([activity_text], jobs, 'activity_output')
+    if os.path.exists(mobility_file):
+        with open_log(mobility_file) as f_in:
+            mobility_counts = route_lines_to_windows(iter_text_blocks(f_in), jobs, 'mobility_output',
+                                                     load_trace_index(mobility_file))
+    else:
+        print(f"AVISO: Arquivo de entrada '{mobility_file}' não encontrado. Pulando.")
+        mobility_counts = [0] * len(jobs)
+
+    for job, n_activity, n_mobility in zip(jobs, activity_counts, mobility_counts):
+        print(f"Concluído '{job['suffix']}': {n_activity} linhas de atividade, {n_mobility} linhas de mobilidade.")
+    return jobs
+
 # --- BLOCO PRINCIPAL ---
-if __name__ == "__main__":
+if __name__ == "__main__" and WINDOWS:
+    processed = cut_windows(ACTIVITY_INPUT_FILE, MOBILITY_INPUT_FILE, WINDOWS)
+    if processed:
+        print(f"\n\nSucesso! Novos arquivos criados:")
+        for job in processed:
+            print(f"- {job['activity_output']}")
+            print(f"- {job['mobility_output']}  ({len(job['valid_ids'])} nós)")
+    else:
+        print("\nNenhuma janela com nós de ciclo de vida completo foi encontrada.")
+
+elif __name__ == "__main__":
     # PASSO 1: Encontrar os nós cujo ciclo de vida COMPLETO está na janela
     valid_node_ids = find_fully_contained_nodes(ACTIVITY_INPUT_FILE, START_TIME, END_TIME)
     
@@ -109,8 +334,8 @@ if __name__ == "__main__":
         print(f"\n--- PASSO 2: Mapeando {len(valid_node_ids)} IDs antigos para novos IDs (0 a {len(valid_node_ids)-1}) ---")
 
         # Define os nomes dos arquivos de saída
-        activity_output = ACTIVITY_INPUT_FILE.replace('.tcl', f'{OUTPUT_SUFFIX}.tcl')
-        mobility_output = MOBILITY_INPUT_FILE.replace('.tcl', f'{OUTPUT_SUFFIX}.tcl')
+        activity_output = output_name(ACTIVITY_INPUT_FILE, OUTPUT_SUFFIX)
+        mobility_output = output_name(MOBILITY_INPUT_FILE, OUTPUT_SUFFIX)
         
         # PASSO 3: Processar ambos os arquivos com base nos IDs válidos e no mapa
         process_and_filter_file(ACTIVITY_INPUT_FILE, activity_output, valid_node_ids, id_map, START_TIME)
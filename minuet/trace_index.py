@@ -0,0 +1,233 @@
+"""
+trace_index.py
+Índice binário (arquivo auxiliar '<trace>.idx') para traces TCL do ns-2/SUMO
+(TraceMobility.tcl, TraceActivity.tcl).
+
+Para cada nó o índice guarda os offsets (em bytes) de todas as linhas que o
+citam ($node_(ID) / $g(ID)) e o intervalo de tempo dos seus '$ns_ at T'. Há
+ainda uma tabela grossa de baldes de tempo -> faixa de offsets. Com isso é
+possível ir direto às linhas de um conjunto de nós ou de uma janela de tempo,
+com custo proporcional ao tamanho da saída e não ao tamanho do trace.
+
+Formato (little-endian):
+    cabeçalho  : magic(8s) versão(u32) tamanho_fonte(u64) mtime_ns_fonte(i64)
+                 n_nós(u32) n_baldes(u32) largura_balde(f64) t0(f64) n_offsets(u64)
+    nós        : n_nós x [id(u32) n_linhas(u32) primeiro_offset(u64) t_min(f64) t_max(f64)]
+    baldes     : n_baldes x [offset_inicial(u64) offset_final(u64)]   (0, 0 = vazio)
+    offsets    : n_offsets x u64, agrupados por nó e ordenados
+
+Uso: python3 trace_index.py TraceMobility.tcl [TraceActivity.tcl ...]
+"""
+
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+
+INDEX_SUFFIX = '.idx'
+INDEX_MAGIC = b'TCLIDX\x00\x01'
+INDEX_VERSION = 1
+DEFAULT_BUCKET_WIDTH = 60.0
+
+HEADER_FORMAT = '<8sIQqIIddQ'
+NODE_FORMAT = '<IIQdd'
+BUCKET_FORMAT = '<QQ'
+
+NODE_ID_REGEX = re.compile(rb'\$(?:g|node_)\((\d+)\)')
+TIME_REGEX = re.compile(rb'\$ns_ at (\d+\.?\d*)')
+
+
+def index_path_for(trace_path):
+    return trace_path + INDEX_SUFFIX
+
+
+class TraceIndex:
+    """Índice carregado em memória de um trace TCL (ver build_index / load_index)."""
+
+    def __init__(self, trace_path, nodes, buckets, offsets, bucket_width, t0):
+        self.trace_path = trace_path
+        self.nodes = nodes              # {node_id: (n_linhas, primeiro_offset, t_min, t_max)}
+        self.buckets = buckets          # [(offset_inicial, offset_final), ...]
+        self.offsets = offsets          # array('Q')
+        self.bucket_width = bucket_width
+        self.t0 = t0
+
+    def node_ids(self):
+        return sorted(self.nodes)
+
+    def node_time_range(self, node_id):
+        """(t_min, t_max) dos '$ns_ at' do nó, ou None se o nó não tiver linhas com tempo."""
+        _, _, t_min, t_max = self.nodes[node_id]
+        return None if math.isnan(t_min) else (t_min, t_max)
+
+    def node_offsets(self, node_id):
+        n_lines, first, _, _ = self.nodes.get(node_id, (0, 0, 0.0, 0.0))
+        return self.offsets[first:first + n_lines]
+
+    def offsets_for_nodes(self, node_ids):
+        """Offsets (ordem do arquivo, sem repetição) das linhas que citam algum dos nós."""
+        selected = set()
+        for node_id in node_ids:
+            selected.update(self.node_offsets(node_id))
+        return sorted(selected)
+
+    def byte_range_for_time(self, start_t, end_t):
+        """Faixa [início, fim) de bytes que contém todas as linhas com tempo em [start_t, end_t]."""
+        if not self.buckets or end_t < start_t:
+            return (0, 0)
+        first = max(0, int((start_t - self.t0) // self.bucket_width))
+        last = min(len(self.buckets) - 1, int((end_t - self.t0) // self.bucket_width))
+        ranges = [self.buckets[b] for b in range(first, last + 1) if self.buckets[b][1] > 0]
+        if not ranges:
+            return (0, 0)
+        return (min(r[0] for r in ranges), max(r[1] for r in ranges))
+
+    def read_lines(self, offsets):
+        """Gera o texto das linhas que começam nos offsets informados (na ordem dada)."""
+        with open(self.trace_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                size = len(mm)
+                for offset in offsets:
+                    end = mm.find(b'\n', offset)
+                    end = size if end < 0 else end + 1
+                    yield _decode_line(mm[offset:end])
+
+    def iter_lines_in_time(self, start_t, end_t):
+        """Gera as linhas da faixa de bytes da janela de tempo (pode incluir linhas vizinhas sem tempo)."""
+        begin, end = self.byte_range_for_time(start_t, end_t)
+        if end <= begin:
+            return
+        with open(self.trace_path, 'rb') as f:
+            f.seek(begin)
+            while f.tell() < end:
+                line = f.readline()
+                if not line:
+                    return
+                yield _decode_line(line)
+
+
+def _decode_line(raw):
+    # Mesmo resultado da leitura em modo texto (newlines universais)
+    line = raw.decode('utf-8')
+    if line.endswith('\r\n'):
+        line = line[:-2] + '\n'
+    return line
+
+
+def build_index(trace_path, bucket_width=DEFAULT_BUCKET_WIDTH):
+    """Percorre o trace uma vez, grava '<trace>.idx' e retorna o TraceIndex."""
+    stat = os.stat(trace_path)
+    node_lines = {}    # node_id -> array('Q') de offsets
+    node_times = {}    # node_id -> [t_min, t_max]
+    timed_lines = []   # (tempo, offset, fim) das linhas com '$ns_ at'
+
+    find_ids = NODE_ID_REGEX.findall
+    search_time = TIME_REGEX.search
+    offset = 0
+    with open(trace_path, 'rb') as f:
+        for line in f:
+            ids = find_ids(line)
+            if ids:
+                time_match = search_time(line)
+                t = float(time_match.group(1)) if time_match else None
+                for node_id in {int(i) for i in ids}:
+                    offsets = node_lines.get(node_id)
+                    if offsets is None:
+                        offsets = node_lines[node_id] = array('Q')
+                    offsets.append(offset)
+                    if t is not None:
+                        times = node_times.setdefault(node_id, [t, t])
+                        if t < times[0]:
+                            times[0] = t
+                        if t > times[1]:
+                            times[1] = t
+                if t is not None:
+                    timed_lines.append((t, offset, offset + len(line)))
+            offset += len(line)
+
+    t0 = min((t for t, _, _ in timed_lines), default=0.0)
+    t_end = max((t for t, _, _ in timed_lines), default=0.0)
+    n_buckets = int((t_end - t0) // bucket_width) + 1 if timed_lines else 0
+    buckets = [[0, 0] for _ in range(n_buckets)]
+    for t, start, end in timed_lines:
+        bucket = buckets[int((t - t0) // bucket_width)]
+        if bucket[1] == 0:
+            bucket[0], bucket[1] = start, end
+        else:
+            bucket[0] = min(bucket[0], start)
+            bucket[1] = max(bucket[1], end)
+
+    nodes = {}
+    all_offsets = array('Q')
+    for node_id in sorted(node_lines):
+        t_min, t_max = node_times.get(node_id, (math.nan, math.nan))
+        nodes[node_id] = (len(node_lines[node_id]), len(all_offsets), t_min, t_max)
+        all_offsets.extend(node_lines[node_id])
+
+    index_path = index_path_for(trace_path)
+    tmp_path = index_path + '.tmp'
+    with open(tmp_path, 'wb') as out:
+        out.write(struct.pack(HEADER_FORMAT, INDEX_MAGIC, INDEX_VERSION, stat.st_size, stat.st_mtime_ns,
+                              len(nodes), n_buckets, bucket_width, t0, len(all_offsets)))
+        for node_id, (n_lines, first, t_min, t_max) in nodes.items():
+            out.write(struct.pack(NODE_FORMAT, node_id, n_lines, first, t_min, t_max))
+        for start, end in buckets:
+            out.write(struct.pack(BUCKET_FORMAT, start, end))
+        all_offsets.tofile(out)
+    os.replace(tmp_path, index_path)
+
+    return TraceIndex(trace_path, nodes, [tuple(b) for b in buckets], all_offsets, bucket_width, t0)
+
+
+def load_index(trace_path):
+    """Carrega '<trace>.idx'. Retorna None se não existir ou se o trace mudou desde a indexação."""
+    index_path = index_path_for(trace_path)
+    if not os.path.exists(index_path) or not os.path.exists(trace_path):
+        return None
+    stat = os.stat(trace_path)
+    with open(index_path, 'rb') as f:
+        header = f.read(struct.calcsize(HEADER_FORMAT))
+        if len(header) != struct.calcsize(HEADER_FORMAT):
+            return None
+        (magic, version, source_size, source_mtime, n_nodes, n_buckets,
+         bucket_width, t0, n_offsets) = struct.unpack(HEADER_FORMAT, header)
+        if (magic != INDEX_MAGIC or version != INDEX_VERSION
+                or source_size != stat.st_size or source_mtime != stat.st_mtime_ns):
+            return None
+
+        nodes = {}
+        for node_id, n_lines, first, t_min, t_max in struct.iter_unpack(
+                NODE_FORMAT, f.read(n_nodes * struct.calcsize(NODE_FORMAT))):
+            nodes[node_id] = (n_lines, first, t_min, t_max)
+        buckets = list(struct.iter_unpack(BUCKET_FORMAT, f.read(n_buckets * struct.calcsize(BUCKET_FORMAT))))
+        offsets = array('Q')
+        offsets.fromfile(f, n_offsets)
+        if sys.byteorder != 'little':
+            offsets.byteswap()
+
+    return TraceIndex(trace_path, nodes, buckets, offsets, bucket_width, t0)
+
+
+def get_index(trace_path, build_if_missing=False, bucket_width=DEFAULT_BUCKET_WIDTH):
+    """Retorna o índice válido do trace, construindo-o se pedido; senão None."""
+    index = load_index(trace_path)
+    if index is None and build_if_missing and os.path.exists(trace_path):
+        print(f"Construindo índice binário para '{trace_path}'...")
+        index = build_index(trace_path, bucket_width)
+    return index
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python3 trace_index.py TraceMobility.tcl [TraceActivity.tcl ...]")
+        sys.exit(1)
+    for path in sys.argv[1:]:
+        index = build_index(path)
+        print(f"{index_path_for(path)}: {len(index.nodes)} nós, {len(index.offsets)} referências, "
+              f"{len(index.buckets)} baldes de {index.bucket_width:.0f}s, "
+              f"{os.path.getsize(index_path_for(path)) / 1e6:.1f} MB")
@@ -0,0 +1,547 @@
+"""
+benchmark_analise.py
+Mede cada etapa de parsing/agregação dos scripts de análise sobre uma raiz de logs
+(real ou gerada por gerar_logs_sinteticos.py) e compara com uma linha de base em JSON.
+
+Cada etapa roda em um processo Python novo (o pico de memória de uma etapa não contamina
+as seguintes) e com o diretório de trabalho na raiz dos logs, como os scripts. Os arquivos
+auxiliares que a etapa poderia reaproveitar (cache .npz, '.store', '.idx', '.tail.pkl',
+'.npy') são apagados antes das etapas "frias" e criados antes das etapas "quentes",
+fora do tempo medido. Para cada etapa são registrados: tempo de parede, linhas/s e MB/s
+dos arquivos de entrada e pico de memória residente (total e acima do processo já com os
+módulos importados).
+
+Uso:
+    python3 benchmark_analise.py <raiz> [--generate --lines 1000000] [--stages cluster score]
+                                 [--repeat 3] [--save baseline.json] [--baseline baseline.json]
+Com --baseline, etapas com vazão ou pico de memória piores que a tolerância são
+reportadas como regressão e o código de saída é 1.
+
+As implementações anteriores substituídas por versões otimizadas ficam aqui, como
+referência: são medidas como etapas próprias ('*_legado') e --check-references confere
+que as versões atuais produzem exatamente a mesma saída sobre a raiz dada.
+"""
+
+import argparse
+import contextlib
+import datetime
+import filecmp
+import json
+import os
+import platform
+import re
+import resource
+import shutil
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+MINUET_DIR = os.path.dirname(os.path.dirname(BENCH_DIR))
+for path in (BENCH_DIR, os.path.join(MINUET_DIR, 'utils', 'log'), os.path.join(MINUET_DIR, 'utils', 'trace'),
+             MINUET_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from log_open import open_log
+
+BASELINE_VERSION = 1
+# Piora relativa (vazão menor ou pico de memória maior) tolerada antes de acusar regressão
+REGRESSION_TOLERANCE = 0.15
+# Diferenças de memória abaixo disto são ruído do alocador e não contam como regressão
+RSS_NOISE_MB = 16.0
+
+BASE_STATION_ID = 300
+EVENT_ID = 0
+METHOD = "AHP"
+CLUSTER_LOG = os.path.join("RTT", "V150", "RTTV0", "logFileClusteringAlgorithm.log")
+TRACE_WINDOW = (0.0, 300.0)
+VEHICLE_IDS = [46, 92, 86, 103, 134, 96, 111, 67, 112, 130]
+
+
+def _bs_log():
+    return os.path.join(METHOD, "logFileBaseStation.log")
+
+
+def _detection_log():
+    return os.path.join(METHOD, "logFileDetectionLayer.log")
+
+
+def _score_csv():
+    return f"score_history_{METHOD}.csv"
+
+
+def _remove(*paths):
+    for path in paths:
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+
+# ---------------- IMPLEMENTAÇÕES DE REFERÊNCIA ----------------
+def process_and_filter_file_legacy(input_path, output_path, valid_ids, id_map, start_t):
+    """
+    Reescritor anterior de cut_trace.py (até cinco regex por linha), referência para a
+    etapa cut_trace_legado e para conferir a saída de cut_trace.process_and_filter_file.
+    """
+    print(f"\n--- PASSO 3: Processando '{input_path}' -> '{output_path}' ---")
+    if not os.path.exists(input_path):
+        print(f"AVISO: Arquivo de entrada '{input_path}' não encontrado. Pulando.")
+        return
+
+    # Regex para encontrar qualquer ID no formato $g(ID) ou $node_(ID)
+    id_regex = re.compile(r'(\$(?:g|node_)\()(\d+)(\))')
+    # Regex para encontrar o ID de um nó em qualquer linha
+    node_id_finder_regex = re.compile(r'\$(?:g|node_)\((\d+)\)')
+
+    def remap_id_in_line(match_obj):
+        """Função auxiliar para re.sub que substitui um ID antigo por um novo."""
+        prefix, old_id_str, suffix = match_obj.groups()
+        old_id = int(old_id_str)
+        # O ID deve estar no mapa, pois já filtramos
+        new_id = id_map.get(old_id, old_id) 
+        return f"{prefix}{new_id}{suffix}"
+
+    lines_written = 0
+    with open_log(input_path) as f_in, open(output_path, 'w') as f_out:
+        for line in f_in:
+            # 1. Verificar se a linha pertence a um nó válido
+            found_ids_str = node_id_finder_regex.findall(line)
+            if not found_ids_str:
+                continue # Linha sem ID de nó, pular
+
+            # Converte para int e verifica se algum dos IDs encontrados é um nó que queremos manter
+            found_ids = {int(i) for i in found_ids_str}
+            if not found_ids.intersection(valid_ids):
+                continue # Nenhum dos nós nesta linha é válido, pular
+
+            # 2. Se a linha é válida, remapeie todos os IDs nela
+            processed_line = re.sub(id_regex, remap_id_in_line, line)
+
+            # 3. Verifique se a linha tem um timestamp para normalizar
+            time_match = re.search(r'(\$ns_ at )(\d+\.?\d*)', processed_line)
+            if time_match:
+                prefix = time_match.group(1)
+                current_time = float(time_match.group(2))
+                new_time = current_time - start_t
+                # Substitui o tempo antigo pelo novo tempo normalizado
+                processed_line = re.sub(r'(\$ns_ at )(\d+\.?\d*)', r'{}{:.4f}'.format(prefix, new_time), processed_line, 1)
+
+            f_out.write(processed_line)
+            lines_written += 1
+            
+    print(f"Concluído. {lines_written} linhas relevantes escritas.")
+
+
+def iter_records_by_line(filepath):
+    """
+    Versão anterior de ingestao_base_station.iter_records (regex sobre cada linha decodificada),
+    referência para a etapa base_station_linhas e para conferir a varredura em bytes.
+    """
+    import stage_profile
+    from ingestao_base_station import RECORD_PATTERN
+
+    match_record = RECORD_PATTERN.match
+    with open_log(filepath) as f:
+        for line in stage_profile.iter_lines(f):
+            match = match_record(line)
+            if match:
+                time_ns, bs_id, from_id, monitor_id, seq, event_id = match.groups()
+                yield (int(time_ns), int(bs_id), int(from_id),
+                       int(monitor_id), int(seq), int(event_id))
+
+
+def _cut_trace_ids(cut_trace):
+    start_t, end_t = TRACE_WINDOW
+    valid_ids = cut_trace.find_fully_contained_nodes(cut_trace.ACTIVITY_INPUT_FILE, start_t, end_t)
+    return valid_ids, {old_id: new_id for new_id, old_id in enumerate(sorted(valid_ids))}
+
+
+def check_references():
+    """
+    Roda as implementações atuais e as de referência sobre a raiz (diretório de trabalho)
+    e retorna [(nome, idênticas), ...].
+    """
+    import cut_trace
+    import ingestao_base_station
+
+    checks = []
+    valid_ids, id_map = _cut_trace_ids(cut_trace)
+    for input_file in (cut_trace.ACTIVITY_INPUT_FILE, cut_trace.MOBILITY_INPUT_FILE):
+        outputs = [f"{input_file}.legacy.check", f"{input_file}.streaming.check"]
+        process_and_filter_file_legacy(input_file, outputs[0], valid_ids, id_map, TRACE_WINDOW[0])
+        cut_trace.process_and_filter_file(input_file, outputs[1], valid_ids, id_map, TRACE_WINDOW[0])
+        checks.append((f"cut_trace {input_file}", filecmp.cmp(*outputs, shallow=False)))
+        _remove(*outputs)
+
+    path = _bs_log()
+    checks.append((f"ingestao_base_station {path}",
+                   list(iter_records_by_line(path)) == list(ingestao_base_station.iter_records(path))))
+    return checks
+
+
+# ---------------- ETAPAS ----------------
+# Cada etapa recebe a raiz (já como diretório de trabalho), faz os imports e a preparação
+# fora do tempo medido e retorna (arquivos de entrada, função medida).
+
+def stage_ingestao_base_station():
+    import ingestao_base_station
+    path = _bs_log()
+    return [path], lambda: ingestao_base_station.ingest_base_station_log(path, BASE_STATION_ID, EVENT_ID)
+
+
+def stage_consumidores_base_station():
+    import analise_pacotes
+    import analise_mensagens
+    import analise_retransmissores
+    path = _bs_log()
+
+    def run():
+        analise_pacotes.parse_log_file(path, BASE_STATION_ID, EVENT_ID)
+        analise_mensagens.parse_log_file(path, BASE_STATION_ID, EVENT_ID)
+        analise_retransmissores.parse_retransmitter_logs(path, BASE_STATION_ID, EVENT_ID)
+    return [path], run
+
+
+def stage_base_station_linhas():
+    # Importado aqui para que o import não entre no tempo medido
+    import ingestao_base_station
+    path = _bs_log()
+    return [path], lambda: sum(1 for record in iter_records_by_line(path) if record[1] == BASE_STATION_ID)
+
+
+def stage_base_station_varredura():
+    import ingestao_base_station
+    path = _bs_log()
+    return [path], lambda: sum(1 for _ in ingestao_base_station.iter_records(path, BASE_STATION_ID))
+
+
+def stage_ingestao_incremental():
+    import ingestao_base_station
+    from tail_follow import state_path_for
+    path = _bs_log()
+    _remove(state_path_for(path, f"bs{BASE_STATION_ID}_ev{EVENT_ID}"))
+    return [path], lambda: ingestao_base_station.follow_base_station_log(path, BASE_STATION_ID, EVENT_ID)
+
+
+def stage_latencia():
+    import analise_latencia
+    detection, bs = _detection_log(), _bs_log()
+    return [detection, bs], lambda: analise_latencia.build_latency_table(detection, bs)
+
+
+def stage_cluster_parse():
+    from parser_cluster import parse_clustering_log
+    return [CLUSTER_LOG], lambda: parse_clustering_log(CLUSTER_LOG)
+
+
+def stage_cluster_metricas():
+    import analise_cluster
+    analise_cluster.USE_PARSE_CACHE = False
+
+    def run():
+        df = analise_cluster.parse_log_file(CLUSTER_LOG, "bench")
+        analise_cluster.analyze_metrics(df)
+    return [CLUSTER_LOG], run
+
+
+def stage_cluster_cache_quente():
+    import analise_cluster
+    analise_cluster.USE_PARSE_CACHE = True
+    analise_cluster.parse_log_file(CLUSTER_LOG, "bench")
+
+    def run():
+        df = analise_cluster.parse_log_file(CLUSTER_LOG, "bench")
+        analise_cluster.analyze_metrics(df)
+    return [CLUSTER_LOG], run
+
+
+def stage_cluster_incremental():
+    import analise_cluster
+    from tail_follow import state_path_for
+    _remove(state_path_for(CLUSTER_LOG, 'cluster_state'))
+    return [CLUSTER_LOG], lambda: analise_cluster.follow_cluster_log(CLUSTER_LOG, "bench")
+
+
+def stage_concordancia_texto():
+    import analise_concordancia
+    analise_concordancia.USE_SCORE_STORE = False
+    path = _score_csv()
+    return [path], lambda: analise_concordancia.compute_winners(path)
+
+
+def stage_eleicoes_streaming():
+    import analise_eleicoes
+    analise_eleicoes.USE_SCORE_STORE = False
+    path = _score_csv()
+    return [path], lambda: analise_eleicoes.analyze_election_history(path)
+
+
+def stage_score_store_conversao():
+    import score_store
+    path = _score_csv()
+    _remove(score_store.store_path_for(path))
+    return [path], lambda: score_store.update_score_store(path)
+
+
+def stage_score_store_vencedores():
+    import score_store
+    path = _score_csv()
+    score_store.update_score_store(path)
+    return [path], lambda: score_store.store_winners(score_store.open_score_store(path))
+
+
+def _cut_trace_window(cut_trace, suffix):
+    valid_ids, id_map = _cut_trace_ids(cut_trace)
+    for input_file in (cut_trace.ACTIVITY_INPUT_FILE, cut_trace.MOBILITY_INPUT_FILE):
+        cut_trace.process_and_filter_file(input_file, cut_trace.output_name(input_file, suffix),
+                                          valid_ids, id_map, TRACE_WINDOW[0])
+
+
+def stage_cut_trace_legado():
+    import cut_trace
+    valid_ids, id_map = _cut_trace_ids(cut_trace)
+    path = cut_trace.MOBILITY_INPUT_FILE
+    return [path], lambda: process_and_filter_file_legacy(path, cut_trace.output_name(path, '_bench'),
+                                                          valid_ids, id_map, TRACE_WINDOW[0])
+
+
+def stage_cut_trace_varredura():
+    import cut_trace
+    cut_trace.USE_TRACE_INDEX = False
+    inputs = [cut_trace.ACTIVITY_INPUT_FILE, cut_trace.MOBILITY_INPUT_FILE]
+    return inputs, lambda: _cut_trace_window(cut_trace, '_bench')
+
+
+def stage_trace_index_construcao():
+    import trace_index
+    path = 'TraceMobility.tcl'
+    _remove(trace_index.index_path_for(path))
+    return [path], lambda: trace_index.build_index(path)
+
+
+def stage_cut_trace_indice():
+    import cut_trace
+    import trace_index
+    cut_trace.USE_TRACE_INDEX = True
+    cut_trace.BUILD_TRACE_INDEX = False
+    if trace_index.load_index(cut_trace.MOBILITY_INPUT_FILE) is None:
+        trace_index.build_index(cut_trace.MOBILITY_INPUT_FILE)
+    inputs = [cut_trace.ACTIVITY_INPUT_FILE, cut_trace.MOBILITY_INPUT_FILE]
+    return inputs, lambda: _cut_trace_window(cut_trace, '_bench')
+
+
+def stage_find_vehicles_conversao():
+    import find_vehicles
+    path = find_vehicles.RANDOM_TXT_PATH
+    _remove(*find_vehicles.matrix_paths(path))
+    return [path], lambda: find_vehicles.convert_random_txt(path)
+
+
+def stage_find_vehicles_consulta():
+    import find_vehicles
+    path = find_vehicles.RANDOM_TXT_PATH
+    find_vehicles.load_vehicle_matrix(path)
+    return [path], lambda: find_vehicles.get_vehicle_columns(VEHICLE_IDS, path)
+
+
+STAGES = {
+    'ingestao_base_station': stage_ingestao_base_station,
+    'consumidores_base_station': stage_consumidores_base_station,
+    'base_station_linhas': stage_base_station_linhas,
+    'base_station_varredura': stage_base_station_varredura,
+    'ingestao_incremental': stage_ingestao_incremental,
+    'latencia': stage_latencia,
+    'cluster_parse': stage_cluster_parse,
+    'cluster_metricas': stage_cluster_metricas,
+    'cluster_cache_quente': stage_cluster_cache_quente,
+    'cluster_incremental': stage_cluster_incremental,
+    'concordancia_texto': stage_concordancia_texto,
+    'eleicoes_streaming': stage_eleicoes_streaming,
+    'score_store_conversao': stage_score_store_conversao,
+    'score_store_vencedores': stage_score_store_vencedores,
+    'cut_trace_legado': stage_cut_trace_legado,
+    'cut_trace_varredura': stage_cut_trace_varredura,
+    'trace_index_construcao': stage_trace_index_construcao,
+    'cut_trace_indice': stage_cut_trace_indice,
+    'find_vehicles_conversao': stage_find_vehicles_conversao,
+    'find_vehicles_consulta': stage_find_vehicles_consulta,
+}
+
+
+# ---------------- EXECUÇÃO ----------------
+def _peak_rss_mb():
+    # ru_maxrss é dado em KiB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def count_lines(path, block_bytes=1 << 24):
+    with open(path, 'rb') as f:
+        return sum(block.count(b'\n') for block in iter(lambda: f.read(block_bytes), b''))
+
+
+def run_stage_here(name):
+    """
+    Executa uma etapa no processo atual (diretório de trabalho = raiz dos logs).
+    A saída dos scripts é descartada. Retorna {seconds, cpu_seconds, peak_rss_mb, setup_rss_mb, inputs}.
+    """
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        inputs, work = STAGES[name]()
+        missing = [path for path in inputs if not os.path.exists(path)]
+        if missing:
+            raise FileNotFoundError(f"Entradas ausentes para '{name}': {missing}")
+        setup_rss = _peak_rss_mb()
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        work()
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - cpu_start
+    return {'seconds': elapsed, 'cpu_seconds': cpu, 'peak_rss_mb': _peak_rss_mb(),
+            'setup_rss_mb': setup_rss, 'inputs': inputs}
+
+
+def run_stage(root, name, line_counts):
+    """Roda a etapa em um processo novo e calcula as vazões a partir das entradas."""
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), os.path.abspath(root), '--run-stage', name],
+                          cwd=root, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {'error': (proc.stderr.strip().splitlines() or ['erro desconhecido'])[-1]}
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    inputs = result.pop('inputs')
+    for path in inputs:
+        if path not in line_counts:
+            line_counts[path] = count_lines(os.path.join(root, path))
+    n_lines = sum(line_counts[path] for path in inputs)
+    n_bytes = sum(os.path.getsize(os.path.join(root, path)) for path in inputs)
+    seconds = max(result['seconds'], 1e-9)
+    result.update({
+        'inputs': inputs, 'lines': n_lines, 'bytes': n_bytes,
+        'lines_per_s': n_lines / seconds, 'mb_per_s': n_bytes / 1e6 / seconds,
+        'rss_delta_mb': result['peak_rss_mb'] - result['setup_rss_mb'],
+    })
+    return result
+
+
+def run_benchmark(root, stage_names, repeat=1):
+    """
+    Mede as etapas pedidas; com repeat > 1 fica o menor tempo e o maior pico de memória.
+    Retorna o relatório (ambiente, conjunto de dados e resultados por etapa).
+    """
+    line_counts = {}
+    stages = {}
+    for name in stage_names:
+        runs = [run_stage(root, name, line_counts) for _ in range(repeat)]
+        errors = [run['error'] for run in runs if 'error' in run]
+        if errors:
+            stages[name] = {'error': errors[0]}
+            print(f"  {name:<28} ERRO: {errors[0]}")
+            continue
+        best = min(runs, key=lambda run: run['seconds'])
+        best['peak_rss_mb'] = max(run['peak_rss_mb'] for run in runs)
+        best['rss_delta_mb'] = max(run['rss_delta_mb'] for run in runs)
+        stages[name] = best
+        print(f"  {name:<28} {best['seconds']:9.3f}s {best['lines_per_s']:14,.0f} linhas/s "
+              f"{best['mb_per_s']:9.1f} MB/s  pico {best['peak_rss_mb']:8.1f} MB (+{best['rss_delta_mb']:.1f})")
+
+    manifest_path = os.path.join(root, 'dataset.json')
+    dataset = None
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r') as f:
+            dataset = json.load(f)
+    return {
+        'version': BASELINE_VERSION,
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'cpus': os.cpu_count()},
+        'root': os.path.abspath(root),
+        'dataset': dataset,
+        'repeat': repeat,
+        'stages': stages,
+    }
+
+
+def compare_with_baseline(report, baseline, tolerance=REGRESSION_TOLERANCE):
+    """
+    Compara as etapas presentes nos dois relatórios.
+    Retorna a lista de regressões [(etapa, descrição), ...] e imprime a tabela de comparação.
+    """
+    regressions = []
+    print(f"\n{'Etapa':<28} {'linhas/s (base)':>16} {'linhas/s':>14} {'razão':>7} {'pico MB (base)':>15} {'pico MB':>9}")
+    for name, current in report['stages'].items():
+        previous = baseline.get('stages', {}).get(name)
+        if previous is None or 'error' in previous or 'error' in current:
+            continue
+        ratio = current['lines_per_s'] / previous['lines_per_s'] if previous['lines_per_s'] else float('inf')
+        flag = ''
+        if ratio < 1.0 - tolerance:
+            regressions.append((name, f"vazão caiu para {ratio:.0%} da linha de base"))
+            flag = ' <- REGRESSÃO'
+        rss_limit = previous['peak_rss_mb'] * (1.0 + tolerance) + RSS_NOISE_MB
+        if current['peak_rss_mb'] > rss_limit:
+            regressions.append((name, f"pico de memória {current['peak_rss_mb']:.0f} MB "
+                                      f"(linha de base {previous['peak_rss_mb']:.0f} MB)"))
+            flag = ' <- REGRESSÃO'
+        print(f"{name:<28} {previous['lines_per_s']:16,.0f} {current['lines_per_s']:14,.0f} {ratio:7.2f} "
+              f"{previous['peak_rss_mb']:15.1f} {current['peak_rss_mb']:9.1f}{flag}")
+
+    if baseline.get('dataset') and report.get('dataset') and \
+            baseline['dataset'].get('lines') != report['dataset'].get('lines'):
+        print("\n[AVISO] A linha de base foi medida com outra escala de dados; compare as vazões com cautela.")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark das etapas de análise dos logs.")
+    parser.add_argument('root', help="raiz dos logs (mesma estrutura usada pelos scripts)")
+    parser.add_argument('--stages', nargs='+', default=None,
+                        help="etapas (ou prefixos) a medir; padrão: todas")
+    parser.add_argument('--repeat', type=int, default=1, help="execuções por etapa (fica a mais rápida)")
+    parser.add_argument('--generate', action='store_true', help="gera logs sintéticos na raiz antes de medir")
+    parser.add_argument('--lines', type=int, default=1_000_000, help="escala dos logs gerados com --generate")
+    parser.add_argument('--save', metavar='JSON', help="grava o relatório (nova linha de base)")
+    parser.add_argument('--baseline', metavar='JSON', help="linha de base para detectar regressões")
+    parser.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE)
+    parser.add_argument('--check-references', action='store_true',
+                        help="confere que as implementações atuais dão a mesma saída das de referência")
+    parser.add_argument('--run-stage', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_stage:
+        print(json.dumps(run_stage_here(args.run_stage)))
+        sys.exit(0)
+
+    if args.check_references:
+        os.chdir(args.root)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            checks = check_references()
+        for name, identical in checks:
+            print(f"  {name:<60} {'idêntica' if identical else 'DIFERENTE'}")
+        sys.exit(0 if all(identical for _, identical in checks) else 1)
+
+    if args.generate:
+        # Em outro processo: o pico de memória do gerador passaria para as etapas (ru_maxrss é herdado)
+        subprocess.run([sys.executable, os.path.join(BENCH_DIR, 'gerar_logs_sinteticos.py'), args.root,
+                        '--lines', str(args.lines), '--methods', METHOD], check=True)
+
+    names = list(STAGES)
+    if args.stages:
+        names = [name for name in names if any(name.startswith(prefix) for prefix in args.stages)]
+    print(f"\nMedindo {len(names)} etapas em '{args.root}':")
+    report = run_benchmark(args.root, names, args.repeat)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nRelatório salvo em '{args.save}'")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regressão(ões) em relação a '{args.baseline}':")
+            for name, description in regressions:
+                print(f"  - {name}: {description}")
+            sys.exit(1)
+        print("\nNenhuma regressão em relação à linha de base.")
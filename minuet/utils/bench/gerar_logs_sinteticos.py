@@ -0,0 +1,324 @@
+"""
+gerar_logs_sinteticos.py
+Gera uma raiz de logs sintética, com os mesmos formatos escritos pela simulação,
+para medir os scripts de análise em escalas controladas (1M a 100M linhas por arquivo).
+
+Estrutura gerada em '<raiz>/' (a mesma esperada pelos scripts, executados a partir da raiz):
+    <MÉTODO>/logFileBaseStation.log          AppBaseStation::ReceiveDataMessage
+    <MÉTODO>/logFileDetectionLayer.log       DetectionLayer (primeiras detecções e continuações)
+    score_history_<MÉTODO>.csv               LogAllScores (fcv-utils.cc)
+    RTT/V<n>/RTTV<a>/logFileClusteringAlgorithm.log   eventos do rtt.cc
+    TraceActivity.tcl, TraceMobility.tcl, TraceConfig.tcl   traces do SUMO (entrada do cut_trace.py)
+    random.txt                               atributos dos veículos (entrada do find_vehicles.py)
+
+Os valores são aleatórios, mas reprodutíveis pela semente; cada arquivo grande é escrito
+em blocos de BLOCK_LINES linhas, então a memória usada não depende da escala.
+
+Uso: python3 gerar_logs_sinteticos.py <raiz> --lines 1000000 [--methods AHP ...] [--seed 1]
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+BLOCK_LINES = 500_000
+METHODS = ["AHP", "PROMETHEE", "TOPSIS", "BORDA"]
+CLUSTER_SCENARIOS = ["150"]
+CLUSTER_VARIANTS = 1
+NUM_VEHICLES = 300
+NUM_BASE_STATIONS = 2
+NUM_EVENTS = 4
+SIMULATION_DURATION = 600.0
+SCORE_HEADER = "ns,ID,0,C,D,N,V,A,E,I,T,M,ICR"
+RANDOM_LABELS = ["av", "ec", "im", "tc", "pv", "lp", "tt", "vt"]
+MANIFEST_NAME = "dataset.json"
+
+# Eventos do rtt.cc e sua frequência relativa no log de clustering
+CLUSTER_EVENT_WEIGHTS = [
+    ('PACKET_SENT', 0.40), ('RTT_MEASUREMENT', 0.14), ('CLUSTER_SIZE', 0.10),
+    ('MEMBER_JOIN', 0.08), ('MEMBER_LEAVE', 0.07), ('CH_ELECTED', 0.06),
+    ('CH_RENOUNCED', 0.04), ('BECAME_CANDIDATE', 0.03), ('CANCELLED_PROMOTION', 0.02),
+    ('CONFLICT_IGNORED', 0.02), ('NODE_ACTIVE', 0.02), ('NODE_INACTIVE', 0.02),
+]
+PACKET_TYPES = ['DISCOVERY', 'HEARTBEAT', 'REPLY', 'INVITE']
+
+# Valores com 4 casas decimais formatados uma única vez (o ostream usa 6 algarismos significativos)
+_FRACTION_STRINGS = np.array([f"{v / 10000:g}" for v in range(10001)], dtype=object)
+
+
+def _blocks(total, block_lines=BLOCK_LINES):
+    """Gera os tamanhos dos blocos que somam 'total' linhas."""
+    for start in range(0, total, block_lines):
+        yield min(block_lines, total - start)
+
+
+def _write_lines(f, lines):
+    if lines:
+        f.write('\n'.join(lines))
+        f.write('\n')
+
+
+def write_base_station_log(path, n_lines, rng, n_vehicles=NUM_VEHICLES,
+                           n_base_stations=NUM_BASE_STATIONS, n_events=NUM_EVENTS):
+    """Registros 'Monitoring Message Received' de n_base_stations BS (IDs n_vehicles, n_vehicles+1, ...)."""
+    # Os registros cobrem toda a simulação, em ordem de tempo
+    step = max(1, int(SIMULATION_DURATION * 1e9 / max(n_lines, 1)))
+    time_ns = 1_000_000
+    frame_id = 0
+    with open(path, 'w') as f:
+        for size in _blocks(n_lines):
+            times = time_ns + np.cumsum(rng.integers(1, 2 * step, size))
+            time_ns = int(times[-1])
+            bs = n_vehicles + rng.integers(0, n_base_stations, size)
+            from_ids = rng.integers(0, n_vehicles, size)
+            monitors = rng.integers(0, n_vehicles, size)
+            relays = np.where(rng.random(size) < 0.5, from_ids, monitors)
+            status = rng.integers(0, 3, size)
+            frame_types = np.where(rng.random(size) < 0.1, 'I', 'P')
+            seqs = rng.integers(0, 2000, size)
+            events = rng.integers(0, n_events, size)
+            _write_lines(f, [
+                f"{t}ns - BASE STATION - Node #{b}: Monitoring Message Received: From = {fr} Status = {st} "
+                f"RelayId = {r} MonitorId = {m} FrameId = {frame_id + i} FrameType = {ft} Seq = {sq} EventId = {e}"
+                for i, (t, b, fr, st, r, m, ft, sq, e) in enumerate(zip(
+                    times.tolist(), bs.tolist(), from_ids.tolist(), status.tolist(), relays.tolist(),
+                    monitors.tolist(), frame_types.tolist(), seqs.tolist(), events.tolist()))])
+            frame_id += size
+
+
+def write_detection_log(path, n_lines, rng, n_vehicles=NUM_VEHICLES, n_events=NUM_EVENTS):
+    """Linhas do DetectionLayer concentradas no início da simulação (as entregas vêm depois)."""
+    step = max(1, int(0.1 * SIMULATION_DURATION * 1e9 / max(n_lines, 1)))
+    time_ns = 0
+    with open(path, 'w') as f:
+        for size in _blocks(n_lines):
+            times = time_ns + np.cumsum(rng.integers(1, 2 * step, size))
+            time_ns = int(times[-1])
+            nodes = rng.integers(0, n_vehicles, size)
+            events = rng.integers(0, n_events, size)
+            xs = rng.uniform(3000, 6000, size)
+            ys = rng.uniform(7000, 9000, size)
+            distances = rng.uniform(0, 150, size)
+            continues = rng.random(size) < 0.3
+            _write_lines(f, [
+                f"{t}ns - DetectionLayer - Node #{n} Pos ({x:.6g}:{y:.6g}:0) : "
+                + (f"Vehicle continues detecting Event ({e}) Detected" if c else f"Event ({e}) Detected")
+                + f" - Distance {d:.6f}"
+                for t, n, x, y, e, d, c in zip(times.tolist(), nodes.tolist(), xs.tolist(), ys.tolist(),
+                                               events.tolist(), distances.tolist(), continues.tolist())])
+
+
+def _cluster_event_strings(names, rng, nodes, n_vehicles):
+    """Texto 'EVENT=...' de cada linha conforme o nome sorteado."""
+    size = len(names)
+    other = rng.integers(0, n_vehicles, size).tolist()
+    values = rng.integers(0, 12, size).tolist()
+    rtts = rng.gamma(2.0, 0.004, size).tolist()
+    packet_types = rng.integers(0, len(PACKET_TYPES), size).tolist()
+    reasons = (rng.random(size) < 0.8).tolist()
+    out = []
+    for name, node, o, v, rtt, pt, r in zip(names, nodes, other, values, rtts, packet_types, reasons):
+        if name == 'PACKET_SENT':
+            out.append(f"EVENT=PACKET_SENT;TYPE={PACKET_TYPES[pt]}")
+        elif name == 'RTT_MEASUREMENT':
+            out.append(f"EVENT=RTT_MEASUREMENT;FROM={o};TO={node};RTT={rtt:.6f}")
+        elif name == 'CLUSTER_SIZE':
+            out.append(f"EVENT=CLUSTER_SIZE;CH_ID={node};SIZE={v}")
+        elif name == 'MEMBER_JOIN':
+            out.append(f"EVENT=MEMBER_JOIN;CH_ID={o};MEMBER_ID={node}" + (";REASON=HEARTBEAT" if r else ""))
+        elif name == 'MEMBER_LEAVE':
+            out.append(f"EVENT=MEMBER_LEAVE;CH_ID={o};MEMBER_ID={node};REASON={'TIMEOUT' if r else 'CH_TIMEOUT'}")
+        elif name == 'CH_ELECTED':
+            out.append(f"EVENT=CH_ELECTED;CH_ID={node}")
+        elif name == 'CH_RENOUNCED':
+            out.append(f"EVENT=CH_RENOUNCED;CH_ID={node};REASON=CONFLICT")
+        elif name == 'CANCELLED_PROMOTION':
+            out.append("EVENT=CANCELLED_PROMOTION;REASON=CH_FOUND")
+        elif name == 'CONFLICT_IGNORED':
+            out.append(f"EVENT=CONFLICT_IGNORED;REASON=GRACE_PERIOD;OPPONENT_ID={o}")
+        else:
+            out.append(f"EVENT={name}")
+    return out
+
+
+def write_clustering_log(path, n_lines, rng, n_vehicles=NUM_VEHICLES):
+    """Eventos do rtt.cc; o tempo sai do ostream com 6 algarismos significativos."""
+    names, weights = zip(*CLUSTER_EVENT_WEIGHTS)
+    weights = np.array(weights) / sum(weights)
+    step = SIMULATION_DURATION / max(n_lines, 1)
+    time_s = 0.0
+    with open(path, 'w') as f:
+        for size in _blocks(n_lines):
+            times = time_s + np.cumsum(rng.uniform(0, 2 * step, size))
+            time_s = float(times[-1])
+            nodes = rng.integers(0, n_vehicles, size).tolist()
+            events = np.array(names, dtype=object)[rng.choice(len(names), size, p=weights)].tolist()
+            _write_lines(f, [f"{t:.6g}s - RTT - Node #{n} : {e}"
+                             for t, n, e in zip(times.tolist(), nodes,
+                                                _cluster_event_strings(events, rng, nodes, n_vehicles))])
+
+
+def write_score_history(path, n_lines, rng, n_vehicles=NUM_VEHICLES):
+    """Pontos de decisão com 2 a 8 candidatos cada, em ordem de tempo (como LogAllScores)."""
+    n_criteria = len(SCORE_HEADER.split(',')) - 2
+    time_ns = 1_000_000_000
+    with open(path, 'w') as f:
+        f.write(SCORE_HEADER + '\n')
+        for size in _blocks(n_lines):
+            group_sizes = rng.integers(2, 9, size // 2 + 1)
+            group_sizes = group_sizes[:np.searchsorted(np.cumsum(group_sizes), size) + 1]
+            group_sizes[-1] -= group_sizes.sum() - size
+            group_times = time_ns + np.cumsum(rng.integers(1, 50_000_000, len(group_sizes)))
+            time_ns = int(group_times[-1])
+            ns = np.repeat(group_times, group_sizes).tolist()
+            ids = rng.integers(0, n_vehicles, size).tolist()
+            values = _FRACTION_STRINGS[rng.integers(0, 10001, (n_criteria, size))]
+            columns = [column.tolist() for column in values]
+            _write_lines(f, [f"{t},{i}," + ','.join(row)
+                             for t, i, row in zip(ns, ids, zip(*columns))])
+
+
+def write_tcl_traces(activity_path, mobility_path, config_path, n_lines, rng,
+                     duration=SIMULATION_DURATION):
+    """
+    TraceActivity/TraceMobility no formato convertido do SUMO: cada veículo entra em um instante
+    inteiro, recebe 'set X_/Y_/Z_' e um 'setdest' por segundo até sair. O número de veículos é
+    escolhido para que o trace de mobilidade tenha aproximadamente n_lines linhas.
+    """
+    min_life, max_life = 30, 300
+    mean_lines = (min_life + max_life) / 2 + 3
+    n_nodes = max(1, int(round(n_lines / mean_lines)))
+    starts = np.sort(rng.integers(0, int(duration) - min_life, n_nodes))
+    lives = rng.integers(min_life, max_life + 1, n_nodes)
+    stops = starts + lives
+    x0 = rng.uniform(3220.32, 5708.96, n_nodes)
+    y0 = rng.uniform(7393.38, 8642.8, n_nodes)
+    heading = rng.uniform(0, 2 * np.pi, n_nodes)
+
+    with open(activity_path, 'w') as f:
+        _write_lines(f, [line for node, (start, stop) in enumerate(zip(starts.tolist(), stops.tolist()))
+                         for line in (f'$ns_ at {start:.1f} "$g({node}) start"; # SUMO-ID: {node}',
+                                      f'$ns_ at {stop:.1f} "$g({node}) stop"; # SUMO-ID: {node}')])
+
+    with open(config_path, 'w') as f:
+        f.write(f"# set number of nodes\nset opt(nn) {n_nodes}\n\n"
+                f"# set start/stop time\nset opt(start) 0.0\nset opt(stop) {duration:.1f}\n\n"
+                f"# set floor size\nset opt(x) 5708.96\nset opt(y) 8642.8\n"
+                f"set opt(min-x) 3220.32\nset opt(min-y) 7393.38\n")
+
+    # Um 'setdest' por (segundo, veículo), na ordem do trace: tempo e depois ID
+    with open(mobility_path, 'w') as f:
+        first_node = 0
+        for second in range(int(stops.max())):
+            # Veículos ativos neste segundo (os inícios estão ordenados)
+            last_node = int(np.searchsorted(starts, second, side='right'))
+            active = np.arange(first_node, last_node)
+            active = active[stops[active] > second]
+            if len(active) == 0:
+                continue
+            first_node = int(active[0])
+            elapsed = second - starts[active]
+            speeds = np.where(elapsed == 0, 0.0, rng.uniform(0, 30, len(active)))
+            xs = x0[active] + 15.0 * elapsed * np.cos(heading[active])
+            ys = y0[active] + 15.0 * elapsed * np.sin(heading[active])
+            lines = []
+            for node, e, x, y, v in zip(active.tolist(), elapsed.tolist(), xs.tolist(), ys.tolist(),
+                                         speeds.tolist()):
+                if e == 0:
+                    lines += [f"$node_({node}) set X_ {x:.6g}", f"$node_({node}) set Y_ {y:.6g}",
+                              f"$node_({node}) set Z_ 0"]
+                lines.append(f'$ns_ at {second:.1f} "$node_({node}) setdest {x:.6g} {y:.6g} {v:.2f}"')
+            _write_lines(f, lines)
+    return n_nodes
+
+
+def write_random_txt(path, n_vehicles, rng):
+    """Uma linha por atributo (rótulo + um valor inteiro por veículo)."""
+    ranges = {'av': (2000, 2026), 'ec': (0, 5), 'im': (18, 90), 'tc': (0, 3),
+              'pv': (60, 250), 'lp': (0, 2), 'tt': (0, 10), 'vt': (0, 4)}
+    with open(path, 'w') as f:
+        for label in RANDOM_LABELS:
+            low, high = ranges[label]
+            values = rng.integers(low, high, n_vehicles)
+            f.write(label + ' ' + ' '.join(map(str, values.tolist())) + '\n')
+
+
+def generate_dataset(root, lines, methods=METHODS, scenarios=CLUSTER_SCENARIOS,
+                     variants=CLUSTER_VARIANTS, n_vehicles=NUM_VEHICLES, seed=1):
+    """
+    Gera todos os arquivos em 'root' e grava '<root>/dataset.json' com os parâmetros usados
+    e o tamanho (linhas e bytes) de cada arquivo. Retorna esse manifesto.
+    """
+    rng = np.random.default_rng(seed)
+    files = {}
+
+    def generated(path, n_lines, started):
+        files[os.path.relpath(path, root)] = {'lines': n_lines, 'bytes': os.path.getsize(path)}
+        print(f"  - {path}: {n_lines} linhas ({os.path.getsize(path) / 1e6:.1f} MB) em {time.perf_counter() - started:.1f}s")
+
+    os.makedirs(root, exist_ok=True)
+    for method in methods:
+        os.makedirs(os.path.join(root, method), exist_ok=True)
+        path = os.path.join(root, method, "logFileBaseStation.log")
+        started = time.perf_counter()
+        write_base_station_log(path, lines, rng, n_vehicles)
+        generated(path, lines, started)
+
+        path = os.path.join(root, method, "logFileDetectionLayer.log")
+        started = time.perf_counter()
+        write_detection_log(path, max(1, lines // 10), rng, n_vehicles)
+        generated(path, max(1, lines // 10), started)
+
+        path = os.path.join(root, f"score_history_{method}.csv")
+        started = time.perf_counter()
+        write_score_history(path, lines, rng, n_vehicles)
+        generated(path, lines + 1, started)
+
+    for scenario in scenarios:
+        for variant in range(variants):
+            directory = os.path.join(root, "RTT", f"V{scenario}", f"RTTV{variant}")
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, "logFileClusteringAlgorithm.log")
+            started = time.perf_counter()
+            write_clustering_log(path, lines, rng, int(scenario))
+            generated(path, lines, started)
+
+    started = time.perf_counter()
+    activity_path = os.path.join(root, "TraceActivity.tcl")
+    mobility_path = os.path.join(root, "TraceMobility.tcl")
+    n_nodes = write_tcl_traces(activity_path, mobility_path, os.path.join(root, "TraceConfig.tcl"), lines, rng)
+    generated(activity_path, 2 * n_nodes, started)
+    with open(mobility_path, 'rb') as f:
+        generated(mobility_path, sum(block.count(b'\n') for block in iter(lambda: f.read(1 << 24), b'')), started)
+
+    path = os.path.join(root, "random.txt")
+    started = time.perf_counter()
+    write_random_txt(path, n_nodes, rng)
+    generated(path, len(RANDOM_LABELS), started)
+
+    manifest = {'lines': lines, 'seed': seed, 'methods': list(methods), 'scenarios': list(scenarios),
+                'variants': variants, 'vehicles': n_vehicles, 'trace_nodes': n_nodes, 'files': files}
+    with open(os.path.join(root, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera logs sintéticos nos formatos da simulação.")
+    parser.add_argument('root', help="diretório de saída (raiz dos logs)")
+    parser.add_argument('--lines', type=int, default=1_000_000,
+                        help="linhas de cada arquivo grande (BaseStation, clustering, score_history, mobilidade)")
+    parser.add_argument('--methods', nargs='+', default=METHODS)
+    parser.add_argument('--scenarios', nargs='+', default=CLUSTER_SCENARIOS,
+                        help="cenários RTT/V<n> (n = número de veículos do log de clustering)")
+    parser.add_argument('--variants', type=int, default=CLUSTER_VARIANTS, help="variantes RTTV0..RTTV<n-1>")
+    parser.add_argument('--vehicles', type=int, default=NUM_VEHICLES)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"Gerando logs sintéticos em '{args.root}' ({args.lines} linhas por arquivo)...")
+    generate_dataset(args.root, args.lines, args.methods, args.scenarios, args.variants, args.vehicles, args.seed)
+    print("Concluído.")
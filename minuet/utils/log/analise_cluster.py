@@ -10,10 +10,27 @@ Script único que:
 Salva saídas em 'resultados_analise/'.
 """
 
+import argparse
 import os
-import re
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+
+import batch_render
+import stage_profile
+from batch_render import render_figure, wait_figures
+from cache_parse import cached_parse
+from cluster_series import (bin_events, export_series_npz, merge_series, new_series, series_from_frame,
+                            series_to_dict, series_view)
+from parser_cluster import parse_chunk, parse_clustering_log
+from quantile_sketch import KLLSketch, percentile_row, rank_error
+from replicas import (discover_replicates, fold_replicate, load_replicate_state, new_replicate_state,
+                      pending_replicates, replicate_series, replicate_sketch, replicate_summary,
+                      save_replicate_state, state_path_for)
+from stage_profile import profiled
+from tail_follow import consume_log, follow
 
 # ---------------- CONFIGURAÇÃO ----------------
 # --- RENOMEADO PARA INGLÊS ---
@@ -45,51 +62,113 @@ LOG_FILES_BY_SCENARIO = {
 }
 
 SIMULATION_DURATION = 600.0
+# Versão do cálculo das métricas: incrementar ao mudar analyze_metrics, cluster_state_metrics ou
+# compute_ch_tenures, para que as replicações salvas em '<log>.replicas.json' sejam recalculadas
+METRICS_VERSION = 1
+# Cache colunar (.npz) dos eventos extraídos, gravado ao lado de cada log
+USE_PARSE_CACHE = True
+# Inclui um hash do conteúdo na validação do cache (mais seguro, porém lê o log inteiro)
+PARSE_CACHE_HASH = False
+# Processos usados para ler/analisar os pares cenário x algoritmo (1 = serial); ver --workers
+NUM_WORKERS = 1
+# Modo incremental: mantém os agregados de cada log em '<log>.cluster_state.tail.pkl' e lê apenas
+# os bytes acrescentados desde a última execução; ver --incremental e --follow
+INCREMENTAL = False
+# Parâmetro k do sketch de quantis (KLL) do RTT mantido por log; ver quantile_sketch.py
+RTT_SKETCH_K = 200
+# Percentis do RTT exportados com --rtt-quantiles (tabela LaTeX e boxplots)
+RTT_PERCENTILES = (5, 25, 50, 75, 95, 99)
+# Largura (s) dos intervalos das séries temporais exportadas com --time-series; ver --bin-seconds
+TIME_SERIES_BIN_S = 10.0
 OUTPUT_DIR = "resultados_analise"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 # ---------------- FUNÇÕES DE PARSING ----------------
-def parse_event_string(event_str):
-    data = {}
-    for part in event_str.strip().split(';'):
-        if '=' in part:
-            key, value = part.split('=', 1)
-            key = key.lower().strip()
-            value = value.strip()
-            try:
-                data[key] = float(value)
-            except ValueError:
-                data[key] = value
-    return data
-
+@profiled(path_arg=0)
 def parse_log_file(filepath, algorithm_name):
     """Retorna DataFrame com colunas: timestamp, node_id, algorithm, event, ...outros campos"""
-    records = []
-    line_regex = re.compile(r"([\d\.]+)s - .*? - Node #(\d+) : (.*)")
-    try:
-        with open(filepath, 'r') as f:
-            for line in f:
-                match = line_regex.match(line.strip())
-                if match:
-                    timestamp, node_id, event_str = match.groups()
-                    record = {'timestamp': float(timestamp), 'node_id': int(node_id), 'algorithm': algorithm_name}
-                    event_data = parse_event_string(event_str)
-                    if 'event' in event_data:
-                        event = str(event_data.pop('event')).strip().upper()
-                        record['event'] = event
-                        record.update(event_data)
-                        records.append(record)
-    except FileNotFoundError:
+    if not os.path.exists(filepath):
         print(f"[WARNING] File not found: {filepath}  (Algorithm: {algorithm_name})")
         return None
 
-    if not records:
+    if USE_PARSE_CACHE:
+        df = cached_parse(filepath, 'cluster_events', parse_clustering_log, with_hash=PARSE_CACHE_HASH)
+    else:
+        df = parse_clustering_log(filepath)
+
+    if df is None:
         print(f"[WARNING] No valid events in: {filepath}  (Algorithm: {algorithm_name})")
         return None
 
-    return pd.DataFrame(records)
+    df.insert(2, 'algorithm', pd.Categorical.from_codes(np.zeros(len(df), dtype=np.int8), [algorithm_name]))
+    return df
 
 # ---------------- FUNÇÃO DE ANÁLISE ----------------
+@profiled()
+def compute_ch_tenures(df, sim_duration=SIMULATION_DURATION):
+    """
+    Calcula todos os mandatos de CH (CH_ELECTED -> CH_RENOUNCED) por ch_id de forma vetorizada.
+    Um CH_ELECTED com o CH já ativo e um CH_RENOUNCED com o CH inativo são ignorados;
+    mandatos ainda abertos são encerrados em sim_duration.
+    Retorna DataFrame com colunas: ch_id, start, end, duration, closed.
+    Ordem das linhas: mandatos encerrados (pela ordem do CH_RENOUNCED) e depois os abertos (pela ordem do CH_ELECTED).
+    """
+    columns = {'ch_id': np.empty(0, dtype=np.int64), 'start': np.empty(0), 'end': np.empty(0),
+               'duration': np.empty(0), 'closed': np.empty(0, dtype=bool)}
+    if df is None or df.empty or 'ch_id' not in df.columns:
+        return pd.DataFrame(columns)
+
+    ch_events = df[df['event'].isin(['CH_ELECTED', 'CH_RENOUNCED'])]
+    ch_ids = pd.to_numeric(ch_events['ch_id'], errors='coerce').to_numpy(dtype=np.float64)
+    valid = np.isfinite(ch_ids)
+    if not valid.any():
+        return pd.DataFrame(columns)
+
+    # Ordem temporal (estável) e, dentro dela, agrupamento estável por ch_id
+    timestamps = ch_events['timestamp'].to_numpy(dtype=np.float64)[valid]
+    elected = (ch_events['event'].to_numpy(dtype=object)[valid] == 'CH_ELECTED')
+    ch_ids = np.trunc(ch_ids[valid]).astype(np.int64)
+    time_order = np.argsort(timestamps, kind='stable')
+    group_order = time_order[np.argsort(ch_ids[time_order], kind='stable')]
+    # Posição de cada linha agrupada na ordem temporal
+    time_rank = np.empty(len(time_order), dtype=np.int64)
+    time_rank[time_order] = np.arange(len(time_order))
+    rank = time_rank[group_order]
+
+    ch = ch_ids[group_order]
+    ts = timestamps[group_order]
+    is_elected = elected[group_order]
+    group_start = np.r_[True, ch[1:] != ch[:-1]]
+    group_end = np.r_[ch[1:] != ch[:-1], True]
+
+    # O CH está ativo antes de um evento sse o evento anterior do mesmo ch_id foi CH_ELECTED
+    was_active = np.r_[False, is_elected[:-1]] & ~group_start
+    opens = is_elected & ~was_active
+    closes = ~is_elected & was_active
+    still_open = is_elected & group_end
+
+    # Início do mandato vigente em cada linha (o último 'opens' até ela)
+    last_open = np.maximum.accumulate(np.where(opens, np.arange(len(ch)), 0))
+
+    closed_rows = np.flatnonzero(closes)
+    closed_rows = closed_rows[np.argsort(rank[closed_rows], kind='stable')]
+    closed_start = ts[last_open[closed_rows]]
+    closed_end = ts[closed_rows]
+    keep = closed_end - closed_start >= 0
+    closed_rows, closed_start, closed_end = closed_rows[keep], closed_start[keep], closed_end[keep]
+
+    open_rows = np.flatnonzero(still_open)
+    open_rows = open_rows[np.argsort(rank[last_open[open_rows]], kind='stable')]
+    open_start = ts[last_open[open_rows]]
+
+    columns['ch_id'] = np.concatenate([ch[closed_rows], ch[open_rows]])
+    columns['start'] = np.concatenate([closed_start, open_start])
+    columns['end'] = np.concatenate([closed_end, np.full(len(open_rows), float(sim_duration))])
+    columns['duration'] = np.concatenate([closed_end - closed_start, np.maximum(0.0, sim_duration - open_start)])
+    columns['closed'] = np.r_[np.ones(len(closed_rows), dtype=bool), np.zeros(len(open_rows), dtype=bool)]
+    return pd.DataFrame(columns)
+
+@profiled()
 def analyze_metrics(df):
     """Recebe df (parseado) e retorna dicionário com métricas padronizadas."""
     if df is None or df.empty:
@@ -109,23 +188,7 @@ def analyze_metrics(df):
     packet_df = df[df['event'] == 'PACKET_SENT']
     metrics['overhead_total'] = int(len(packet_df))
 
-    ch_events = df[df['event'].isin(['CH_ELECTED', 'CH_RENOUNCED'])].sort_values('timestamp')
-    ch_lifetimes = []
-    active_chs = {}
-    if 'ch_id' in ch_events.columns:
-        for _, row in ch_events.iterrows():
-            try:
-                ch_id = int(row['ch_id'])
-            except Exception:
-                continue
-            if row['event'] == 'CH_ELECTED' and ch_id not in active_chs:
-                active_chs[ch_id] = row['timestamp']
-            elif row['event'] == 'CH_RENOUNCED' and ch_id in active_chs:
-                duration = row['timestamp'] - active_chs.pop(ch_id)
-                if duration >= 0:
-                    ch_lifetimes.append(duration)
-        for ch_id, start_time in active_chs.items():
-            ch_lifetimes.append(max(0.0, sim_duration - start_time))
+    ch_lifetimes = compute_ch_tenures(df, sim_duration)['duration'].tolist()
 
     metrics['avg_cluster_lifetime'] = float(sum(ch_lifetimes) / len(ch_lifetimes)) if ch_lifetimes else 0.0
     metrics['total_ch_elections'] = int(len(df[df['event'] == 'CH_ELECTED']))
@@ -152,7 +215,131 @@ def analyze_metrics(df):
 
     return metrics
 
+def rtt_sketch(df):
+    """Sketch de quantis (KLL) dos RTT_MEASUREMENT do log, em ms."""
+    sketch = KLLSketch(RTT_SKETCH_K)
+    if df is not None and 'rtt' in df.columns:
+        rtt_values = pd.to_numeric(df[df['event'] == 'RTT_MEASUREMENT']['rtt'], errors='coerce').dropna()
+        sketch.update(rtt_values.to_numpy(dtype=np.float64) * 1000.0)
+    return sketch
+
+# ---------------- AGREGADOR INCREMENTAL ----------------
+def new_cluster_state(bin_s=TIME_SERIES_BIN_S):
+    """
+    Estado dos agregados de um log de clustering, atualizado bloco a bloco:
+    contagens de eventos, soma/contagem dos tamanhos de cluster > 0, RTT (n, média, M2
+    de Welford, mais o sketch de quantis em ms), a máquina de estados dos mandatos de CH
+    (ativos e encerrados) e a série temporal por intervalos de bin_s segundos.
+    """
+    return {
+        'events': 0,
+        'counts': {'PACKET_SENT': 0, 'CH_ELECTED': 0, 'CH_RENOUNCED': 0},
+        'size_sum': 0.0,
+        'size_count': 0,
+        'rtt': [0, 0.0, 0.0],
+        'rtt_sketch': KLLSketch(RTT_SKETCH_K),
+        'active_ch': {},        # ch_id -> início do mandato vigente (em ordem de abertura)
+        'closed_sum': 0.0,
+        'closed_count': 0,
+        'series': new_series(bin_s),
+    }
+
+def _numeric_field(chunk, key, mask):
+    column = chunk['fields'].get(key)
+    if column is None:
+        return np.empty(0)
+    return pd.to_numeric(pd.Series(column[mask]), errors='coerce').dropna().to_numpy(dtype=np.float64)
+
+def update_cluster_state(state, lines):
+    """Incorpora um lote de linhas do log ao estado (mesmas regras de analyze_metrics)."""
+    chunk = parse_chunk(lines)
+    if chunk is None:
+        return
+    names = np.asarray(chunk['event_names'], dtype=object)[chunk['event_codes']]
+    state['events'] += chunk['rows']
+    for name in state['counts']:
+        state['counts'][name] += int(np.count_nonzero(names == name))
+
+    sizes = _numeric_field(chunk, 'size', names == 'CLUSTER_SIZE')
+    sizes = sizes[sizes > 0]
+    state['size_sum'] += float(sizes.sum())
+    state['size_count'] += len(sizes)
+
+    # Welford em blocos (combinação de Chan): n, média e M2 do RTT
+    rtt = _numeric_field(chunk, 'rtt', names == 'RTT_MEASUREMENT')
+    if len(rtt):
+        n, mean, m2 = state['rtt']
+        block_mean = rtt.mean()
+        total = n + len(rtt)
+        delta = block_mean - mean
+        state['rtt'] = [total, mean + delta * len(rtt) / total,
+                        m2 + np.square(rtt - block_mean).sum() + delta * delta * n * len(rtt) / total]
+        state['rtt_sketch'].update(rtt * 1000.0)
+
+    fields = {key: chunk['fields'][key] for key in ('type', 'size', 'rtt') if key in chunk['fields']}
+    merge_series(state['series'], bin_events(chunk['timestamp'], names, fields, state['series']['bin_s']))
+
+    # Mandatos de CH, na ordem temporal (estável) dos eventos do bloco
+    is_ch_event = (names == 'CH_ELECTED') | (names == 'CH_RENOUNCED')
+    if 'ch_id' not in chunk['fields'] or not is_ch_event.any():
+        return
+    rows = np.flatnonzero(is_ch_event)
+    ch_ids = pd.to_numeric(pd.Series(chunk['fields']['ch_id'][rows]), errors='coerce').to_numpy(dtype=np.float64)
+    timestamps = chunk['timestamp'][rows]
+    active = state['active_ch']
+    for i in np.argsort(timestamps, kind='stable'):
+        if not np.isfinite(ch_ids[i]):
+            continue
+        ch_id = int(ch_ids[i])
+        t = float(timestamps[i])
+        if names[rows[i]] == 'CH_ELECTED':
+            if ch_id not in active:
+                active[ch_id] = t
+        elif ch_id in active:
+            duration = t - active.pop(ch_id)
+            if duration >= 0:
+                state['closed_sum'] += duration
+                state['closed_count'] += 1
+
+def cluster_state_metrics(state, sim_duration=SIMULATION_DURATION):
+    """Métricas de analyze_metrics a partir do estado incremental (mandatos abertos vão até sim_duration)."""
+    if state['events'] == 0:
+        return analyze_metrics(None)
+
+    lifetime_sum = state['closed_sum']
+    for start in state['active_ch'].values():
+        lifetime_sum += max(0.0, sim_duration - start)
+    lifetime_count = state['closed_count'] + len(state['active_ch'])
+    n, mean, m2 = state['rtt']
+
+    return {
+        'overhead_total': state['counts']['PACKET_SENT'],
+        'avg_cluster_lifetime': float(lifetime_sum / lifetime_count) if lifetime_count else 0.0,
+        'total_ch_elections': state['counts']['CH_ELECTED'],
+        'total_ch_renounces': state['counts']['CH_RENOUNCED'],
+        'avg_cluster_size': state['size_sum'] / state['size_count'] if state['size_count'] else 0.0,
+        'avg_rtt_ms': float(mean * 1000.0) if n else 0.0,
+        'std_rtt_ms': float(np.sqrt(m2 / (n - 1)) * 1000.0) if n > 1 else (float('nan') if n else 0.0),
+    }
+
+@profiled(path_arg=0)
+def follow_cluster_log(filepath, algorithm_name, bin_s=TIME_SERIES_BIN_S):
+    """
+    Métricas, sketch do RTT e série temporal do log consumindo apenas o trecho novo desde a
+    última leitura (ver tail_follow). Retorna (métricas, KLLSketch, série). O intervalo da
+    série é o do estado salvo (definido na primeira leitura).
+    """
+    if not os.path.exists(filepath):
+        print(f"[WARNING] File not found: {filepath}  (Algorithm: {algorithm_name})")
+        return analyze_metrics(None), KLLSketch(RTT_SKETCH_K), new_series(bin_s)
+    state, _ = consume_log(filepath, 'cluster_state', lambda: new_cluster_state(bin_s), update_cluster_state)
+    if state['series']['bin_s'] != bin_s:
+        print(f"[WARNING] Incremental state of {filepath} uses {state['series']['bin_s']:g} s time bins "
+              f"(requested {bin_s:g} s); delete its .tail.pkl to rebuild it")
+    return cluster_state_metrics(state), state['rtt_sketch'], state['series']
+
 # ---------------- PLOTAGEM (estilo IEEE, matplotlib puro) ----------------
+@profiled()
 def plot_comparative_lines(all_metrics_by_scenario, output_dir):
     """
     Gera gráficos de linha comparativos:
@@ -175,41 +362,58 @@ def plot_comparative_lines(all_metrics_by_scenario, output_dir):
         'avg_cluster_size': ("Average Cluster Size", "Number of Members"),
     }
 
+    for metric_key, (_, ylabel) in metrics_to_plot.items():
+        series = []
+        for algo in algorithms:
+            y = []
+            yerr = []
+            for scen in scenario_keys:
+                metrics = all_metrics_by_scenario[scen].get(algo, {})
+                y.append(metrics.get(metric_key, 0.0))
+                yerr.append(metrics.get('ci', {}).get(metric_key, float('nan')))
+            # Barras de erro (IC de 95%) só quando houver mais de uma replicação
+            yerr = [e if np.isfinite(e) else 0.0 for e in yerr] if np.isfinite(yerr).any() else None
+            series.append((algo, y, yerr))
+        filename = os.path.join(output_dir, f"comparative_{metric_key}.png")
+        # Em modo em lote (--batch-render) os 5 gráficos são desenhados em paralelo
+        render_figure(draw_comparative_line, filename, (8.0, 5.0), vehicle_counts, series, ylabel,
+                      message=f"[INFO] Saved: {filename}", show=False)
+
+def draw_comparative_line(fig, vehicle_counts, series, ylabel):
+    """
+    Desenha uma métrica: uma linha por algoritmo [(nome, valores por cenário, IC ou None), ...].
+    Com IC, cada ponto recebe uma barra de erro.
+    """
     # Paleta para 4 algoritmos
     colors = ['#1b9e77', '#d95f02', '#7570b3', '#e7298a']
     markers = ['o', 's', '^', 'D']
     linestyles = ['-', '--', '-.', ':']
 
-    for idx, (metric_key, (_, ylabel)) in enumerate(metrics_to_plot.items()):
-        plt.figure(figsize=(8.0, 5.0))
-        for i, algo in enumerate(algorithms):
-            y = []
-            for scen in scenario_keys:
-                metrics = all_metrics_by_scenario[scen].get(algo, {})
-                y.append(metrics.get(metric_key, 0.0))
-            plt.plot(vehicle_counts, y,
-                     label=algo,
+    ax = fig.add_subplot()
+    for i, (algo, y, yerr) in enumerate(series):
+        style = dict(label=algo,
                      marker=markers[i % len(markers)],
                      linestyle=linestyles[i % len(linestyles)],
                      linewidth=1.8,
                      markersize=6,
                      color=colors[i % len(colors)])
+        if yerr is None:
+            ax.plot(vehicle_counts, y, **style)
+        else:
+            ax.errorbar(vehicle_counts, y, yerr=yerr, capsize=3, elinewidth=1.0, **style)
 
-        # --- RENOMEADO PARA INGLÊS ---
-        plt.xlabel("Number of Vehicles", fontsize=11)
-        plt.ylabel(ylabel, fontsize=11)
-        # --- TÍTULO REMOVIDO CONFORME SOLICITADO ---
-        # plt.title(f"{title} — Comparative analysis between algorithms", fontsize=12)
-        plt.xticks(vehicle_counts)
-        plt.grid(False)
-        plt.legend(fontsize=9, frameon=False)
-        plt.tight_layout()
-        filename = os.path.join(output_dir, f"comparative_{metric_key}.png")
-        plt.savefig(filename, dpi=300)
-        plt.close()
-        print(f"[INFO] Saved: {filename}")
+    # --- RENOMEADO PARA INGLÊS ---
+    ax.set_xlabel("Number of Vehicles", fontsize=11)
+    ax.set_ylabel(ylabel, fontsize=11)
+    # --- TÍTULO REMOVIDO CONFORME SOLICITADO ---
+    # ax.set_title(f"{title} — Comparative analysis between algorithms", fontsize=12)
+    ax.set_xticks(vehicle_counts)
+    ax.grid(False)
+    ax.legend(fontsize=9, frameon=False)
+    fig.tight_layout()
 
 # ---------------- EXPORTA TABELAS LaTeX (uma por métrica) ----------------
+@profiled()
 def export_latex_tables(all_metrics_by_scenario, output_dir):
     """
     Gera uma tabela LaTeX por métrica.
@@ -227,15 +431,25 @@ def export_latex_tables(all_metrics_by_scenario, output_dir):
         'avg_cluster_size': ("Average Cluster Size (members)", "{:.2f}")
     }
 
+    # Com mais de uma replicação por par, cada célula vira "média $\pm$ IC de 95%"
+    with_ci = any(metrics.get('n_replicates', 0) > 1
+                  for scenario_metrics in all_metrics_by_scenario.values() for metrics in scenario_metrics.values())
+
     for metric_key, (caption_title, fmt) in metrics_to_export.items():
         rows = []
         for scen in scenario_keys:
             # --- RENOMEADO PARA INGLÊS ---
             row = {'Scenario': scen}
             for algo in algorithms:
-                val = all_metrics_by_scenario[scen].get(algo, {}).get(metric_key, 0.0)
+                metrics = all_metrics_by_scenario[scen].get(algo, {})
+                val = metrics.get(metric_key, 0.0)
+                if with_ci:
+                    half_width = metrics.get('ci', {}).get(metric_key, float('nan'))
+                    val = fmt.format(val) + (f" $\\pm$ {fmt.format(half_width)}" if np.isfinite(half_width) else "")
                 row[algo] = val
             rows.append(row)
+        if with_ci:
+            caption_title += " -- mean $\\pm$ 95\\% CI over replicates"
         # --- RENOMEADO PARA INGLÊS ---
         df_table = pd.DataFrame(rows).set_index('Scenario')
 
@@ -257,28 +471,337 @@ def export_latex_tables(all_metrics_by_scenario, output_dir):
         # --- RENOMEADO PARA INGLÊS ---
         print(f"[INFO] LaTeX table saved: {filename}")
 
+# ---------------- DISTRIBUIÇÃO DO RTT (sketches de quantis) ----------------
+@profiled()
+def export_rtt_percentiles(all_metrics_by_scenario, output_dir):
+    """
+    Tabela LaTeX com os percentis do RTT (ms) de cada par cenário x algoritmo, lidos dos
+    sketches combinados das replicações (nenhuma medição individual fica em memória).
+    """
+    scenario_keys = sorted(all_metrics_by_scenario.keys(), key=lambda s: int(s))
+    rows = []
+    for scen in scenario_keys:
+        for algo, metrics in all_metrics_by_scenario[scen].items():
+            row = {'Scenario': scen, 'Algorithm': algo}
+            row.update(percentile_row(metrics['rtt_sketch'], RTT_PERCENTILES))
+            rows.append(row)
+    df_table = pd.DataFrame(rows).set_index(['Scenario', 'Algorithm'])
+    error = df_table.pop('rank_error').max()
+    df_table = df_table.rename(columns={'n': 'Samples', 'mean': 'Mean', 'min': 'Min', 'max': 'Max'})
+    df_table.columns = [c.upper() if c.startswith('p') else c for c in df_table.columns]
+    print(df_table.to_string(float_format=lambda x: f"{x:.2f}"))
+
+    caption = "RTT percentiles (ms)"
+    if error > 0:
+        caption += f" -- KLL sketch, normalized rank error $\\leq$ {100 * rank_error(RTT_SKETCH_K):.1f}\\%"
+    tex = df_table.to_latex(float_format=lambda x: f"{x:.2f}", index=True, caption=caption,
+                            label="tab:rtt_percentiles", column_format='ll' + 'r' * len(df_table.columns),
+                            escape=False)
+    filename = os.path.join(output_dir, "tabela_rtt_percentiles.tex")
+    with open(filename, 'w') as f:
+        f.write("% \\begin{table*}[t]\n"
+                "\\centering\n"
+                "\\begingroup\n"
+                "\\footnotesize\n"
+                f"{tex}\n"
+                "\\endgroup\n"
+                "% \\end{table*}\n")
+    print(f"[INFO] LaTeX table saved: {filename}")
+
+@profiled()
+def plot_rtt_distributions(all_metrics_by_scenario, output_dir):
+    """Boxplots do RTT (um painel por cenário, uma caixa por algoritmo) a partir dos sketches."""
+    scenario_keys = sorted(all_metrics_by_scenario.keys(), key=lambda s: int(s))
+    stats_by_scenario = []
+    for scen in scenario_keys:
+        stats = [metrics['rtt_sketch'].boxplot_stats(label=algo)
+                 for algo, metrics in all_metrics_by_scenario[scen].items() if len(metrics['rtt_sketch'])]
+        stats_by_scenario.append((scen, stats))
+    if not any(stats for _, stats in stats_by_scenario):
+        print("[WARNING] No RTT measurements to plot.")
+        return
+    filename = os.path.join(output_dir, "comparative_rtt_distribution.png")
+    render_figure(draw_rtt_distributions, filename, (3.2 * len(scenario_keys), 4.5), stats_by_scenario,
+                  message=f"[INFO] Saved: {filename}", show=False)
+
+def draw_rtt_distributions(fig, stats_by_scenario):
+    """Desenha um boxplot (Axes.bxp) por cenário com as estatísticas de cada algoritmo."""
+    colors = ['#1b9e77', '#d95f02', '#7570b3', '#e7298a']
+    axes = fig.subplots(1, len(stats_by_scenario), sharey=True, squeeze=False)[0]
+    for ax, (scen, stats) in zip(axes, stats_by_scenario):
+        if stats:
+            box = ax.bxp(stats, patch_artist=True, showfliers=True,
+                         flierprops={'markersize': 2, 'alpha': 0.5})
+            for i, patch in enumerate(box['boxes']):
+                patch.set_facecolor(colors[i % len(colors)])
+            ax.tick_params(axis='x', labelrotation=60, labelsize=8)
+        ax.set_xlabel(f"{scen} vehicles", fontsize=10)
+        ax.yaxis.grid(True, linestyle='--', color='grey', alpha=0.4)
+    axes[0].set_ylabel("RTT (ms)", fontsize=11)
+    fig.tight_layout()
+
+# ---------------- SÉRIES TEMPORAIS (por intervalo de tempo) ----------------
+@profiled()
+def export_time_series(all_metrics_by_scenario, output_dir):
+    """
+    Um .npz por cenário ('timeseries_V<cenário>.npz') com as séries de todos os algoritmos no
+    mesmo eixo de tempo: arrays (algoritmos x intervalos) de cada valor de series_view, mais
+    'algorithms', 'n_runs', 'bin_s' e 'time'. Carregue com np.load.
+    """
+    for scen in sorted(all_metrics_by_scenario.keys(), key=lambda s: int(s)):
+        series = {algo: metrics['time_series'] for algo, metrics in all_metrics_by_scenario[scen].items()
+                  if metrics['time_series'][1]}
+        if not series:
+            continue
+        filename = os.path.join(output_dir, f"timeseries_V{scen}.npz")
+        export_series_npz(filename, {algo: s for algo, (s, _) in series.items()},
+                          {algo: n for algo, (_, n) in series.items()})
+        print(f"[INFO] Time series saved: {filename}")
+
+@profiled()
+def plot_time_series(all_metrics_by_scenario, output_dir):
+    """Um gráfico por cenário ('timeseries_V<cenário>.png'): um painel por métrica, uma linha por algoritmo."""
+    for scen in sorted(all_metrics_by_scenario.keys(), key=lambda s: int(s)):
+        views = [(algo, series_view(series, n)) for algo, metrics in all_metrics_by_scenario[scen].items()
+                 for series, n in [metrics['time_series']] if n]
+        if not views:
+            continue
+        filename = os.path.join(output_dir, f"timeseries_V{scen}.png")
+        bin_s = all_metrics_by_scenario[scen][views[0][0]]['time_series'][0]['bin_s']
+        render_figure(draw_time_series, filename, (8.0, 9.0), views, bin_s,
+                      message=f"[INFO] Saved: {filename}", show=False)
+
+def draw_time_series(fig, views, bin_s):
+    """Desenha as séries [(algoritmo, series_view), ...] em painéis empilhados com o eixo de tempo comum."""
+    colors = ['#1b9e77', '#d95f02', '#7570b3', '#e7298a']
+    linestyles = ['-', '--', '-.', ':']
+    panels = [
+        (lambda v: v['overhead'], f"Control Messages\n(per {bin_s:g} s)"),
+        (lambda v: v['ch_elected'], f"CH Elections\n(per {bin_s:g} s)"),
+        (lambda v: v['member_join'] + v['member_leave'], f"Joins + Leaves\n(per {bin_s:g} s)"),
+        (lambda v: v['avg_cluster_size'], "Average Cluster\nSize"),
+        (lambda v: v['avg_rtt_ms'], "Average RTT\n(ms)"),
+    ]
+    axes = fig.subplots(len(panels), 1, sharex=True)
+    for ax, (value, ylabel) in zip(axes, panels):
+        for i, (algo, view) in enumerate(views):
+            # Um degrau por intervalo, de view['time'] até view['time'] + bin_s
+            edges = np.append(view['time'], len(view['time']) * bin_s)
+            ax.stairs(value(view), edges, baseline=None, label=algo, linewidth=1.4,
+                      linestyle=linestyles[i % len(linestyles)], color=colors[i % len(colors)])
+        ax.set_ylabel(ylabel, fontsize=9)
+        ax.grid(False)
+    axes[-1].set_xlabel("Simulation Time (s)", fontsize=11)
+    axes[0].legend(fontsize=8, frameon=False, ncol=2)
+    fig.tight_layout()
+
+# ---------------- EXECUÇÃO (serial ou em paralelo) ----------------
+def process_log_job(filepath, algo_name, incremental=False, bin_s=TIME_SERIES_BIN_S):
+    """
+    Lê um log e calcula suas métricas (executado no processo principal ou em um worker).
+    Retorna (métricas, {'rtt_ms': sketch do RTT serializado}, série temporal serializada).
+    """
+    if incremental:
+        metrics, sketch, series = follow_cluster_log(filepath, algo_name, bin_s)
+    else:
+        df = parse_log_file(filepath, algo_name)
+        metrics, sketch, series = analyze_metrics(df), rtt_sketch(df), series_from_frame(df, bin_s)
+    return metrics, {'rtt_ms': sketch.to_dict()}, series_to_dict(series)
+
+# Métricas de contagem: a média das replicações é exibida como inteiro quando for exata
+COUNT_METRICS = ('overhead_total', 'total_ch_elections', 'total_ch_renounces')
+
+def replicate_metrics(state, bin_s=TIME_SERIES_BIN_S):
+    """
+    Métricas de um par cenário x algoritmo a partir dos acumuladores das replicações:
+    a média de cada métrica, 'ci' (meia-largura do IC de 95%, NaN com uma única replicação),
+    'n_replicates', 'rtt_sketch' (sketch do RTT de todas as replicações combinadas) e
+    'time_series' ((soma das séries temporais das replicações, quantas foram somadas)).
+    Sem replicações processadas, as métricas ficam zeradas.
+    """
+    metrics = analyze_metrics(None)
+    ci = {}
+    if state['replicates']:
+        for metric in metrics:
+            metrics[metric] = float('nan')
+        for metric, (_, mean, _, half_width) in replicate_summary(state).items():
+            if metric in COUNT_METRICS and float(mean).is_integer():
+                mean = int(mean)
+            metrics[metric] = mean
+            ci[metric] = half_width
+    metrics['ci'] = ci
+    metrics['n_replicates'] = len(state['replicates'])
+    metrics['rtt_sketch'] = replicate_sketch(state, 'rtt_ms')
+    metrics['time_series'] = replicate_series(state, bin_s)
+    return metrics
+
+def analysis_parameters():
+    """Parâmetros que afetam as métricas de uma replicação (guardados com ela em '<log>.replicas.json')."""
+    return {'metrics_version': METRICS_VERSION, 'simulation_duration': SIMULATION_DURATION,
+            'rtt_sketch_k': RTT_SKETCH_K}
+
+@profiled()
+def run_all_jobs(log_files_by_scenario, workers=NUM_WORKERS, incremental=INCREMENTAL, reset_replicates=False,
+                 bin_s=TIME_SERIES_BIN_S):
+    """
+    Processa todos os pares cenário x algoritmo, em série (workers <= 1) ou em um pool de processos.
+    Cada par pode ter várias replicações (subdiretórios com o mesmo log, ver replicas.py): só as
+    novas, alteradas ou processadas com outros parâmetros (analysis_parameters) são lidas, uma
+    por job, e suas métricas entram nos acumuladores do par (salvos em '<log>.replicas.json');
+    nenhum DataFrame fica em memória depois do seu job.
+    O resultado é montado sempre na ordem de log_files_by_scenario, de modo que gráficos e tabelas
+    são idênticos aos da execução serial. Uma replicação com falha é reportada e fica de fora;
+    um par sem nenhuma replicação processada tem as métricas zeradas.
+    """
+    params = analysis_parameters()
+    configs = [(scenario_key, algo_name, filepath)
+               for scenario_key, logs in sorted(log_files_by_scenario.items(), key=lambda kv: int(kv[0]))
+               for algo_name, filepath in logs.items()]
+    states = {}
+    jobs = []
+    for scenario_key, algo_name, filepath in configs:
+        state = new_replicate_state() if reset_replicates else load_replicate_state(filepath)
+        states[(scenario_key, algo_name)] = state
+        replicates = discover_replicates(filepath)
+        if not replicates:
+            print(f"[WARNING] File not found: {filepath}  (Algorithm: {algo_name})")
+        pending = pending_replicates(state, replicates, bin_s, params)
+        if len(pending) < len(replicates):
+            print(f"  - Reusing {len(replicates) - len(pending)} processed replicate(s): {algo_name}  "
+                  f"(Scenario: {scenario_key})")
+        jobs += [(scenario_key, algo_name, filepath, key, path) for key, path in pending]
+    failures = []
+
+    def fold(scenario_key, algo_name, filepath, key, path, result):
+        metrics, sketches, series = result
+        state = states[(scenario_key, algo_name)]
+        fold_replicate(state, key, path, metrics, sketches, series, params)
+        save_replicate_state(filepath, state)
+
+    if workers <= 1:
+        for scenario_key, algo_name, filepath, key, path in jobs:
+            print(f"  - Reading: {algo_name}  -> {path}  (Scenario: {scenario_key})")
+            try:
+                fold(scenario_key, algo_name, filepath, key, path, process_log_job(path, algo_name, incremental, bin_s))
+            except Exception:
+                failures.append((scenario_key, algo_name, path, traceback.format_exc()))
+    elif jobs:
+        print(f"[INFO] Running {len(jobs)} jobs on {workers} worker processes")
+        # Com a instrumentação ligada, cada worker devolve também as etapas que mediu
+        profiling = stage_profile.enabled()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {(pool.submit(stage_profile.call_with_records, process_log_job, path, algo_name, incremental, bin_s)
+                        if profiling else pool.submit(process_log_job, path, algo_name, incremental, bin_s)):
+                       (scenario_key, algo_name, filepath, key, path)
+                       for scenario_key, algo_name, filepath, key, path in jobs}
+            for future in as_completed(futures):
+                scenario_key, algo_name, filepath, key, path = futures[future]
+                try:
+                    result = future.result()
+                    if profiling:
+                        result, worker_records = result
+                        stage_profile.merge_records(worker_records)
+                    fold(scenario_key, algo_name, filepath, key, path, result)
+                    print(f"  - Done: {algo_name}  -> {path}  (Scenario: {scenario_key})")
+                except Exception:
+                    failures.append((scenario_key, algo_name, path, traceback.format_exc()))
+
+    for scenario_key, algo_name, filepath, error in failures:
+        print(f"[ERROR] Job failed: Scenario {scenario_key}, {algo_name} -> {filepath}\n{error}")
+
+    all_metrics_by_scenario = {}
+    for scenario_key, algo_name, filepath in configs:
+        state = states[(scenario_key, algo_name)]
+        # Pares que só tinham replicações removidas também precisam ter o estado atualizado
+        if state['replicates'] or os.path.exists(state_path_for(filepath)):
+            save_replicate_state(filepath, state)
+        all_metrics_by_scenario.setdefault(scenario_key, {})[algo_name] = replicate_metrics(state, bin_s)
+    return all_metrics_by_scenario, failures
+
 # ---------------- MAIN ----------------
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Comparative analysis of the clustering logs.")
+    parser.add_argument('--workers', type=int, default=NUM_WORKERS,
+                        help="number of worker processes (1 = serial)")
+    parser.add_argument('--incremental', action='store_true', default=INCREMENTAL,
+                        help="resume saved aggregates and read only bytes appended since the last run")
+    parser.add_argument('--follow', type=float, default=0, metavar='SECONDS',
+                        help="keep polling logs of a running simulation every SECONDS (implies --incremental; Ctrl+C to finish)")
+    parser.add_argument('--profile', metavar='DIR', default=None,
+                        help="record wall/CPU time, peak memory and throughput of each stage into a JSON profile in DIR")
+    parser.add_argument('--cprofile', action='store_true',
+                        help="with --profile, also dump a cProfile (.prof) per stage")
+    parser.add_argument('--batch-render', action='store_true',
+                        help="headless rendering: Agg backend, no pyplot state, figures drawn in parallel worker processes")
+    parser.add_argument('--render-workers', type=int, default=None, metavar='N',
+                        help="worker processes used by --batch-render")
+    parser.add_argument('--reset-replicates', action='store_true',
+                        help="ignore saved replicate accumulators (*.replicas.json) and reprocess every replicate")
+    parser.add_argument('--rtt-quantiles', action='store_true',
+                        help="also export RTT percentiles and boxplots from the merged per-replicate quantile sketches")
+    parser.add_argument('--time-series', action='store_true',
+                        help="also export per-time-bin metric series (npz) and plot them per scenario")
+    parser.add_argument('--bin-seconds', type=float, default=TIME_SERIES_BIN_S, metavar='SECONDS',
+                        help="width of the time bins used by --time-series")
+    args = parser.parse_args()
+    if args.bin_seconds <= 0:
+        parser.error("--bin-seconds must be > 0")
+    incremental = args.incremental or args.follow > 0
+    if args.batch_render:
+        batch_render.configure(batch=True, workers=args.render_workers)
+    if args.profile:
+        stage_profile.configure(args.profile, cprofile=args.cprofile)
+
     # --- MENSAGENS TRADUZIDAS ---
     print("Starting comparative analysis...")
 
-    all_metrics_by_scenario = {}
+    reset_replicates = [args.reset_replicates]
+
+    def poll_metrics():
+        # O reset vale só para a primeira leitura; no modo --follow as seguintes são incrementais
+        metrics_by_scenario, failed = run_all_jobs(LOG_FILES_BY_SCENARIO, args.workers, incremental,
+                                                   reset_replicates[0], args.bin_seconds)
+        reset_replicates[0] = False
+        if args.follow > 0:
+            for scenario_key, scenario_metrics in metrics_by_scenario.items():
+                for algo_name, metrics in scenario_metrics.items():
+                    print(f"[LIVE] {scenario_key:>4} {algo_name:<22} RTT = {metrics['avg_rtt_ms']:.2f} ms, "
+                          f"Overhead = {metrics['overhead_total']}, CH elections = {metrics['total_ch_elections']}")
+        return metrics_by_scenario, failed
+
+    if args.follow > 0:
+        all_metrics_by_scenario, failures = follow(poll_metrics, args.follow)
+    else:
+        all_metrics_by_scenario, failures = poll_metrics()
 
-    for scenario_key, logs in sorted(LOG_FILES_BY_SCENARIO.items(), key=lambda kv: int(kv[0])):
+    for scenario_key, scenario_metrics in all_metrics_by_scenario.items():
         print(f"\n[PROCESSING] Scenario: {scenario_key} vehicles")
-        scenario_metrics = {}
-        for algo_name, filepath in logs.items():
-            print(f"  - Reading: {algo_name}  -> {filepath}")
-            df = parse_log_file(filepath, algo_name)
-            metrics = analyze_metrics(df)
-            scenario_metrics[algo_name] = metrics
+        for algo_name, metrics in scenario_metrics.items():
+            print(f"  - {algo_name}")
             print(f"    -> Metrics: Average RTT = {metrics.get('avg_rtt_ms',0):.2f} ms, Overhead = {metrics.get('overhead_total',0)}")
-        all_metrics_by_scenario[scenario_key] = scenario_metrics
+            if metrics.get('n_replicates', 0) > 1:
+                ci = metrics['ci']
+                print(f"    -> {metrics['n_replicates']} replicates (95% CI): "
+                      f"RTT ± {ci.get('avg_rtt_ms', float('nan')):.2f} ms, "
+                      f"Overhead ± {ci.get('overhead_total', float('nan')):.1f}")
 
     print("\nGenerating comparative graphs...")
     plot_comparative_lines(all_metrics_by_scenario, OUTPUT_DIR)
 
     print("\nExporting LaTeX tables...")
     export_latex_tables(all_metrics_by_scenario, OUTPUT_DIR)
-
+    if args.rtt_quantiles:
+        print("\nExporting RTT distributions (quantile sketches)...")
+        export_rtt_percentiles(all_metrics_by_scenario, OUTPUT_DIR)
+        plot_rtt_distributions(all_metrics_by_scenario, OUTPUT_DIR)
+    if args.time_series:
+        print(f"\nExporting time series ({args.bin_seconds:g} s bins)...")
+        export_time_series(all_metrics_by_scenario, OUTPUT_DIR)
+        plot_time_series(all_metrics_by_scenario, OUTPUT_DIR)
+    wait_figures()
+
+    if failures:
+        print(f"\n[WARNING] {len(failures)} job(s) failed; those replicates were left out (no replicate -> zero metrics).")
+
+    stage_profile.write_profile("analise_cluster")
     print("\nAnalysis complete. Check the directory:", OUTPUT_DIR)
\ No newline at end of file
@@ -1,46 +1,115 @@
 import os
-import collections
 from itertools import combinations
 
-def process_log_file(filepath):
+import numpy as np
+import pandas as pd
+
+from log_open import open_log
+from score_store import open_score_store, store_winners
+
+# Usa o armazenamento binário incremental '<csv>.store' (score_store.py) em vez de reler o texto
+USE_SCORE_STORE = True
+
+def read_score_history(filepath):
     """
-    Lê um arquivo de log, agrupa por timestamp e encontra o NodeID com o maior FinalScore para cada timestamp.
-    Retorna um dicionário: {timestamp: best_node_id}
+    Lê um score_history_<MÉTODO>.csv (ns,ID,<critérios...>,ICR) com o parser C do pandas,
+    carregando apenas ns, ID e a última coluna (FinalScore).
+    Linhas com ns/ID não numéricos são descartadas.
+    Retorna DataFrame (ns int64, node_id int64, score float64) na ordem do arquivo.
+    """
+    with open_log(filepath) as f:
+        header = f.readline().strip().split(',')
+        if len(header) < 3:  # Precisa de pelo menos ns, ID, ICR
+            return pd.DataFrame({'ns': np.array([], dtype=np.int64), 'node_id': np.array([], dtype=np.int64),
+                                 'score': np.array([], dtype=np.float64)})
+
+        # Continua do arquivo já aberto (o CSV pode estar comprimido)
+        df = pd.read_csv(f, header=None, names=header, usecols=[0, 1, len(header) - 1], skipinitialspace=True)
+    df.columns = ['ns', 'node_id', 'score']
+    for column in df.columns:
+        if not pd.api.types.is_numeric_dtype(df[column]):
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+    df = df.dropna(subset=['ns', 'node_id'])
+    return pd.DataFrame({
+        'ns': df['ns'].to_numpy(dtype=np.int64),
+        'node_id': df['node_id'].to_numpy(dtype=np.int64),
+        'score': df['score'].to_numpy(dtype=np.float64),
+    })
+
+def select_winners(ns, node_ids, scores):
     """
+    Argmax por timestamp: para cada ns, o nó com o maior score (empate -> primeiro na
+    ordem do arquivo; scores NaN nunca vencem um score válido).
+    Retorna Series {ns: node_id} ordenada por ns.
+    """
+    if len(ns) == 0:
+        return pd.Series(np.array([], dtype=np.int64), index=pd.Index(np.array([], dtype=np.int64), name='ns'))
+    # lexsort é estável: dentro do mesmo (ns, score) mantém a ordem do arquivo
+    order = np.lexsort((-scores, ns))
+    sorted_ns = ns[order]
+    first = np.flatnonzero(np.r_[True, sorted_ns[1:] != sorted_ns[:-1]])
+    return pd.Series(node_ids[order[first]], index=pd.Index(sorted_ns[first], name='ns'))
+
+def compute_winners(filepath):
+    """Lê o CSV e retorna Series {timestamp: best_node_id} (vazia se o arquivo não existir)."""
     print(f"Processando arquivo: {filepath}...")
-    
-    decisions_at_time = collections.defaultdict(list)
-    
     try:
-        with open(filepath, 'r') as f:
-            next(f)
-            
-            for line in f:
-                try:
-                    parts = line.strip().split(',')
-                    if len(parts) < 3: # Precisa de pelo menos ns, ID, ICR
-                        continue
-                        
-                    timestamp = int(parts[0])
-                    node_id = int(parts[1])
-                    final_score = float(parts[-1])
-                    
-                    decisions_at_time[timestamp].append({'node_id': node_id, 'score': final_score})
-                except (ValueError, IndexError):
-                    continue
-
+        if USE_SCORE_STORE:
+            winners = store_winners(open_score_store(filepath))
+        else:
+            df = read_score_history(filepath)
+            winners = select_winners(df['ns'].to_numpy(), df['node_id'].to_numpy(), df['score'].to_numpy())
     except FileNotFoundError:
         print(f"  - ERRO: Arquivo não encontrado: {filepath}")
-        return {}
+        return select_winners(np.array([], dtype=np.int64), None, None)
 
-    best_choices = {}
-    for timestamp, candidates in decisions_at_time.items():
-        if candidates:
-            best_candidate = max(candidates, key=lambda x: x['score'])
-            best_choices[timestamp] = best_candidate['node_id']
-            
-    print(f"  - Análise concluída. {len(best_choices)} pontos de decisão encontrados.")
-    return best_choices
+    print(f"  - Análise concluída. {len(winners)} pontos de decisão encontrados.")
+    return winners
+
+def process_log_file(filepath):
+    """
+    Lê um arquivo de log, agrupa por timestamp e encontra o NodeID com o maior FinalScore para cada timestamp.
+    Retorna um dicionário: {timestamp: best_node_id}
+    """
+    winners = compute_winners(filepath)
+    return dict(zip(winners.index.tolist(), winners.tolist()))
+
+def align_winners(winners_by_method):
+    """
+    Alinha os vencedores de todos os métodos no índice comum de timestamps.
+    Retorna (timestamps, matriz T x N de node_id, com -1 onde o método não decidiu).
+    """
+    methods = list(winners_by_method)
+    timestamps = np.unique(np.concatenate(
+        [winners_by_method[m].index.to_numpy(dtype=np.int64) for m in methods] or [np.array([], dtype=np.int64)]))
+    matrix = np.full((len(timestamps), len(methods)), -1, dtype=np.int64)
+    for j, method in enumerate(methods):
+        winners = winners_by_method[method]
+        rows = np.searchsorted(timestamps, winners.index.to_numpy(dtype=np.int64))
+        matrix[rows, j] = winners.to_numpy(dtype=np.int64)
+    return timestamps, matrix
+
+def agreement_matrices(matrix):
+    """
+    Concordância par a par N x N com comparações de arrays.
+    Retorna (pontos, concordâncias): pontos[i, j] = timestamps em que i e j decidiram,
+    concordâncias[i, j] = timestamps em que ambos escolheram o mesmo nó.
+    """
+    present = matrix >= 0
+    n_methods = matrix.shape[1]
+    points = np.zeros((n_methods, n_methods), dtype=np.int64)
+    agreements = np.zeros((n_methods, n_methods), dtype=np.int64)
+    for i in range(n_methods):
+        both = present[:, i:i + 1] & present
+        points[i] = both.sum(axis=0)
+        agreements[i] = ((matrix[:, i:i + 1] == matrix) & both).sum(axis=0)
+    return points, agreements
+
+def total_agreement(matrix):
+    """Retorna (pontos com todos os métodos presentes, pontos em que todos escolheram o mesmo nó)."""
+    all_present = (matrix >= 0).all(axis=1)
+    rows = matrix[all_present]
+    return int(all_present.sum()), int((rows == rows[:, :1]).all(axis=1).sum())
 
 # --- BLOCO PRINCIPAL DE EXECUÇÃO ---
 if __name__ == "__main__":
@@ -54,51 +123,26 @@ if __name__ == "__main__":
     }
     # =================================================================
 
-    all_best_choices = {}
-    all_timestamps = set()
+    all_winners = {}
 
     method_names = list(LOG_FILES.keys())
     for method in method_names:
         filename = LOG_FILES[method]
         if os.path.exists(filename):
-            best_choices = process_log_file(filename)
-            all_best_choices[method] = best_choices
-            all_timestamps.update(best_choices.keys())
+            all_winners[method] = compute_winners(filename)
         else:
             print(f"Aviso: O arquivo '{filename}' não foi encontrado. O método {method} será ignorado.")
 
-    if not all_best_choices:
+    if not all_winners:
         print("\nNenhum arquivo de log válido foi encontrado. Encerrando.")
     else:
-        agreement_counts = collections.defaultdict(int)
-        comparison_points = collections.defaultdict(int)
-        
+        methods = list(all_winners.keys())
+        timestamps, winner_matrix = align_winners(all_winners)
+        pair_points, pair_agreements = agreement_matrices(winner_matrix)
+        total_points, total_count = total_agreement(winner_matrix)
+
         # Gera todas as combinações de pares possíveis entre os métodos
-        pairs_to_compare = list(combinations(all_best_choices.keys(), 2))
-        
-        for timestamp in sorted(list(all_timestamps)):
-            methods_present = [m for m in all_best_choices if timestamp in all_best_choices[m]]
-            
-            # --- LÓGICA PARA CONCORDÂNCIA PAR A PAR ---
-            if len(methods_present) >= 2:
-                for method1, method2 in pairs_to_compare:
-                    if method1 in methods_present and method2 in methods_present:
-                        comparison_points[f"{method1}_vs_{method2}"] += 1
-                        
-                        choice1 = all_best_choices[method1][timestamp]
-                        choice2 = all_best_choices[method2][timestamp]
-                        
-                        if choice1 == choice2:
-                            agreement_counts[f"{method1}_vs_{method2}"] += 1
-            
-            # --- LÓGICA PARA CONCORDÂNCIA TOTAL (TODOS OS 4) ---
-            if len(methods_present) == len(all_best_choices):
-                comparison_points["Todos"] += 1
-                
-                choices = [all_best_choices[m][timestamp] for m in methods_present]
-                # Verifica se todos os elementos da lista são iguais
-                if all(c == choices[0] for c in choices):
-                    agreement_counts["Todos"] += 1
+        pairs_to_compare = list(combinations(range(len(methods)), 2))
 
         print("\n--- Relatório de Concordância na Seleção de Relay ---")
         
@@ -108,30 +152,35 @@ if __name__ == "__main__":
         print("| Comparação          | Concordância  | Porcentagem |")
         print("---------------------------------------------------")
         
-        for method1, method2 in pairs_to_compare:
-            key = f"{method1}_vs_{method2}"
-            points = comparison_points.get(key, 0)
-            count = agreement_counts.get(key, 0)
+        for i, j in pairs_to_compare:
+            method1, method2 = methods[i], methods[j]
+            points = pair_points[i, j]
+            count = pair_agreements[i, j]
             percentage = (count / points) * 100 if points > 0 else 0
             
             print(f"| {method1:<9} vs. {method2:<9} | {count:<13} | {percentage:10.2f}% |")
         
         print("---------------------------------------------------")
 
+        # --- MATRIZ N x N (porcentagem de concordância sobre os pontos em comum) ---
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percentages = np.where(pair_points > 0, pair_agreements / pair_points * 100, 0.0)
+        print("\n--- Matriz de Concordância (%) ---")
+        print(pd.DataFrame(percentages, index=methods, columns=methods).round(2).to_string())
+
         # --- RESULTADO DA CONCORDÂNCIA TOTAL ---
-        total_points = comparison_points.get("Todos", 0)
         if total_points > 0:
-            print(f"\nTotal de pontos de decisão onde todos os {len(all_best_choices)} métodos estavam presentes: {total_points}\n")
+            print(f"\nTotal de pontos de decisão onde todos os {len(all_winners)} métodos estavam presentes: {total_points}\n")
             print("--- Concordância Total ---")
             print("-----------------------------------------------------------------")
             print("| Comparação                  | Concordância  | Porcentagem     |")
             print("-----------------------------------------------------------------")
             
-            count = agreement_counts.get("Todos", 0)
+            count = total_count
             percentage = (count / total_points) * 100 if total_points > 0 else 0
             
             comparison_label = "Todos os Métodos"
             print(f"| {comparison_label:<27} | {count:<13} | {percentage:10.2f}%       |")
             print("-----------------------------------------------------------------")
         else:
-            print(f"\nNenhum ponto de decisão encontrado onde todos os {len(all_best_choices)} métodos estivessem presentes.")
\ No newline at end of file
+            print(f"\nNenhum ponto de decisão encontrado onde todos os {len(all_winners)} métodos estivessem presentes.")
\ No newline at end of file
@@ -1,32 +1,136 @@
 import pandas as pd
-import matplotlib.pyplot as plt
 import os
 import numpy as np
 
-def analyze_election_history(filepath):
+from batch_render import render_figure, wait_figures
+from log_open import open_log
+from score_store import open_score_store, store_winners
+
+# Usa o armazenamento binário incremental '<csv>.store' (score_store.py) em vez de reler o texto
+USE_SCORE_STORE = True
+# Linhas lidas por bloco: o pico de memória é limitado pelo bloco, não pelo tamanho do CSV
+STREAM_CHUNK_ROWS = 1_000_000
+
+
+class UnorderedHistory(ValueError):
+    """O score_history tem 'ns' fora de ordem (ex.: várias simulações acrescentadas ao mesmo CSV)."""
+
+
+def _iter_score_chunks(filepath, chunksize):
+    """Gera (ns, ID, score) de cada bloco do CSV, lendo apenas essas colunas com tipos explícitos."""
+    with open_log(filepath) as f:
+        header = f.readline().strip().split(',')
+        score_column = header[-1]
+        print(f"Usando a coluna '{score_column}' para determinar o vencedor.")
+
+        # O leitor continua do arquivo já aberto (logo após o cabeçalho): o CSV pode estar comprimido
+        reader = pd.read_csv(f, header=None, names=header, usecols=['ns', 'ID', score_column], chunksize=chunksize,
+                             dtype={'ns': np.int64, 'ID': np.int64, score_column: np.float64})
+        for chunk in reader:
+            yield chunk['ns'].to_numpy(), chunk['ID'].to_numpy(), chunk[score_column].to_numpy()
+
+
+def _first_best(ns, scores):
+    """
+    Posição do vencedor de cada ns, em ordem de ns: ordenação estável por (ns, -score),
+    então empates ficam com a primeira posição e NaN nunca vence um score válido.
+    """
+    order = np.lexsort((-np.where(np.isnan(scores), -np.inf, scores), ns))
+    return order[np.flatnonzero(np.r_[True, ns[order][1:] != ns[order][:-1]])]
+
+
+def iter_chunk_winners(filepath, chunksize=STREAM_CHUNK_ROWS):
+    """
+    Percorre o score_history em blocos, lendo apenas ns, ID e a coluna de score
+    (última coluna), e gera os IDs vencedores de cada bloco.
+
+    LogAllScores grava as linhas de uma simulação em ordem de tempo, então um 'ns' só
+    pode continuar no bloco seguinte se for o último do bloco: o melhor candidato desse
+    ns é carregado para o próximo bloco. Empates ficam com a primeira linha do arquivo
+    (como idxmax) e scores NaN nunca vencem um score válido.
+    Lança UnorderedHistory se 'ns' voltar atrás (use global_winners nesse caso).
+    """
+    carry = None  # (ns, ID, score) do melhor candidato do último ns ainda aberto
+    for ns, ids, scores in _iter_score_chunks(filepath, chunksize):
+        if carry is not None:
+            ns = np.concatenate(([carry[0]], ns))
+            ids = np.concatenate(([carry[1]], ids))
+            scores = np.concatenate(([carry[2]], scores))
+        if len(ns) == 0:
+            continue
+        if np.any(ns[1:] < ns[:-1]):
+            position = int(np.flatnonzero(ns[1:] < ns[:-1])[0]) + 1
+            raise UnorderedHistory(f"'ns' fora de ordem em {filepath}: {ns[position - 1]} seguido de {ns[position]}")
+
+        first = _first_best(ns, scores)
+        carry = (ns[first[-1]], ids[first[-1]], scores[first[-1]])
+        yield ids[first[:-1]]
+
+    if carry is not None:
+        yield np.array([carry[1]], dtype=np.int64)
+
+
+def global_winners(filepath, chunksize=STREAM_CHUNK_ROWS):
+    """
+    Vencedores de um CSV em qualquer ordem de 'ns', agrupando o arquivo inteiro por ns
+    (como groupby('ns').idxmax()). O melhor candidato de cada ns já visto é carregado de
+    bloco em bloco: a memória cresce com o número de ns distintos, não de linhas.
+    Os candidatos carregados vêm antes do bloco, então empates continuam com a primeira linha.
+    """
+    best_ns = np.empty(0, dtype=np.int64)
+    best_ids = np.empty(0, dtype=np.int64)
+    best_scores = np.empty(0, dtype=np.float64)
+    for ns, ids, scores in _iter_score_chunks(filepath, chunksize):
+        ns = np.concatenate((best_ns, ns))
+        ids = np.concatenate((best_ids, ids))
+        scores = np.concatenate((best_scores, scores))
+        first = _first_best(ns, scores)
+        best_ns, best_ids, best_scores = ns[first], ids[first], scores[first]
+    yield best_ids
+
+
+def iter_store_winners(filepath):
+    """Vencedores a partir do armazenamento binário (convertendo só as linhas novas do CSV)."""
+    store = open_score_store(filepath)
+    print(f"Usando a coluna '{store['score_column']}' para determinar o vencedor.")
+    yield store_winners(store).to_numpy()
+
+
+def count_winners(chunk_winners):
+    """Soma os vencedores de cada bloco: {ID: vitórias}, na ordem da primeira vitória."""
+    counts = {}
+    for winner_ids in chunk_winners:
+        unique_ids, first_index, unique_counts = np.unique(winner_ids, return_index=True, return_counts=True)
+        for position in np.argsort(first_index, kind='stable'):
+            vehicle_id = int(unique_ids[position])
+            counts[vehicle_id] = counts.get(vehicle_id, 0) + int(unique_counts[position])
+    return counts
+
+
+def analyze_election_history(filepath, chunksize=STREAM_CHUNK_ROWS):
     """
     Lê um arquivo de histórico de scores, identifica o vencedor em cada
     momento de decisão e conta o número de vitórias de cada veículo.
+    Com USE_SCORE_STORE lê as colunas binárias em memória mapeada; senão o CSV
+    é processado em blocos de 'chunksize' linhas (memória constante) e, se 'ns'
+    voltar atrás (simulações acrescentadas ao mesmo CSV), agrupado inteiro por ns.
     """
     print(f"Analisando o arquivo: {filepath}...")
     try:
-        # Lê o arquivo CSV
-        df = pd.read_csv(filepath)
-
-        # O nome da coluna de score é a última coluna do dataframe
-        score_column = df.columns[-1]
-        print(f"Usando a coluna '{score_column}' para determinar o vencedor.")
-
-        # Para cada timestamp ('ns'), encontra o índice da linha com o maior score
-        idx_winners = df.groupby('ns')[score_column].idxmax()
-
-        # Seleciona as linhas dos vencedores
-        winners_df = df.loc[idx_winners]
+        # Contagem por ID, na ordem da primeira vitória
+        if USE_SCORE_STORE:
+            counts = count_winners(iter_store_winners(filepath))
+        else:
+            try:
+                counts = count_winners(iter_chunk_winners(filepath, chunksize))
+            except UnorderedHistory as e:
+                print(f"Aviso: {e}. Agrupando o arquivo inteiro por 'ns'.")
+                counts = count_winners(global_winners(filepath, chunksize))
 
         # Conta quantas vezes cada ID de veículo aparece como vencedor
-        election_counts = winners_df['ID'].value_counts()
-        
-        return election_counts
+        election_counts = pd.Series(counts, dtype=np.int64, name='count')
+        election_counts.index.name = 'ID'
+        return election_counts.sort_values(ascending=False, kind='stable')
 
     except FileNotFoundError:
         print(f"ERRO: Arquivo não encontrado: {filepath}")
@@ -53,14 +157,19 @@ def plot_election_chart(results, top_n=10):
     # Remove a coluna 'Total' antes de plotar
     top_vehicles_df = top_vehicles_df.drop(columns=['Total'])
 
-    # --- Plotagem ---
+    output_filename = "grafico_eleicoes.png"
+    render_figure(draw_election_chart, output_filename, (14, 8), top_vehicles_df)
+
+
+def draw_election_chart(fig, top_vehicles_df):
+    """Desenha as barras agrupadas (veículos x métodos) na figura."""
     methods = top_vehicles_df.columns
     vehicle_ids = top_vehicles_df.index.astype(str)
     
     x = np.arange(len(vehicle_ids))  # Posições dos grupos de barras
     width = 0.20  # Largura de cada barra individual
     
-    fig, ax = plt.subplots(figsize=(14, 8))
+    ax = fig.subplots()
 
     # Cria as barras para cada método, deslocando a posição x
     for i, method in enumerate(methods):
@@ -81,12 +190,6 @@ def plot_election_chart(results, top_n=10):
 
     fig.tight_layout()
 
-    output_filename = "grafico_eleicoes.png"
-    plt.savefig(output_filename, dpi=300)
-    print(f"\nGráfico salvo como '{output_filename}'")
-    
-    plt.show()
-
 
 if __name__ == "__main__":
     # CONFIGURAÇÃO
@@ -107,5 +210,6 @@ if __name__ == "__main__":
             
     if all_election_counts:
         plot_election_chart(all_election_counts, top_n=10)
+        wait_figures()
     else:
         print("\nNenhum dado para plotar. Verifique os caminhos dos arquivos.")
\ No newline at end of file
@@ -1,8 +1,16 @@
-import re
 import os
-import pandas as pd
 import plotly.graph_objects as go
 
+from heavy_hitters import SpaceSaving
+from ingestao_base_station import ingest_base_station_log
+
+# Poda do Sankey: só os SANKEY_TOP_K maiores fluxos (None = todos) com pelo menos
+# SANKEY_MIN_SHARE do total (fração, 0 = sem limite) viram links próprios; a cauda é
+# agrupada nos nós "Outros", mantendo o HTML leve qualquer que seja o tamanho da frota.
+SANKEY_TOP_K = 200
+SANKEY_MIN_SHARE = 0.0
+OTHER_LABEL = "Outros"
+
 def parse_flow_data(filepath, bs_id, event_id):
     """
     Lê o log da BaseStation e extrai as tuplas de fluxo: (MonitorId, From_Id).
@@ -13,40 +21,47 @@ def parse_flow_data(filepath, bs_id, event_id):
     
     flows = {}
     
-    log_pattern = re.compile(
-        r'Node #(?P<bs_id>\d+): '
-        r'.*?From = (?P<from_id>\d+)'
-        r'.*?MonitorId = (?P<monitor_id>\d+)'
-        r'.*?EventId = (?P<event_id>\d+)'
-    )
-
     try:
-        with open(filepath, 'r') as f:
-            for line in f:
-                match = log_pattern.search(line)
-                if match:
-                    data = match.groupdict()
-                    current_bs_id = int(data['bs_id'])
-                    current_event_id = int(data['event_id'])
-                    
-                    if current_bs_id == bs_id and current_event_id == event_id:
-                        monitor_id = int(data['monitor_id'])
-                        from_id = int(data['from_id'])
-                        
-                        # A chave é a tupla (origem, entregador_final)
-                        flow_key = (monitor_id, from_id)
-                        flows[flow_key] = flows.get(flow_key, 0) + 1
-                        
+        # A chave é a tupla (origem, entregador_final)
+        counted = ingest_base_station_log(filepath, bs_id, event_id)['flows']
+        flows = dict(counted)
+        if isinstance(counted, SpaceSaving) and not counted.exact:
+            print(f"Fluxos contados com Space-Saving ({counted.capacity} pares): "
+                  f"contagens superestimadas em até {counted.max_error()}")
     except FileNotFoundError:
         print(f"ERRO: Arquivo não encontrado: {filepath}")
         
-    print(f"Fluxos encontrados: {flows}")
+    print(f"Fluxos encontrados: {len(flows)} pares (detector, retransmissor), "
+          f"{sum(flows.values())} mensagens")
     return flows
 
-def plot_sankey_diagram(all_data, methods_in_order, bs_id):
+def consolidate_flows(all_data):
+    """Soma os fluxos de todos os métodos, na ordem da primeira aparição."""
+    consolidated_flows = {}
+    for flows in all_data.values():
+        for key, count in flows.items():
+            consolidated_flows[key] = consolidated_flows.get(key, 0) + count
+    return consolidated_flows
+
+def prune_flows(flows, top_k=None, min_share=0.0):
+    """
+    Mantém os top_k maiores fluxos (None = todos) com pelo menos min_share do total.
+    Retorna (fluxos mantidos, na ordem original; total da cauda; quantidade de fluxos da cauda).
+    """
+    total = sum(flows.values())
+    ranked = sorted(flows, key=flows.get, reverse=True)
+    if top_k is not None:
+        ranked = ranked[:top_k]
+    threshold = min_share * total
+    kept = {key for key in ranked if flows[key] >= threshold}
+    kept_flows = {key: count for key, count in flows.items() if key in kept}
+    return kept_flows, total - sum(kept_flows.values()), len(flows) - len(kept_flows)
+
+def plot_sankey_diagram(all_data, methods_in_order, bs_id, top_k=None, min_share=None):
     """
     Cria um Diagrama de Sankey mostrando o fluxo de mensagens
     do nó detector para o nó entregador final.
+    top_k/min_share: poda dos fluxos (padrão: SANKEY_TOP_K/SANKEY_MIN_SHARE).
     """
     if not all_data:
         print("Nenhum dado de fluxo para plotar.")
@@ -69,24 +84,35 @@ def plot_sankey_diagram(all_data, methods_in_order, bs_id):
     # Adicionar a RSU como o destino final
     bs_index = get_node_index(bs_id, "RSU ")
 
-    # Consolidar os fluxos de todos os métodos
-    consolidated_flows = {}
-    for method, flows in all_data.items():
-        for (monitor_id, from_id), count in flows.items():
-            key = (monitor_id, from_id)
-            consolidated_flows[key] = consolidated_flows.get(key, 0) + count
+    # Consolidar os fluxos de todos os métodos e podar a cauda
+    consolidated_flows = consolidate_flows(all_data)
+    kept_flows, other_count, other_flows = prune_flows(
+        consolidated_flows,
+        SANKEY_TOP_K if top_k is None else top_k,
+        SANKEY_MIN_SHARE if min_share is None else min_share)
 
-    # Construir as listas para o Sankey
-    for (monitor_id, from_id), count in consolidated_flows.items():
-        # Fluxo do Detector -> Entregador
+    # Construir as listas para o Sankey: um link por fluxo Detector -> Entregador e
+    # um único link por Entregador -> RSU, com a soma dos fluxos que passam por ele
+    delivered = {}
+    for (monitor_id, from_id), count in kept_flows.items():
         detector_index = get_node_index(monitor_id, "Detector ")
         retransmitter_index = get_node_index(from_id, "Retransmissor ")
         
         sources.append(detector_index)
         targets.append(retransmitter_index)
         values.append(count)
-        
-        # Fluxo do Entregador -> RSU
+        delivered[retransmitter_index] = delivered.get(retransmitter_index, 0) + count
+
+    if other_flows:
+        print(f"{other_flows} fluxos menores ({other_count} mensagens) agrupados em '{OTHER_LABEL}'")
+        detector_index = get_node_index(f"({other_flows} fluxos)", f"Detector {OTHER_LABEL} ")
+        retransmitter_index = get_node_index(OTHER_LABEL, "Retransmissor ")
+        sources.append(detector_index)
+        targets.append(retransmitter_index)
+        values.append(other_count)
+        delivered[retransmitter_index] = delivered.get(retransmitter_index, 0) + other_count
+
+    for retransmitter_index, count in delivered.items():
         sources.append(retransmitter_index)
         targets.append(bs_index)
         values.append(count)
@@ -122,8 +148,13 @@ if __name__ == "__main__":
     EVENT_ID_TO_ANALYZE = 0 
     BASE_LOG_PATH = "." 
     METHODS = ["AHP", "PROMETHEE", "TOPSIS", "BORDA"]
+    # > 0: conta os fluxos com memória limitada (Space-Saving com até N pares por método)
+    FLOW_CAPACITY = 0
     # =================================================================
 
+    import ingestao_base_station
+    ingestao_base_station.FLOW_CAPACITY = FLOW_CAPACITY
+
     all_flow_data = {}
     
     for method in METHODS:
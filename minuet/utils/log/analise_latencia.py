@@ -1,8 +1,30 @@
-import matplotlib.pyplot as plt
 import re
 import os
+import numpy as np
 import pandas as pd
 
+import stage_profile
+from batch_render import render_figure, wait_figures
+from ingestao_base_station import ingest_base_station_log, iter_records
+from log_open import open_log
+from quantile_sketch import DEFAULT_K, KLLSketch, load_sketch, merge_sketches, percentile_row, save_sketch
+from replicas import discover_replicates, file_fingerprint
+from stage_profile import profiled
+
+# Padrão para a primeira detecção
+DETECTION_PATTERN = re.compile(
+    r'^(?P<time_ns>\d+)ns - DetectionLayer - Node #(?P<node_id>\d+).*?: '
+    r'Event \((?P<event_id>\d+)\) Detected'
+)
+
+DELIVERY_COLUMNS = ['bs_id', 'delivery_ns', 'monitor_id', 'event_id', 'seq']
+CREATION_COLUMNS = ['monitor_id', 'event_id', 'creation_ns']
+
+# Latências acumuladas antes de cada atualização do sketch
+SKETCH_BLOCK = 65536
+LATENCY_PERCENTILES = (5, 25, 50, 75, 95, 99)
+
+@profiled(path_arg=0)
 def parse_creation_times(filepath, event_id_to_analyze):
     """
     Lê o log do DetectionLayer para encontrar o timestamp da PRIMEIRA detecção
@@ -12,16 +34,11 @@ def parse_creation_times(filepath, event_id_to_analyze):
     print(f"Analisando tempos de criação em: {filepath}...")
     
     creation_times = {}
-    
-    # Padrão para a primeira detecção
-    pattern = re.compile(
-        r'^(?P<time_ns>\d+)ns - DetectionLayer - Node #(?P<node_id>\d+).*?: '
-        r'Event \((?P<event_id>\d+)\) Detected'
-    )
+    pattern = DETECTION_PATTERN
 
     try:
-        with open(filepath, 'r') as f:
-            for line in f:
+        with open_log(filepath) as f:
+            for line in stage_profile.iter_lines(f):
                 match = pattern.search(line)
                 if match:
                     data = match.groupdict()
@@ -43,57 +60,203 @@ def parse_creation_times(filepath, event_id_to_analyze):
     print(f"Tempos de criação encontrados: {creation_times}")
     return creation_times
 
-def calculate_latencies(filepath, bs_id, creation_times):
+@profiled(path_arg=0)
+def parse_all_creation_times(filepath):
+    """
+    Lê o log do DetectionLayer uma única vez e indexa a PRIMEIRA detecção de
+    todos os eventos por cada nó.
+    Retorna um dicionário: {(monitor_id, event_id): creation_time_ns}
+    """
+    print(f"Analisando tempos de criação (todos os eventos) em: {filepath}...")
+    creation_times = {}
+    search = DETECTION_PATTERN.search
+    try:
+        with open_log(filepath) as f:
+            for line in stage_profile.iter_lines(f):
+                match = search(line)
+                if match:
+                    event_key = (int(match.group('node_id')), int(match.group('event_id')))
+                    if event_key not in creation_times:
+                        creation_times[event_key] = int(match.group('time_ns'))
+    except FileNotFoundError:
+        print(f"ERRO: Arquivo não encontrado: {filepath}")
+
+    print(f"Tempos de criação encontrados: {len(creation_times)} pares (monitor, evento).")
+    return creation_times
+
+def creation_times_frame(creation_times):
+    """Converte {(monitor_id, event_id): creation_ns} em DataFrame (monitor_id, event_id, creation_ns)."""
+    return pd.DataFrame(
+        [(monitor_id, event_id, time_ns) for (monitor_id, event_id), time_ns in creation_times.items()],
+        columns=CREATION_COLUMNS, dtype='int64')
+
+@profiled(path_arg=0)
+def read_deliveries(filepath):
+    """
+    Lê o log da BaseStation uma única vez e retorna todas as entregas (de todas as BS e eventos),
+    na ordem do arquivo: DataFrame (bs_id, delivery_ns, monitor_id, event_id, seq).
+    """
+    records = [(bs_id, time_ns, monitor_id, event_id, seq)
+               for time_ns, bs_id, _, monitor_id, seq, event_id in iter_records(filepath)]
+    return pd.DataFrame(records, columns=DELIVERY_COLUMNS, dtype='int64')
+
+@profiled()
+def join_latencies(deliveries, creations):
+    """
+    Junta (hash join) cada entrega ao tempo de criação do seu (monitor_id, event_id).
+    Latências negativas são descartadas e cada mensagem (bs_id, monitor_id, event_id, seq)
+    conta uma única vez: a primeira entrega válida na ordem do log.
+    Retorna DataFrame com as colunas de entrega + creation_ns e latency_ms.
+    """
+    table = deliveries.merge(creations, on=['monitor_id', 'event_id'], how='inner', sort=False)
+    table['latency_ms'] = (table['delivery_ns'] - table['creation_ns']) / 1_000_000.0
+    table = table[table['latency_ms'] >= 0]
+    table = table.drop_duplicates(['bs_id', 'monitor_id', 'event_id', 'seq'], keep='first')
+    return table.reset_index(drop=True)
+
+@profiled()
+def build_latency_table(detection_log_path, bs_log_path):
+    """
+    Calcula as latências de todos os eventos e de todas as estações base com uma única
+    leitura de cada log. Distribuições por evento/BS são filtros ou groupby sobre a tabela.
+    """
+    creations = creation_times_frame(parse_all_creation_times(detection_log_path))
+    print(f"Calculando latências em: {bs_log_path}...")
+    try:
+        deliveries = read_deliveries(bs_log_path)
+    except FileNotFoundError:
+        print(f"ERRO: Arquivo não encontrado: {bs_log_path}")
+        deliveries = pd.DataFrame(columns=DELIVERY_COLUMNS, dtype='int64')
+
+    table = join_latencies(deliveries, creations)
+    print(f"Latências calculadas: {len(table)} mensagens "
+          f"({table['event_id'].nunique()} eventos, {table['bs_id'].nunique()} estações base).")
+    return table
+
+@profiled()
+def summarize_latencies(table):
+    """Resumo por (bs_id, event_id): contagem, média, mediana, p95 e máximo em ms."""
+    grouped = table.groupby(['bs_id', 'event_id'])['latency_ms']
+    return grouped.agg(
+        count='count', mean='mean', median='median',
+        p95=lambda values: values.quantile(0.95), max='max')
+
+@profiled(path_arg=0)
+def calculate_latencies(filepath, bs_id, creation_times, event_id=None):
     """
     Lê o log da BaseStation, compara com os tempos de criação e calcula as latências
     para cada mensagem única.
+    'event_id' só serve para compartilhar a leitura do log com os demais consumidores
+    de ingestao_base_station; as entregas de todos os eventos da BS são consideradas.
     Retorna uma lista de latências em milissegundos.
     """
     print(f"Calculando latências em: {filepath}...")
-    latencies = []
-    processed_messages = set() # Para evitar calcular latência para duplicatas
-    
-    pattern = re.compile(
-        r'^(?P<time_ns>\d+)ns - BASE STATION - Node #(?P<bs_id>\d+): '
-        r'.*?MonitorId = (?P<monitor_id>\d+)'
-        r'.*?Seq = (?P<seq>\d+)'
-        r'.*?EventId = (?P<event_id>\d+)'
-    )
-
     try:
-        with open(filepath, 'r') as f:
-            for line in f:
-                match = pattern.search(line)
-                if match:
-                    data = match.groupdict()
-                    current_bs_id = int(data['bs_id'])
-                    
-                    if current_bs_id == bs_id:
-                        monitor_id = int(data['monitor_id'])
-                        event_id = int(data['event_id'])
-                        seq = int(data['seq'])
-                        delivery_time_ns = int(data['time_ns'])
-                        
-                        event_key = (monitor_id, event_id)
-                        message_key = (monitor_id, event_id, seq)
-
-                        # Se temos o tempo de criação para este evento e ainda não processamos esta mensagem
-                        if event_key in creation_times and message_key not in processed_messages:
-                            creation_time_ns = creation_times[event_key]
-                            
-                            # Calcula a latência e converte para milissegundos
-                            latency_ns = delivery_time_ns - creation_time_ns
-                            latency_ms = latency_ns / 1_000_000.0
-                            
-                            if latency_ms >= 0: # Ignora casos anômalos
-                                latencies.append(latency_ms)
-                                processed_messages.add(message_key)
+        deliveries = ingest_base_station_log(filepath, bs_id, event_id)['deliveries']
     except FileNotFoundError:
         print(f"ERRO: Arquivo não encontrado: {filepath}")
+        deliveries = []
+
+    # Lista de tuplas ou, no modo incremental, array (entregas x 4): time_ns, monitor_id, event_id, seq
+    rows = np.asarray(deliveries, dtype=np.int64).reshape(-1, 4)
+    deliveries = pd.DataFrame({'bs_id': np.full(len(rows), bs_id, dtype=np.int64), 'delivery_ns': rows[:, 0],
+                               'monitor_id': rows[:, 1], 'event_id': rows[:, 2], 'seq': rows[:, 3]},
+                              columns=DELIVERY_COLUMNS)
+    latencies = join_latencies(deliveries, creation_times_frame(creation_times))['latency_ms'].tolist()
 
     print(f"Latências calculadas: {len(latencies)} mensagens.")
     return latencies
 
+@profiled(path_arg=1)
+def sketch_latencies(detection_log_path, bs_log_path, bs_id, event_id=None, k=DEFAULT_K):
+    """
+    Mesmas latências de build_latency_table (filtradas por BS e, se dado, por evento), mas em
+    fluxo: cada latência vai direto para um sketch de quantis (KLL) e só as chaves das
+    mensagens já contadas ficam em memória. Retorna o KLLSketch (ms).
+    """
+    creation_times = parse_all_creation_times(detection_log_path)
+    print(f"Resumindo latências (sketch KLL, k={k}) em: {bs_log_path}...")
+    sketch = KLLSketch(k)
+    seen = set()
+    block = []
+    for time_ns, record_bs, _, monitor_id, seq, record_event in iter_records(bs_log_path, bs_id):
+        if record_bs != bs_id or (event_id is not None and record_event != event_id):
+            continue
+        creation_ns = creation_times.get((monitor_id, record_event))
+        if creation_ns is None or time_ns < creation_ns:
+            continue
+        message = (monitor_id, record_event, seq)
+        if message in seen:
+            continue
+        seen.add(message)
+        block.append(time_ns - creation_ns)
+        if len(block) >= SKETCH_BLOCK:
+            sketch.update(np.asarray(block, dtype=np.int64) / 1_000_000.0)
+            block.clear()
+    if block:
+        sketch.update(np.asarray(block, dtype=np.int64) / 1_000_000.0)
+    print(f"Latências resumidas: {sketch.n} mensagens.")
+    return sketch
+
+def run_latency_sketch(run_dir, bs_id, event_id=None, k=DEFAULT_K):
+    """
+    Sketch das latências de uma execução (diretório com os dois logs), persistido em
+    '<run_dir>/latencia_bs<id>_ev<id|all>.sketch.json' e reaproveitado enquanto os logs
+    e os parâmetros não mudarem.
+    """
+    detection_log_path = os.path.join(run_dir, "logFileDetectionLayer.log")
+    bs_log_path = os.path.join(run_dir, "logFileBaseStation.log")
+    source = {'detection': file_fingerprint(detection_log_path), 'bs': file_fingerprint(bs_log_path),
+              'bs_id': bs_id, 'event_id': event_id, 'k': k}
+    sketch_path = os.path.join(run_dir, f"latencia_bs{bs_id}_ev{'all' if event_id is None else event_id}.sketch.json")
+    sketch, metadata = load_sketch(sketch_path)
+    if sketch is not None and metadata.get('source') == source:
+        print(f"Reutilizando sketch de latências: {sketch_path}")
+        return sketch
+    sketch = sketch_latencies(detection_log_path, bs_log_path, bs_id, event_id, k)
+    save_sketch(sketch_path, sketch, source=source)
+    return sketch
+
+@profiled()
+def method_latency_sketch(method_dir, bs_id, event_id=None, k=DEFAULT_K):
+    """
+    Combina os sketches de todas as execuções de um método: o próprio diretório e cada
+    subdiretório (semente) com os dois logs. Retorna None se nenhuma execução for encontrada.
+    """
+    sketches = []
+    for _, bs_log_path in discover_replicates(os.path.join(method_dir, "logFileBaseStation.log")):
+        run_dir = os.path.dirname(bs_log_path)
+        if os.path.exists(os.path.join(run_dir, "logFileDetectionLayer.log")):
+            sketches.append(run_latency_sketch(run_dir, bs_id, event_id, k))
+    if not sketches:
+        return None
+    if len(sketches) > 1:
+        print(f"{len(sketches)} execuções combinadas em: {method_dir}")
+    return merge_sketches(sketches, k)
+
+def latency_percentile_table(sketches_by_method, methods_in_order, percentiles=LATENCY_PERCENTILES):
+    """Tabela de percentis (ms) por método e de todos os métodos combinados ('Todos')."""
+    methods = [m for m in methods_in_order if m in sketches_by_method]
+    rows = {m: percentile_row(sketches_by_method[m], percentiles) for m in methods}
+    if len(methods) > 1:
+        rows['Todos'] = percentile_row(
+            merge_sketches([sketches_by_method[m] for m in methods], sketches_by_method[methods[0]].k), percentiles)
+    return pd.DataFrame.from_dict(rows, orient='index')
+
+@profiled()
+def plot_latency_boxplot_from_sketches(sketches_by_method, methods_in_order):
+    """Boxplot das latências com as estatísticas lidas dos sketches (Axes.bxp)."""
+    methods_to_plot = [m for m in methods_in_order if m in sketches_by_method and len(sketches_by_method[m])]
+    if not methods_to_plot:
+        print("Nenhum dado de latência para plotar.")
+        return
+
+    stats = [sketches_by_method[m].boxplot_stats() for m in methods_to_plot]
+    output_filename = "grafico_latencia.png"
+    render_figure(draw_latency_bxp, output_filename, (12, 8), stats, methods_to_plot,
+                  message=f"\nGráfico de latência salvo como '{output_filename}'")
+
+@profiled()
 def plot_latency_boxplot(all_data, methods_in_order):
     """
     Cria um gráfico de boxplot para comparar a distribuição de latências entre os métodos.
@@ -106,10 +269,25 @@ def plot_latency_boxplot(all_data, methods_in_order):
         print("Nenhum dado de latência para plotar.")
         return
 
-    fig, ax = plt.subplots(figsize=(12, 8))
+    output_filename = "grafico_latencia.png"
+    render_figure(draw_latency_boxplot, output_filename, (12, 8), latency_data, methods_to_plot,
+                  message=f"\nGráfico de latência salvo como '{output_filename}'")
+
+def draw_latency_boxplot(fig, latency_data, methods_to_plot):
+    """Desenha o boxplot das latências (uma caixa por método) na figura."""
+    ax = fig.subplots()
     
     box = ax.boxplot(latency_data, patch_artist=True, showfliers=True) # showfliers=True para mostrar outliers
+    style_latency_boxplot(fig, ax, box, methods_to_plot)
 
+def draw_latency_bxp(fig, stats, methods_to_plot):
+    """Desenha o boxplot a partir de estatísticas já calculadas (uma por método)."""
+    ax = fig.subplots()
+    box = ax.bxp(stats, patch_artist=True, showfliers=True)
+    style_latency_boxplot(fig, ax, box, methods_to_plot)
+
+def style_latency_boxplot(fig, ax, box, methods_to_plot):
+    """Cores, rótulos e grade comuns aos dois boxplots de latência."""
     colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728']
     for patch, color in zip(box['boxes'], colors):
         patch.set_facecolor(color)
@@ -125,27 +303,43 @@ def plot_latency_boxplot(all_data, methods_in_order):
 
     fig.tight_layout()
 
-    output_filename = "grafico_latencia.png"
-    plt.savefig(output_filename, dpi=300)
-    print(f"\nGráfico de latência salvo como '{output_filename}'")
-    
-    plt.show()
-
 
 # --- BLOCO PRINCIPAL DE EXECUÇÃO ---
 if __name__ == "__main__":
     
     # =======================  CONFIGURAÇÃO  =========================
     BASE_STATION_ID = 300
-    EVENT_ID_TO_ANALYZE = 0 
+    EVENT_ID_TO_ANALYZE = 0  # None = boxplot com todos os eventos da BS
     BASE_LOG_PATH = "." 
     METHODS = ["AHP", "PROMETHEE", "TOPSIS", "BORDA"]
+    # Resume as latências em sketches de quantis (KLL) em vez de listas: memória O(k) por
+    # distribuição, sketches salvos por execução e combinados entre sementes e métodos
+    LATENCY_SKETCH = False
+    SKETCH_K = DEFAULT_K
+    # Diretório do perfil JSON por etapa (tempo, CPU, memória, vazão); None = sem instrumentação
+    PROFILE_DIR = None
+    # Com PROFILE_DIR, grava também um dump do cProfile por etapa
+    CPROFILE = False
     # =================================================================
 
+    if PROFILE_DIR:
+        stage_profile.configure(PROFILE_DIR, cprofile=CPROFILE)
+
     all_latency_data = {}
+    latency_sketches = {}
     
+
     for method in METHODS:
         print(f"\n--- Processando Método: {method} ---")
+        if LATENCY_SKETCH:
+            sketch = method_latency_sketch(os.path.join(BASE_LOG_PATH, method), BASE_STATION_ID,
+                                           EVENT_ID_TO_ANALYZE, SKETCH_K)
+            if sketch is None:
+                print(f"Aviso: Um ou mais arquivos de log para o método '{method}' não foram encontrados. Pulando.")
+            else:
+                latency_sketches[method] = sketch
+            continue
+
         detection_log_path = os.path.join(BASE_LOG_PATH, method, "logFileDetectionLayer.log")
         bs_log_path = os.path.join(BASE_LOG_PATH, method, "logFileBaseStation.log")
 
@@ -153,15 +347,26 @@ if __name__ == "__main__":
             print(f"Aviso: Um ou mais arquivos de log para o método '{method}' não foram encontrados. Pulando.")
             continue
         
-        # 1. Parsear os tempos de criação
-        creation_times = parse_creation_times(detection_log_path, EVENT_ID_TO_ANALYZE)
-        
-        # 2. Calcular as latências
-        latencies = calculate_latencies(bs_log_path, BASE_STATION_ID, creation_times)
-        
-        all_latency_data[method] = latencies
+        # 1. Latências de todos os eventos e estações base (uma leitura de cada log)
+        latency_table = build_latency_table(detection_log_path, bs_log_path)
+        if not latency_table.empty:
+            print(summarize_latencies(latency_table).to_string())
+
+        # 2. Distribuição da BS (e do evento) configurados
+        selected = latency_table[latency_table['bs_id'] == BASE_STATION_ID]
+        if EVENT_ID_TO_ANALYZE is not None:
+            selected = selected[selected['event_id'] == EVENT_ID_TO_ANALYZE]
+        all_latency_data[method] = selected['latency_ms'].tolist()
         
-    if all_latency_data:
+    if latency_sketches:
+        print("\nPercentis de latência (ms):")
+        print(latency_percentile_table(latency_sketches, METHODS).to_string(float_format=lambda x: f"{x:.3f}"))
+        plot_latency_boxplot_from_sketches(latency_sketches, METHODS)
+        wait_figures()
+    elif all_latency_data:
         plot_latency_boxplot(all_latency_data, METHODS)
+        wait_figures()
     else:
-        print("\nNenhum dado de latência para plotar. Verifique os caminhos e IDs.")
\ No newline at end of file
+        print("\nNenhum dado de latência para plotar. Verifique os caminhos e IDs.")
+
+    stage_profile.write_profile("analise_latencia")
\ No newline at end of file
@@ -1,42 +1,16 @@
-import matplotlib.pyplot as plt
-import re
 import os
-import numpy as np
 
-import re
+from batch_render import render_figure, wait_figures
+from ingestao_base_station import (group_output_name, group_summary, ingest_base_station_log,
+                                    ingest_grouped_methods)
 
 def parse_log_file(filepath, bs_id, event_id):
     print(f"Analisando o arquivo: {filepath}...")
     
-    # O 'set' agora armazenará os IDs dos monitores que conseguiram reportar o evento.
-    successful_monitors = set()
-    
-    # O regex não precisa mudar, pois já captura o MonitorId.
-    log_pattern = re.compile(
-        r'Node #(?P<bs_id>\d+): '
-        r'Monitoring Message Received: '
-        r'.*?MonitorId = (?P<monitor_id>\d+) '
-        r'.*?EventId = (?P<event_id>\d+)'
-    )
-
     try:
-        with open(filepath, 'r') as f:
-            for line in f:
-                match = log_pattern.search(line)
-                if match:
-                    data = match.groupdict()
-                    current_bs_id = int(data['bs_id'])
-                    current_event_id = int(data['event_id'])
-                    
-                    if current_bs_id == bs_id and current_event_id == event_id:
-                        
-                        # A "assinatura" da mensagem agora é simplesmente o ID do monitor.
-                        monitor_id = int(data['monitor_id'])
-                        
-                        # Adicionamos o ID do monitor ao set. 
-                        # Se o monitor 102 reportar 50 pacotes, ele só será adicionado uma vez.
-                        successful_monitors.add(monitor_id)
-
+        # O 'set' armazena os IDs dos monitores que conseguiram reportar o evento.
+        # Se o monitor 102 reportar 50 pacotes, ele só aparece uma vez.
+        successful_monitors = ingest_base_station_log(filepath, bs_id, event_id)['unique_monitors']
     except FileNotFoundError:
         print(f"ERRO: Arquivo não encontrado: {filepath}")
         return 0
@@ -46,15 +20,8 @@ def parse_log_file(filepath, bs_id, event_id):
     print(f"Análise concluída. Total de MENSAGENS (monitores únicos) recebidas: {final_count}")
     return final_count
 
-# O resto do seu código (plot_bar_chart, if __name__ == "__main__":, etc.) permanece o mesmo.
-
-def plot_bar_chart(results):
-    methods_in_order = ["AHP", "PROMETHEE", "TOPSIS", "BORDA"]
-    
-    methods_to_plot = [m for m in methods_in_order if m in results]
-    counts = [results.get(m, 0) for m in methods_to_plot]
-
-    fig, ax = plt.subplots(figsize=(10, 7))
+def draw_bar_chart(fig, methods_to_plot, counts):
+    ax = fig.subplots()
     
     colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728']
     bars = ax.bar(methods_to_plot, counts, color=colors[:len(methods_to_plot)])
@@ -77,11 +44,13 @@ def plot_bar_chart(results):
 
     fig.tight_layout()
 
-    output_filename = "grafico_mensagens.png"
-    plt.savefig(output_filename, dpi=300)
-    print(f"\nGráfico salvo como '{output_filename}'")
+def plot_bar_chart(results, output_filename="grafico_mensagens.png"):
+    methods_in_order = ["AHP", "PROMETHEE", "TOPSIS", "BORDA"]
     
-    plt.show()
+    methods_to_plot = [m for m in methods_in_order if m in results]
+    counts = [results.get(m, 0) for m in methods_to_plot]
+
+    render_figure(draw_bar_chart, output_filename, (10, 7), methods_to_plot, counts)
 
 if __name__ == "__main__":
     
@@ -89,20 +58,33 @@ if __name__ == "__main__":
     EVENT_ID_TO_ANALYZE = 0 
     BASE_LOG_PATH = "." 
     METHODS = ["AHP", "PROMETHEE", "TOPSIS", "BORDA"]
+    # Modo agrupado: uma única leitura por método e um gráfico por (BS, evento) do log,
+    # salvo como grafico_mensagens_bs<id>_ev<id>.png (BASE_STATION_ID e EVENT_ID_TO_ANALYZE são ignorados)
+    GROUPED_MODE = False
 
-    all_results = {}
+    if GROUPED_MODE:
+        tables, group_ids = ingest_grouped_methods(BASE_LOG_PATH, METHODS)
+        for bs_id, event_id in group_ids:
+            results = {method: group_summary(table, bs_id, event_id)[1] for method, table in tables.items()}
+            plot_bar_chart(results, group_output_name("grafico_mensagens.png", bs_id, event_id))
+        if not group_ids:
+            print("\nNenhum dado para plotar. Verifique os caminhos na seção de CONFIGURAÇÃO.")
+        wait_figures()
+    else:
+        all_results = {}
     
-    for method in METHODS:
-        log_path = os.path.join(BASE_LOG_PATH, method, "logFileBaseStation.log")
+        for method in METHODS:
+            log_path = os.path.join(BASE_LOG_PATH, method, "logFileBaseStation.log")
         
-        if not os.path.exists(log_path):
-            print(f"\nAviso: O arquivo '{log_path}' não foi encontrado. Pulando o método {method}.")
-            continue
+            if not os.path.exists(log_path):
+                print(f"\nAviso: O arquivo '{log_path}' não foi encontrado. Pulando o método {method}.")
+                continue
         
-        count = parse_log_file(log_path, BASE_STATION_ID, EVENT_ID_TO_ANALYZE)
-        all_results[method] = count
+            count = parse_log_file(log_path, BASE_STATION_ID, EVENT_ID_TO_ANALYZE)
+            all_results[method] = count
         
-    if all_results:
-        plot_bar_chart(all_results)
-    else:
-        print("\nNenhum dado para plotar. Verifique os caminhos e IDs na seção de CONFIGURAÇÃO.")
\ No newline at end of file
+        if all_results:
+            plot_bar_chart(all_results)
+            wait_figures()
+        else:
+            print("\nNenhum dado para plotar. Verifique os caminhos e IDs na seção de CONFIGURAÇÃO.")
\ No newline at end of file
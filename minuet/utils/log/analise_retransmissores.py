@@ -1,8 +1,10 @@
-import matplotlib.pyplot as plt
-import re
 import os
 import pandas as pd
 
+from batch_render import render_figure, wait_figures
+from ingestao_base_station import (group_output_name, group_retransmitters, ingest_base_station_log,
+                                    ingest_grouped_methods)
+
 def parse_retransmitter_logs(filepath, bs_id, event_id):
     """
     Lê um arquivo de log, encontra as mensagens para uma BS e evento específicos,
@@ -13,31 +15,15 @@ def parse_retransmitter_logs(filepath, bs_id, event_id):
     
     retransmitter_counts = {}
     
-    log_pattern = re.compile(
-        r'Node #(?P<bs_id>\d+): '
-        r'.*?From = (?P<from_id>\d+)'
-        r'.*?EventId = (?P<event_id>\d+)'
-    )
-
     try:
-        with open(filepath, 'r') as f:
-            for line in f:
-                match = log_pattern.search(line)
-                if match:
-                    data = match.groupdict()
-                    current_bs_id = int(data['bs_id'])
-                    current_event_id = int(data['event_id'])
-                    
-                    if current_bs_id == bs_id and current_event_id == event_id:
-                        from_id = int(data['from_id'])
-                        retransmitter_counts[from_id] = retransmitter_counts.get(from_id, 0) + 1
+        retransmitter_counts = dict(ingest_base_station_log(filepath, bs_id, event_id)['retransmitter_counts'])
     except FileNotFoundError:
         print(f"ERRO: Arquivo não encontrado: {filepath}")
         
     print(f"Contagens encontradas: {retransmitter_counts}")
     return retransmitter_counts
 
-def plot_stacked_bar_chart(all_data, methods_in_order):
+def plot_stacked_bar_chart(all_data, methods_in_order, output_filename="grafico_retransmissores.png"):
     """
     Cria um gráfico de barras empilhadas mostrando a contribuição de cada método
     para as entregas de cada veículo retransmissor.
@@ -57,7 +43,13 @@ def plot_stacked_bar_chart(all_data, methods_in_order):
         print("Nenhum dado de retransmissor para plotar.")
         return
 
-    fig, ax = plt.subplots(figsize=(14, 8))
+    render_figure(draw_stacked_bar_chart, output_filename, (14, 8), df,
+                  message=f"\nGráfico de retransmissores salvo como '{output_filename}'")
+
+
+def draw_stacked_bar_chart(fig, df):
+    """Desenha as barras empilhadas (retransmissores x métodos) na figura."""
+    ax = fig.subplots()
     
     # Cores correspondentes aos métodos
     colors = {'AHP': '#1f77b4', 'PROMETHEE': '#ff7f0e', 'TOPSIS': '#2ca02c', 'BORDA': '#d62728'}
@@ -84,12 +76,6 @@ def plot_stacked_bar_chart(all_data, methods_in_order):
 
     fig.tight_layout()
 
-    output_filename = "grafico_retransmissores.png"
-    plt.savefig(output_filename, dpi=300)
-    print(f"\nGráfico de retransmissores salvo como '{output_filename}'")
-    
-    plt.show()
-
 
 # --- BLOCO PRINCIPAL DE EXECUÇÃO ---
 if __name__ == "__main__":
@@ -99,22 +85,35 @@ if __name__ == "__main__":
     EVENT_ID_TO_ANALYZE = 0 
     BASE_LOG_PATH = "." 
     METHODS = ["AHP", "PROMETHEE", "TOPSIS", "BORDA"]
+    # Modo agrupado: uma única leitura por método e um gráfico por (BS, evento) do log,
+    # salvo como grafico_retransmissores_bs<id>_ev<id>.png (ignora BASE_STATION_ID e EVENT_ID_TO_ANALYZE)
+    GROUPED_MODE = False
     # =================================================================
 
-    # Dicionário para armazenar todos os dados: { 'AHP': {from_id: count}, 'TOPSIS': {from_id: count}, ... }
-    all_retransmitter_data = {}
+    if GROUPED_MODE:
+        tables, group_ids = ingest_grouped_methods(BASE_LOG_PATH, METHODS)
+        for bs_id, event_id in group_ids:
+            group_data = {method: group_retransmitters(table, bs_id, event_id) for method, table in tables.items()}
+            plot_stacked_bar_chart(group_data, METHODS, group_output_name("grafico_retransmissores.png", bs_id, event_id))
+        if not group_ids:
+            print("\nNenhum dado para plotar. Verifique os caminhos na seção de CONFIGURAÇÃO.")
+        wait_figures()
+    else:
+        # Dicionário para armazenar todos os dados: { 'AHP': {from_id: count}, 'TOPSIS': {from_id: count}, ... }
+        all_retransmitter_data = {}
     
-    for method in METHODS:
-        log_path = os.path.join(BASE_LOG_PATH, method, "logFileBaseStation.log")
+        for method in METHODS:
+            log_path = os.path.join(BASE_LOG_PATH, method, "logFileBaseStation.log")
         
-        if not os.path.exists(log_path):
-            print(f"\nAviso: O arquivo '{log_path}' não foi encontrado. Pulando o método {method}.")
-            continue
+            if not os.path.exists(log_path):
+                print(f"\nAviso: O arquivo '{log_path}' não foi encontrado. Pulando o método {method}.")
+                continue
         
-        retransmitter_counts = parse_retransmitter_logs(log_path, BASE_STATION_ID, EVENT_ID_TO_ANALYZE)
-        all_retransmitter_data[method] = retransmitter_counts
+            retransmitter_counts = parse_retransmitter_logs(log_path, BASE_STATION_ID, EVENT_ID_TO_ANALYZE)
+            all_retransmitter_data[method] = retransmitter_counts
         
-    if all_retransmitter_data:
-        plot_stacked_bar_chart(all_retransmitter_data, METHODS)
-    else:
-        print("\nNenhum dado para plotar. Verifique os caminhos e IDs na seção de CONFIGURAÇÃO.")
\ No newline at end of file
+        if all_retransmitter_data:
+            plot_stacked_bar_chart(all_retransmitter_data, METHODS)
+            wait_figures()
+        else:
+            print("\nNenhum dado para plotar. Verifique os caminhos e IDs na seção de CONFIGURAÇÃO.")
\ No newline at end of file
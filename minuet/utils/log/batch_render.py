@@ -0,0 +1,110 @@
+"""
+batch_render.py
+Geração dos gráficos dos scripts de análise em modo interativo ou em lote.
+
+Cada gráfico é descrito por uma função de desenho draw(fig, *args) que só usa a API
+orientada a objetos do matplotlib sobre a Figure recebida. render_figure() decide como
+executá-la:
+- modo interativo (padrão): figura do pyplot, savefig e plt.show(), como antes;
+- modo em lote: Figure + FigureCanvasAgg (sem pyplot, sem estado global, nunca bloqueia),
+  desenhada em um processo de trabalho; figuras independentes saem em paralelo.
+Os PNGs são os mesmos nos dois modos (mesmos parâmetros, mesmo renderizador Agg).
+
+Ativação do modo em lote: configure(batch=True) no script ou a variável de ambiente
+MINUET_BATCH_RENDER=1 (MINUET_RENDER_WORKERS=<n> limita os processos). No fim do script,
+wait_figures() espera os arquivos ficarem prontos e imprime as mensagens de cada um.
+"""
+
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+from stage_profile import profiled
+
+BATCH_ENV = 'MINUET_BATCH_RENDER'
+WORKERS_ENV = 'MINUET_RENDER_WORKERS'
+DEFAULT_DPI = 300
+
+_CONFIG = {
+    'batch': os.environ.get(BATCH_ENV, '') not in ('', '0'),
+    'workers': int(os.environ.get(WORKERS_ENV, '0') or 0) or min(4, os.cpu_count() or 1),
+}
+_POOL = [None]
+_PENDING = []   # [(future, arquivo, mensagem)]
+
+
+def configure(batch=True, workers=None):
+    """Liga/desliga o modo em lote; em lote o backend do matplotlib passa a ser o Agg."""
+    _CONFIG['batch'] = batch
+    if workers:
+        _CONFIG['workers'] = workers
+    if batch:
+        import matplotlib
+        matplotlib.use('Agg')
+
+
+def draw_to_file(draw, filename, figsize, dpi, args):
+    """Desenha em uma Figure própria (canvas Agg, sem pyplot) e grava o arquivo."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    draw(fig, *args)
+    fig.savefig(filename, dpi=dpi)
+    return filename
+
+
+def _pool():
+    if _POOL[0] is None:
+        _POOL[0] = ProcessPoolExecutor(max_workers=_CONFIG['workers'])
+    return _POOL[0]
+
+
+def render_figure(draw, filename, figsize, *args, dpi=DEFAULT_DPI, message=None, show=True):
+    """
+    Gera 'filename' com draw(fig, *args). Em lote, o desenho vai para um processo de trabalho
+    (os argumentos precisam ser serializáveis) e a mensagem é impressa por wait_figures();
+    no modo interativo a figura é gravada, a mensagem impressa e, se 'show', exibida com plt.show().
+    """
+    if message is None:
+        message = f"\nGráfico salvo como '{filename}'"
+
+    if _CONFIG['batch']:
+        _PENDING.append((_pool().submit(draw_to_file, draw, filename, figsize, dpi, args), filename, message))
+        return
+
+    import matplotlib.pyplot as plt
+    fig = plt.figure(figsize=figsize)
+    draw(fig, *args)
+    fig.savefig(filename, dpi=dpi)
+    print(message)
+    if show:
+        plt.show()
+    else:
+        plt.close(fig)
+
+
+@profiled()
+def wait_figures():
+    """
+    Espera as figuras enviadas em lote (na ordem de envio) e imprime a mensagem de cada uma.
+    Falhas são reportadas sem interromper as demais. Retorna a lista de arquivos que falharam.
+    """
+    failed = []
+    while _PENDING:
+        future, filename, message = _PENDING.pop(0)
+        try:
+            future.result()
+            print(message)
+        except Exception:
+            print(f"[ERRO] Falha ao gerar '{filename}':\n{traceback.format_exc()}")
+            failed.append(filename)
+    if _POOL[0] is not None:
+        _POOL[0].shutdown()
+        _POOL[0] = None
+    return failed
+
+
+if _CONFIG['batch']:
+    configure(batch=True)
@@ -0,0 +1,155 @@
+"""
+cache_parse.py
+Cache persistente (colunar, .npz) de DataFrames extraídos dos logs.
+
+O cache fica ao lado do log ('<log>.<tag>.npz') e é identificado pela
+impressão digital do arquivo: caminho, tamanho, mtime e, opcionalmente, um
+hash do conteúdo. Qualquer alteração no log invalida o cache automaticamente.
+O 'tag' identifica o parser, de modo que todos os scripts que usam o mesmo
+parser sobre o mesmo arquivo compartilham a mesma entrada.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Incrementado quando o parser muda o formato das colunas (2: node_id int32 e event categórico)
+CACHE_VERSION = 2
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def cache_path_for(filepath, tag):
+    return f"{filepath}.{tag}.npz"
+
+
+def log_fingerprint(filepath, with_hash=False):
+    """Retorna a impressão digital do log: caminho, tamanho, mtime e (opcional) blake2b do conteúdo."""
+    stat = os.stat(filepath)
+    fingerprint = {
+        'path': os.path.abspath(filepath),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'hash': None,
+    }
+    if with_hash:
+        digest = hashlib.blake2b(digest_size=16)
+        with open(filepath, 'rb') as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+                digest.update(block)
+        fingerprint['hash'] = digest.hexdigest()
+    return fingerprint
+
+
+# ---------------- CODIFICAÇÃO DAS COLUNAS ----------------
+def _encode_column(series, prefix, arrays):
+    """Guarda a coluna em 'arrays' e retorna a descrição usada para reconstruí-la."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        arrays[f"{prefix}_codes"] = series.cat.codes.to_numpy()
+        arrays[f"{prefix}_categories"] = np.asarray(series.cat.categories, dtype=str)
+        return {'kind': 'category'}
+
+    if pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype):
+        arrays[f"{prefix}_values"] = series.to_numpy()
+        return {'kind': 'numeric'}
+
+    # Colunas de texto (object ou str) podem misturar floats e strings (campos
+    # convertidos com float(valor) quando possível). São fatoradas em códigos + valores distintos; NaN vira o código -1.
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    is_float = np.array([isinstance(u, float) for u in uniques], dtype=bool)
+    if not all(isinstance(u, (float, str)) for u in uniques):
+        raise TypeError(f"Coluna '{series.name}' contém valores que não são float nem str")
+    arrays[f"{prefix}_codes"] = codes
+    arrays[f"{prefix}_is_float"] = is_float
+    arrays[f"{prefix}_floats"] = np.array([u if f else np.nan for u, f in zip(uniques, is_float)], dtype=np.float64)
+    arrays[f"{prefix}_strings"] = np.array(['' if f else u for u, f in zip(uniques, is_float)], dtype=str)
+    return {'kind': 'object', 'dtype': str(series.dtype)}
+
+
+def _decode_column(description, prefix, data):
+    kind = description['kind']
+    if kind == 'numeric':
+        return data[f"{prefix}_values"]
+
+    if kind == 'category':
+        categories = data[f"{prefix}_categories"].tolist()
+        return pd.Categorical.from_codes(data[f"{prefix}_codes"], categories=categories)
+
+    is_float = data[f"{prefix}_is_float"]
+    floats = data[f"{prefix}_floats"].tolist()
+    strings = data[f"{prefix}_strings"].tolist()
+    uniques = np.empty(len(is_float) + 1, dtype=object)
+    for i, flag in enumerate(is_float):
+        uniques[i] = floats[i] if flag else strings[i]
+    uniques[-1] = np.nan  # código -1
+    values = uniques[data[f"{prefix}_codes"]]
+    if description.get('dtype', 'object') != 'object':
+        return pd.array(values, dtype=description['dtype'])
+    return values
+
+
+# ---------------- LEITURA / ESCRITA ----------------
+def save_cached_frame(filepath, tag, df, fingerprint):
+    """Grava o DataFrame no cache do log. Falhas de escrita apenas geram aviso."""
+    arrays = {}
+    columns = []
+    try:
+        for i, name in enumerate(df.columns):
+            description = _encode_column(df[name], f"c{i}", arrays)
+            description['name'] = name
+            columns.append(description)
+    except TypeError as e:
+        print(f"[CACHE] Cache não gerado para {filepath}: {e}")
+        return
+
+    meta = {'version': CACHE_VERSION, 'tag': tag, 'fingerprint': fingerprint,
+            'rows': len(df), 'columns': columns}
+    arrays['meta'] = np.array(json.dumps(meta))
+
+    cache_path = cache_path_for(filepath, tag)
+    tmp_path = cache_path + ".tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"[CACHE] Não foi possível gravar {cache_path}: {e}")
+
+
+def load_cached_frame(filepath, tag, fingerprint):
+    """Retorna o DataFrame em cache se ele corresponder à impressão digital; senão None."""
+    cache_path = cache_path_for(filepath, tag)
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        with np.load(cache_path, allow_pickle=False) as data:
+            meta = json.loads(data['meta'].item())
+            if (meta.get('version') != CACHE_VERSION or meta.get('tag') != tag
+                    or meta.get('fingerprint') != fingerprint):
+                return None
+            columns = {}
+            for i, description in enumerate(meta['columns']):
+                columns[description['name']] = _decode_column(description, f"c{i}", data)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[CACHE] Cache inválido ignorado ({cache_path}): {e}")
+        return None
+    return pd.DataFrame(columns, index=pd.RangeIndex(meta['rows']))
+
+
+def cached_parse(filepath, tag, parser, with_hash=False):
+    """
+    Retorna parser(filepath), reaproveitando o cache em disco quando o log não mudou.
+    Resultados None (arquivo vazio, sem eventos) não são armazenados.
+    """
+    fingerprint = log_fingerprint(filepath, with_hash)
+    df = load_cached_frame(filepath, tag, fingerprint)
+    if df is not None:
+        print(f"[CACHE] Reutilizando eventos já extraídos: {cache_path_for(filepath, tag)}")
+        return df
+
+    df = parser(filepath)
+    if df is not None:
+        save_cached_frame(filepath, tag, df, fingerprint)
+    return df
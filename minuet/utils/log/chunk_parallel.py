@@ -0,0 +1,136 @@
+"""
+chunk_parallel.py
+Leitura paralela de um único log grande (logFileBaseStation.log, logFileClusteringAlgorithm.log).
+
+O arquivo é dividido em faixas de bytes alinhadas em fim de linha (split_ranges) e cada
+faixa é processada por uma função func(caminho, início, fim, ...) em um processo de
+trabalho (map_ranges). Os resultados voltam na ordem do arquivo, e quem chama os combina
+com uma junção associativa que preserva a ordem: somas para contadores, união para
+conjuntos, dicionários na ordem da primeira aparição, concatenação para tabelas de
+eventos. Assim o resultado é o mesmo da leitura serial, qualquer que seja o número de faixas.
+
+Logs comprimidos não permitem seek: são lidos inteiros em uma única faixa (0, None).
+Arquivos pequenos (menos de MIN_RANGE_BYTES por faixa) também, pois criar os processos
+custa mais do que o parse. Dentro de um processo de trabalho (ex.: os jobs paralelos do
+analise_cluster) a leitura é sempre serial, para não multiplicar processos.
+
+Configuração: configure(workers=n) no script ou a variável de ambiente
+MINUET_PARSE_WORKERS=<n> (1 = sempre serial; padrão: CPUs, até 8).
+"""
+
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import stage_profile
+from log_open import is_compressed
+
+WORKERS_ENV = 'MINUET_PARSE_WORKERS'
+MIN_RANGE_BYTES = 64 << 20
+
+_CONFIG = {
+    'workers': int(os.environ.get(WORKERS_ENV, '0') or 0) or min(8, os.cpu_count() or 1),
+}
+
+
+def configure(workers=None):
+    """Ajusta o número de processos usados por map_ranges (1 = serial)."""
+    if workers:
+        _CONFIG['workers'] = workers
+
+
+def workers():
+    """Processos disponíveis para uma leitura: 1 dentro de um processo de trabalho."""
+    if multiprocessing.parent_process() is not None:
+        return 1
+    return max(1, _CONFIG['workers'])
+
+
+def split_ranges(filepath, parts, min_bytes=MIN_RANGE_BYTES):
+    """
+    Divide o arquivo em até 'parts' faixas [(início, fim), ...] contíguas, cada uma
+    começando no início de uma linha e terminando logo após um '\\n' (ou no fim do arquivo).
+    """
+    size = os.path.getsize(filepath)
+    parts = max(1, min(parts, size // max(1, min_bytes)))
+    if parts == 1:
+        return [(0, size)]
+
+    cuts = [0]
+    with open(filepath, 'rb') as f:
+        for i in range(1, parts):
+            target = size * i // parts
+            if target <= cuts[-1]:
+                continue
+            # A faixa anterior vai até o fim da linha em que 'target' cai
+            f.seek(target - 1)
+            f.readline()
+            cut = f.tell()
+            if cuts[-1] < cut < size:
+                cuts.append(cut)
+    cuts.append(size)
+    return list(zip(cuts[:-1], cuts[1:]))
+
+
+class _RangeReader(io.RawIOBase):
+    """Bytes [início, fim) de um arquivo como arquivo binário somente leitura."""
+
+    def __init__(self, filepath, start, end):
+        super().__init__()
+        self.name = filepath
+        self._file = open(filepath, 'rb', buffering=0)
+        self._file.seek(start)
+        self._remaining = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._remaining <= 0:
+            return 0
+        view = memoryview(buffer)[:self._remaining]
+        n = self._file.readinto(view)
+        self._remaining -= n or 0
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._file.close()
+        super().close()
+
+
+def open_range(filepath, start, end, mode='r', encoding=None, errors=None, newline=None):
+    """Abre somente a faixa [início, fim) do arquivo (sem compressão), em texto ou 'rb'."""
+    binary = io.BufferedReader(_RangeReader(filepath, start, end))
+    if mode == 'rb':
+        return binary
+    return io.TextIOWrapper(binary, encoding=encoding, errors=errors, newline=newline)
+
+
+def map_ranges(func, filepath, *args, max_workers=None, min_bytes=None):
+    """
+    Executa func(filepath, início, fim, *args) sobre as faixas do arquivo, em paralelo quando
+    há mais de uma, e retorna os resultados na ordem do arquivo. Para um log comprimido, a
+    única faixa é (0, None): func deve ler o arquivo inteiro.
+    Os argumentos e resultados precisam ser serializáveis (pickle).
+    """
+    max_workers = max_workers or workers()
+    if is_compressed(filepath):
+        return [func(filepath, 0, None, *args)]
+    ranges = split_ranges(filepath, max_workers, min_bytes or MIN_RANGE_BYTES) if max_workers > 1 else None
+    if not ranges or len(ranges) == 1:
+        return [func(filepath, 0, os.path.getsize(filepath), *args)]
+
+    # Com a instrumentação ligada, cada faixa devolve também as etapas medidas no processo dela
+    profiling = stage_profile.enabled()
+    with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+        futures = [pool.submit(stage_profile.call_with_records, func, filepath, start, end, *args)
+                   if profiling else pool.submit(func, filepath, start, end, *args)
+                   for start, end in ranges]
+        results = [future.result() for future in futures]
+    if profiling:
+        for _, worker_records in results:
+            stage_profile.merge_records(worker_records)
+        results = [result for result, _ in results]
+    return results
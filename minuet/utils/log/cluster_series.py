@@ -0,0 +1,185 @@
+"""
+cluster_series.py
+Séries temporais das métricas de clustering em intervalos de tempo fixos (bin_s segundos).
+
+Uma série é {'bin_s': largura do intervalo, 'columns': {nome: array por intervalo}} com
+colunas aditivas, calculadas com np.bincount sobre os eventos já tokenizados do log:
+- packets_<tipo>: PACKET_SENT por TYPE (HEARTBEAT, DISCOVERY, ...)
+- ch_elected, ch_renounced, member_join, member_leave: contagem de eventos
+- cluster_size_sum / cluster_size_count: CLUSTER_SIZE com size > 0 (como analyze_metrics)
+- rtt_count / rtt_sum_ms / rtt_sumsq_ms: RTT_MEASUREMENT, em ms
+Por serem somas, séries de blocos de um mesmo log, de replicações ou de execuções
+incrementais são combinadas com merge_series (arrays de tamanhos diferentes são completados
+com zeros). series_view() deriva os valores por intervalo (médias de tamanho e RTT) e
+export_series_npz() grava os arrays de vários algoritmos lado a lado em um .npz.
+"""
+
+import numpy as np
+import pandas as pd
+
+COUNTED_EVENTS = ('CH_ELECTED', 'CH_RENOUNCED', 'MEMBER_JOIN', 'MEMBER_LEAVE')
+
+
+def new_series(bin_s):
+    if not bin_s > 0:
+        raise ValueError(f"A largura do intervalo precisa ser > 0 (recebido {bin_s})")
+    return {'bin_s': float(bin_s), 'columns': {}}
+
+
+def _numeric(values):
+    return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+
+
+def _event_values(bins, mask, fields, key):
+    """(intervalos, valores numéricos) das linhas em 'mask' com valor válido no campo 'key'."""
+    if key not in fields:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    values = _numeric(np.asarray(fields[key], dtype=object)[mask])
+    keep = np.isfinite(values)
+    return bins[mask][keep], values[keep]
+
+
+def bin_events(timestamps, events, fields, bin_s):
+    """
+    Série de um conjunto de eventos: timestamps (s), nomes dos eventos e {campo: valores}
+    ('type', 'size', 'rtt') alinhados às linhas. Uma única fatoração dos nomes e um
+    bincount por grupo de colunas; eventos com tempo negativo ou inválido são ignorados.
+    """
+    series = new_series(bin_s)
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    valid = np.isfinite(timestamps) & (timestamps >= 0)
+    if not valid.any():
+        return series
+    bins = np.zeros(len(timestamps), dtype=np.int64)
+    bins[valid] = np.floor(timestamps[valid] / series['bin_s']).astype(np.int64)
+    n_bins = int(bins[valid].max()) + 1
+    columns = series['columns']
+
+    # Todas as contagens por evento em um único bincount (evento x intervalo)
+    codes, names = pd.factorize(np.asarray(events, dtype=object))
+    valid &= codes >= 0
+    per_event = np.bincount(codes[valid] * n_bins + bins[valid],
+                            minlength=len(names) * n_bins).reshape(len(names), n_bins)
+    rows = {name: i for i, name in enumerate(names)}
+
+    packets = valid & (codes == rows.get('PACKET_SENT', -1))
+    if packets.any() and 'type' in fields:
+        types = pd.Series(np.asarray(fields['type'], dtype=object)[packets]).fillna('UNKNOWN').astype(str)
+        type_codes, type_names = pd.factorize(types.to_numpy(dtype=object))
+        per_type = np.bincount(type_codes * n_bins + bins[packets],
+                               minlength=len(type_names) * n_bins).reshape(len(type_names), n_bins)
+        for i, name in enumerate(type_names):
+            columns[f"packets_{name.lower()}"] = per_type[i]
+    elif packets.any():
+        columns['packets_unknown'] = per_event[rows['PACKET_SENT']]
+
+    for event in COUNTED_EVENTS:
+        columns[event.lower()] = per_event[rows[event]] if event in rows else np.zeros(n_bins, dtype=np.int64)
+
+    size_bins, size_values = _event_values(bins, valid & (codes == rows.get('CLUSTER_SIZE', -1)), fields, 'size')
+    keep = size_values > 0
+    columns['cluster_size_sum'] = np.bincount(size_bins[keep], weights=size_values[keep], minlength=n_bins)
+    columns['cluster_size_count'] = np.bincount(size_bins[keep], minlength=n_bins)
+
+    rtt_bins, rtt_values = _event_values(bins, valid & (codes == rows.get('RTT_MEASUREMENT', -1)), fields, 'rtt')
+    rtt_values = rtt_values * 1000.0
+    columns['rtt_count'] = np.bincount(rtt_bins, minlength=n_bins)
+    columns['rtt_sum_ms'] = np.bincount(rtt_bins, weights=rtt_values, minlength=n_bins)
+    columns['rtt_sumsq_ms'] = np.bincount(rtt_bins, weights=rtt_values * rtt_values, minlength=n_bins)
+    return series
+
+
+def series_from_frame(df, bin_s):
+    """Série de um DataFrame de parse_clustering_log (vazia se df for None)."""
+    if df is None or df.empty:
+        return new_series(bin_s)
+    fields = {key: df[key].to_numpy(dtype=object) for key in ('type', 'size', 'rtt') if key in df.columns}
+    return bin_events(df['timestamp'].to_numpy(dtype=np.float64), df['event'].to_numpy(dtype=object), fields, bin_s)
+
+
+def _pad(values, length):
+    values = np.asarray(values)
+    if len(values) >= length:
+        return values
+    return np.concatenate([values, np.zeros(length - len(values), dtype=values.dtype)])
+
+
+def series_length(series):
+    return max((len(values) for values in series['columns'].values()), default=0)
+
+
+def merge_series(series, other):
+    """Soma 'other' em 'series' (mesma largura de intervalo). Retorna series."""
+    if other['bin_s'] != series['bin_s']:
+        raise ValueError(f"Séries com intervalos diferentes ({series['bin_s']} s != {other['bin_s']} s)")
+    length = max(series_length(series), series_length(other))
+    columns = series['columns']
+    for name, values in other['columns'].items():
+        current = columns.get(name, np.zeros(0, dtype=np.asarray(values).dtype))
+        columns[name] = _pad(current, length) + _pad(values, length)
+    for name in columns:
+        columns[name] = _pad(columns[name], length)
+    return series
+
+
+def series_to_dict(series):
+    """Forma serializável em JSON (listas)."""
+    return {'bin_s': series['bin_s'], 'columns': {name: values.tolist() for name, values in series['columns'].items()}}
+
+
+def series_from_dict(data):
+    series = new_series(data['bin_s'])
+    series['columns'] = {name: np.asarray(values) for name, values in data['columns'].items()}
+    return series
+
+
+def series_view(series, n_runs=1, length=None):
+    """
+    Valores por intervalo para gráficos e exportação: contagens divididas por n_runs (média
+    das replicações) e médias ponderadas de tamanho de cluster e RTT (NaN sem amostras).
+    Retorna {'time': início de cada intervalo, 'overhead': todos os PACKET_SENT, ...}.
+    """
+    columns = series['columns']
+    length = length if length is not None else series_length(series)
+    runs = float(max(n_runs, 1))
+
+    def column(name):
+        return _pad(columns.get(name, np.zeros(0)), length).astype(np.float64)
+
+    view = {'time': np.arange(length) * series['bin_s']}
+    packet_names = [name for name in columns if name.startswith('packets_')]
+    view['overhead'] = sum((column(name) for name in packet_names), np.zeros(length)) / runs
+    for name in packet_names:
+        view[name] = column(name) / runs
+    for event in COUNTED_EVENTS:
+        view[event.lower()] = column(event.lower()) / runs
+    with np.errstate(invalid='ignore', divide='ignore'):
+        size_count = column('cluster_size_count')
+        view['avg_cluster_size'] = np.where(size_count > 0, column('cluster_size_sum') / size_count, np.nan)
+        rtt_count = column('rtt_count')
+        mean = column('rtt_sum_ms') / rtt_count
+        variance = (column('rtt_sumsq_ms') - rtt_count * mean * mean) / (rtt_count - 1)
+        view['avg_rtt_ms'] = np.where(rtt_count > 0, mean, np.nan)
+        view['std_rtt_ms'] = np.where(rtt_count > 1, np.sqrt(np.maximum(variance, 0.0)), np.nan)
+    return view
+
+
+def export_series_npz(path, series_by_name, n_runs_by_name=None):
+    """
+    Grava as séries de vários algoritmos em um .npz comparável: 'algorithms', 'n_runs', 'bin_s',
+    'time' e, para cada valor de series_view, um array (algoritmos x intervalos) no mesmo eixo de tempo.
+    """
+    names = list(series_by_name)
+    bin_widths = sorted({series['bin_s'] for series in series_by_name.values()})
+    if len(bin_widths) != 1:
+        raise ValueError(f"As séries exportadas juntas precisam ter o mesmo intervalo: {bin_widths}")
+    length = max(series_length(series) for series in series_by_name.values())
+    n_runs = [(n_runs_by_name or {}).get(name, 1) for name in names]
+    views = [series_view(series_by_name[name], runs, length) for name, runs in zip(names, n_runs)]
+    keys = []
+    for view in views:
+        keys.extend(key for key in view if key != 'time' and key not in keys)
+    arrays = {key: np.vstack([view.get(key, np.zeros(length)) for view in views]) for key in keys}
+    np.savez_compressed(path, algorithms=np.array(names, dtype=str), n_runs=np.array(n_runs),
+                        bin_s=np.float64(bin_widths[0]), time=views[0]['time'], **arrays)
+    return path
@@ -0,0 +1,120 @@
+"""
+heavy_hitters.py
+Contagem de fluxos com memória limitada pelo algoritmo Space-Saving (Metwally, Agrawal e
+El Abbadi), usada pela ingestão da BaseStation para os fluxos (MonitorId, From) quando a
+frota é grande demais para um dicionário exato.
+
+O resumo monitora no máximo 'capacity' chaves. Uma chave nova, com o resumo cheio, ocupa
+o lugar da chave de menor contagem c e herda c (guardado como erro máximo da estimativa).
+Garantias, para N = total de ocorrências:
+- toda chave com contagem real > N / capacity está no resumo;
+- para uma chave monitorada, contagem - erro <= real <= contagem, com erro <= N / capacity;
+- sem merge, a soma das contagens é exatamente N.
+Enquanto o resumo não enche, as contagens são exatas e a ordem das chaves é a da primeira
+aparição, como no dicionário. O resultado é determinístico para o mesmo fluxo de dados.
+
+Resumos são combináveis (merge): as contagens e os erros são somados e apenas as
+'capacity' maiores chaves ficam (Agarwal et al., "Mergeable summaries"); as estimativas
+continuam limites superiores, com erro <= N / capacity.
+"""
+
+import heapq
+
+
+class SpaceSaving:
+    """Contador aproximado das chaves mais frequentes, com até 'capacity' chaves."""
+
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError(f"capacity precisa ser >= 1 (recebido {capacity})")
+        self.capacity = int(capacity)
+        self.total = 0
+        self.counts = {}
+        self.errors = {}
+        # Uma entrada (contagem, chave) por chave monitorada; a contagem da entrada pode estar
+        # desatualizada (menor que a real) e só é corrigida quando chega ao topo do heap.
+        self._heap = []
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __iter__(self):
+        return iter(self.counts)
+
+    def __contains__(self, key):
+        return key in self.counts
+
+    def __getitem__(self, key):
+        return self.counts[key]
+
+    def keys(self):
+        return self.counts.keys()
+
+    def items(self):
+        return self.counts.items()
+
+    def get(self, key, default=None):
+        return self.counts.get(key, default)
+
+    @property
+    def exact(self):
+        """True enquanto nenhuma chave foi descartada (contagens exatas)."""
+        return not any(self.errors.values())
+
+    def max_error(self):
+        """Maior superestimação possível de uma contagem do resumo."""
+        return max(self.errors.values(), default=0)
+
+    def add(self, key, count=1):
+        """Soma 'count' ocorrências de 'key'."""
+        self.total += count
+        counts = self.counts
+        if key in counts:
+            counts[key] += count
+            return
+        if len(counts) < self.capacity:
+            counts[key] = count
+            self.errors[key] = 0
+            heapq.heappush(self._heap, (count, key))
+            return
+        floor, victim = self._pop_min()
+        del counts[victim]
+        del self.errors[victim]
+        counts[key] = floor + count
+        self.errors[key] = floor
+        heapq.heappush(self._heap, (floor + count, key))
+
+    def _pop_min(self):
+        """Remove do heap e retorna (contagem, chave) da chave de menor contagem atual."""
+        heap = self._heap
+        while True:
+            count, key = heapq.heappop(heap)
+            current = self.counts[key]
+            if count == current:
+                return count, key
+            heapq.heappush(heap, (current, key))
+
+    def merge(self, other):
+        """Combina outro resumo neste (a capacidade é a deste). Retorna self."""
+        # Uma chave ausente de um resumo cheio pode ter tido até a menor contagem dele:
+        # essa contagem entra na estimativa (limite superior) e no erro
+        floor_self = min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+        floor_other = min(other.counts.values()) if len(other.counts) >= other.capacity else 0
+        counts, errors = {}, {}
+        for key, count in self.counts.items():
+            counts[key] = count + other.counts.get(key, floor_other)
+            errors[key] = self.errors[key] + other.errors.get(key, floor_other)
+        for key, count in other.counts.items():
+            if key not in counts:
+                counts[key] = count + floor_self
+                errors[key] = other.errors[key] + floor_self
+        if len(counts) > self.capacity:
+            order = {key: i for i, key in enumerate(counts)}
+            kept = set(sorted(counts, key=lambda key: (-counts[key], order[key]))[:self.capacity])
+            counts = {key: count for key, count in counts.items() if key in kept}
+            errors = {key: errors[key] for key in counts}
+        self.total += other.total
+        self.counts, self.errors = counts, errors
+        self._heap = [(count, key) for key, count in counts.items()]
+        heapq.heapify(self._heap)
+        return self
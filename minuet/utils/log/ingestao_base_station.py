@@ -0,0 +1,455 @@
+import itertools
+import mmap
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+import stage_profile
+from chunk_parallel import map_ranges
+from heavy_hitters import SpaceSaving
+from log_open import is_compressed, open_log
+from stage_profile import profiled
+from tail_follow import consume_log, read_sidecar
+
+# Registro escrito por AppBaseStation::ReceiveDataMessage (minuet-base-station.cc):
+# <t>ns - BASE STATION - Node #<bs>: Monitoring Message Received: From = <f> Status = <s>
+#   RelayId = <r> MonitorId = <m> FrameId = <fid> FrameType = <ft> Seq = <seq> EventId = <e>
+RECORD_PATTERN = re.compile(
+    r'^(?P<time_ns>\d+)ns - BASE STATION - Node #(?P<bs_id>\d+): '
+    r'Monitoring Message Received: '
+    r'From = (?P<from_id>\d+) '
+    r'.*?MonitorId = (?P<monitor_id>\d+) '
+    r'.*?Seq = (?P<seq>\d+) '
+    r'EventId = (?P<event_id>\d+)'
+)
+# Mesmo registro em bytes, casado a partir do início de uma linha já localizada
+RECORD_BYTES_PATTERN = re.compile(RECORD_PATTERN.pattern.lstrip('^').encode('ascii'))
+# Trecho literal de todo registro; com a BS fixada, 'Node #<bs>: ' faz parte do literal
+RECORD_MARKER = b': Monitoring Message Received: '
+SCAN_BLOCK_BYTES = 16 << 20   # blocos lidos de logs comprimidos (sem mmap)
+
+# Cache em memória: {(caminho, tamanho, mtime, bs_id, event_id, FLOW_CAPACITY): agregados}
+# Permite que vários consumidores no mesmo processo compartilhem uma única leitura.
+_INGESTED = {}
+# Tabelas do modo agrupado (ver ingest_grouped): {(caminho, tamanho, mtime): tabela}
+_GROUPED = {}
+GROUP_BLOCK_RECORDS = 1 << 20   # registros convertidos em arrays de uma vez no modo agrupado
+GROUP_KEYS = ['bs_id', 'event_id']
+
+# Modo incremental: os agregados ficam em '<log>.bs<id>_ev<id>.tail.pkl' junto com o byte já
+# consumido, e cada ingestão lê apenas o que a simulação acrescentou ao log desde a anterior.
+# As entregas, que crescem com o log, vão para '<log>.bs<id>_ev<id>.deliveries.bin' (int64).
+INCREMENTAL = False
+DELIVERY_FIELDS = ('time_ns', 'monitor_id', 'event_id', 'seq')
+
+# > 0: os fluxos (MonitorId, From) são contados por um resumo Space-Saving com no máximo
+# FLOW_CAPACITY pares (memória limitada para frotas grandes; ver heavy_hitters).
+# 0 = dicionário exato com todos os pares.
+FLOW_CAPACITY = 0
+
+
+def record_marker(bs_id=None):
+    """Literal procurado no log: o de qualquer registro ou o dos registros de uma BS."""
+    if bs_id is None:
+        return RECORD_MARKER
+    return b'BASE STATION - Node #%d' % bs_id + RECORD_MARKER
+
+
+def scan_buffer(buffer, marker, start=0, end=None):
+    """
+    Gera os registros de buffer[start:end] (bytes ou mmap, terminado em fim de linha)
+    saltando de uma ocorrência do literal 'marker' para a próxima: só as linhas que o
+    contêm são casadas com a regex, direto sobre o buffer, sem decodificar texto.
+    """
+    find = buffer.find
+    rfind = buffer.rfind
+    match_record = RECORD_BYTES_PATTERN.match
+    end = len(buffer) if end is None else end
+    position = start
+    while True:
+        hit = find(marker, position, end)
+        if hit < 0:
+            return
+        line_start = rfind(b'\n', start, hit) + 1 or start
+        line_end = find(b'\n', hit, end)
+        if line_end < 0:
+            line_end = end
+        match = match_record(buffer, line_start, line_end)
+        if match:
+            time_ns, bs_id, from_id, monitor_id, seq, event_id = match.groups()
+            yield (int(time_ns), int(bs_id), int(from_id), int(monitor_id), int(seq), int(event_id))
+        position = line_end + 1
+
+
+def iter_records(filepath, bs_id=None, start=0, end=None):
+    """
+    Percorre o log da BaseStation uma única vez e gera uma tupla por registro
+    'Monitoring Message Received': (time_ns, bs_id, from_id, monitor_id, seq, event_id).
+    Com bs_id, só os registros dessa BS. O log é mapeado em memória e varrido em bytes
+    (ver scan_buffer); um log comprimido é varrido em blocos descomprimidos, sempre inteiro.
+    start/end restringem a leitura a uma faixa alinhada em linhas (ver chunk_parallel).
+    """
+    marker = record_marker(bs_id)
+    records = 0
+    if is_compressed(filepath):
+        with open_log(filepath, 'rb') as f:
+            pending = b''
+            while True:
+                block = f.read(SCAN_BLOCK_BYTES)
+                if not block:
+                    break
+                block = pending + block
+                cut = block.rfind(b'\n') + 1
+                pending = block[cut:]
+                for record in scan_buffer(block, marker, 0, cut):
+                    records += 1
+                    yield record
+                stage_profile.add_counts(0, cut)
+            for record in scan_buffer(pending, marker):
+                records += 1
+                yield record
+            stage_profile.add_counts(records, len(pending))
+        return
+
+    with open(filepath, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        end = size if end is None else min(end, size)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for record in scan_buffer(mapped, marker, start, end):
+                records += 1
+                yield record
+    stage_profile.add_counts(records, end - start)
+
+
+def new_aggregates(bs_id, event_id):
+    """
+    Cria a estrutura de agregados alimentada pela ingestão:
+    - packet_count: datagramas recebidos pela BS para o evento
+    - unique_monitors: monitores que reportaram o evento
+    - retransmitter_counts: {from_id: count}
+    - flows: {(monitor_id, from_id): count}, ou SpaceSaving com FLOW_CAPACITY > 0
+    - deliveries: [(time_ns, monitor_id, event_id, seq), ...] recebidos pela BS (todos os eventos);
+      no modo incremental, ingest_base_station_log as retorna como array int64 (entregas x 4)
+    """
+    return {
+        'bs_id': bs_id,
+        'event_id': event_id,
+        'packet_count': 0,
+        'unique_monitors': set(),
+        'retransmitter_counts': {},
+        'flows': SpaceSaving(FLOW_CAPACITY) if FLOW_CAPACITY > 0 else {},
+        'deliveries': [],
+    }
+
+
+def update_aggregates(aggregates, record):
+    """Incorpora um registro (ver iter_records) em todos os agregados de uma vez."""
+    time_ns, bs_id, from_id, monitor_id, seq, event_id = record
+    if bs_id != aggregates['bs_id']:
+        return
+
+    aggregates['deliveries'].append((time_ns, monitor_id, event_id, seq))
+
+    if event_id != aggregates['event_id']:
+        return
+
+    aggregates['packet_count'] += 1
+    aggregates['unique_monitors'].add(monitor_id)
+
+    retransmitters = aggregates['retransmitter_counts']
+    retransmitters[from_id] = retransmitters.get(from_id, 0) + 1
+
+    flow_key = (monitor_id, from_id)
+    flows = aggregates['flows']
+    if isinstance(flows, SpaceSaving):
+        flows.add(flow_key)
+    else:
+        flows[flow_key] = flows.get(flow_key, 0) + 1
+
+
+def merge_aggregates(aggregates, other):
+    """
+    Incorpora em 'aggregates' os agregados de um trecho posterior do mesmo log (mesma BS e
+    evento). A junção é associativa e mantém a ordem: contagens somadas, monitores unidos,
+    dicionários na ordem da primeira aparição e entregas concatenadas. Fluxos contados
+    com SpaceSaving são combinados com merge (aproximado, dentro do erro do resumo).
+    """
+    aggregates['packet_count'] += other['packet_count']
+    aggregates['unique_monitors'] |= other['unique_monitors']
+    for name in ('retransmitter_counts', 'flows'):
+        counts = aggregates[name]
+        if isinstance(counts, SpaceSaving):
+            counts.merge(other[name])
+            continue
+        for key, count in other[name].items():
+            counts[key] = counts.get(key, 0) + count
+    aggregates['deliveries'].extend(other['deliveries'])
+    return aggregates
+
+
+@profiled('ingest_base_station_log.range', path_arg=0)
+def aggregate_range(filepath, start, end, bs_id, event_id):
+    """Agregados dos registros de uma faixa de bytes do log (ver chunk_parallel.map_ranges)."""
+    aggregates = new_aggregates(bs_id, event_id)
+    # Só os registros desta BS interessam: o literal 'Node #<bs>: ' filtra os demais sem regex
+    for record in iter_records(filepath, bs_id, start, end):
+        update_aggregates(aggregates, record)
+    return aggregates
+
+
+def update_aggregates_from_lines(aggregates, lines):
+    """Incorpora um lote de linhas do log (ver tail_follow.consume_log)."""
+    match_record = RECORD_PATTERN.match
+    for line in lines:
+        match = match_record(line)
+        if match:
+            time_ns, bs_id, from_id, monitor_id, seq, event_id = match.groups()
+            update_aggregates(aggregates, (int(time_ns), int(bs_id), int(from_id),
+                                           int(monitor_id), int(seq), int(event_id)))
+
+
+def follow_base_station_log(filepath, bs_id, event_id):
+    """
+    Versão incremental de ingest_base_station_log: retoma os agregados salvos e consome
+    apenas os bytes novos do log (linhas completas). Lança FileNotFoundError se o arquivo não existir.
+    """
+    # O estado salvo depende do tipo de contagem dos fluxos (exata ou Space-Saving)
+    state_name = f"bs{bs_id}_ev{event_id}" + (f"_ss{FLOW_CAPACITY}" if FLOW_CAPACITY > 0 else "")
+    aggregates, _ = consume_log(filepath, state_name,
+                                lambda: new_aggregates(bs_id, event_id), update_aggregates_from_lines,
+                                sidecars=('deliveries',))
+    # O estado salvo guarda só as contagens; as entregas vêm do arquivo binário ao lado do log
+    deliveries = read_sidecar(filepath, state_name, 'deliveries', aggregates, len(DELIVERY_FIELDS))
+    return dict(aggregates, deliveries=deliveries)
+
+
+@profiled(path_arg=0)
+def ingest_base_station_log(filepath, bs_id, event_id):
+    """
+    Lê o logFileBaseStation.log uma única vez e calcula todos os agregados
+    usados por analise_pacotes, analise_mensagens, analise_retransmissores,
+    analise_fluxo e analise_latencia. Logs grandes são divididos entre processos
+    (ver chunk_parallel), com o mesmo resultado da leitura serial.
+    Leituras repetidas do mesmo arquivo (inalterado) no mesmo processo são servidas da memória;
+    com INCREMENTAL, só o trecho acrescentado desde a última execução é lido.
+    Lança FileNotFoundError se o arquivo não existir.
+    """
+    if INCREMENTAL:
+        return follow_base_station_log(filepath, bs_id, event_id)
+
+    stat = os.stat(filepath)
+    key = (os.path.abspath(filepath), stat.st_size, stat.st_mtime_ns, bs_id, event_id, FLOW_CAPACITY)
+    if key in _INGESTED:
+        return _INGESTED[key]
+
+    # Logs grandes são lidos em faixas paralelas, juntadas na ordem do arquivo
+    partials = map_ranges(aggregate_range, filepath, bs_id, event_id)
+    aggregates = partials[0]
+    for partial in partials[1:]:
+        merge_aggregates(aggregates, partial)
+
+    _INGESTED[key] = aggregates
+    return aggregates
+
+
+# ---------------- MODO AGRUPADO (todas as BSs e eventos) ----------------
+def _group_block(records):
+    """Contagens por (bs, evento, retransmissor) e pares (bs, evento, monitor) distintos de um bloco."""
+    columns = np.array(records, dtype=np.int64).reshape(-1, 6)
+    frame = pd.DataFrame({'bs_id': columns[:, 1], 'event_id': columns[:, 5],
+                          'from_id': columns[:, 2], 'monitor_id': columns[:, 3]})
+    retransmitters = frame.groupby(GROUP_KEYS + ['from_id'], sort=False).size().rename('count').reset_index()
+    monitors = frame[GROUP_KEYS + ['monitor_id']].drop_duplicates()
+    return retransmitters, monitors
+
+
+def _merge_group_blocks(blocks):
+    """Junta blocos na ordem do arquivo: contagens somadas, pares únicos na ordem da primeira aparição."""
+    if not blocks:
+        return (pd.DataFrame({name: np.empty(0, dtype=np.int64) for name in GROUP_KEYS + ['from_id', 'count']}),
+                pd.DataFrame({name: np.empty(0, dtype=np.int64) for name in GROUP_KEYS + ['monitor_id']}))
+    retransmitters = pd.concat([block[0] for block in blocks], ignore_index=True)
+    retransmitters = retransmitters.groupby(GROUP_KEYS + ['from_id'], sort=False)['count'].sum().reset_index()
+    monitors = pd.concat([block[1] for block in blocks], ignore_index=True).drop_duplicates(ignore_index=True)
+    return retransmitters, monitors
+
+
+@profiled('ingest_grouped.range', path_arg=0)
+def group_range(filepath, start, end):
+    """Contagens agrupadas de uma faixa de bytes do log (ver chunk_parallel.map_ranges)."""
+    records = iter_records(filepath, None, start, end)
+    blocks = []
+    while True:
+        block = list(itertools.islice(records, GROUP_BLOCK_RECORDS))
+        if not block:
+            break
+        blocks.append(_group_block(block))
+    return _merge_group_blocks(blocks)
+
+
+@profiled(path_arg=0)
+def ingest_grouped(filepath):
+    """
+    Lê o logFileBaseStation.log uma única vez e agrupa os registros de todas as BSs e de
+    todos os eventos. Retorna uma tabela compacta, a ser fatiada por group_keys(),
+    group_summary() e group_retransmitters():
+    - 'groups': DataFrame (bs_id, event_id, packet_count, monitor_count), ordenado por (bs, evento)
+    - 'retransmitters': DataFrame (bs_id, event_id, from_id, count), na ordem da primeira
+      aparição de cada retransmissor (a mesma de retransmitter_counts no modo de uma BS)
+    Os valores de cada (bs, evento) são os de ingest_base_station_log(filepath, bs, evento).
+    Lança FileNotFoundError se o arquivo não existir.
+    """
+    stat = os.stat(filepath)
+    key = (os.path.abspath(filepath), stat.st_size, stat.st_mtime_ns)
+    if key in _GROUPED:
+        return _GROUPED[key]
+
+    partials = map_ranges(group_range, filepath)
+    retransmitters, monitors = _merge_group_blocks(partials)
+    packets = retransmitters.groupby(GROUP_KEYS)['count'].sum().rename('packet_count')
+    unique_monitors = monitors.groupby(GROUP_KEYS).size().rename('monitor_count')
+    groups = pd.concat([packets, unique_monitors], axis=1).fillna(0).astype(np.int64).reset_index()
+    table = {
+        'groups': groups.astype({name: np.int32 for name in GROUP_KEYS}),
+        'retransmitters': retransmitters.astype({'bs_id': np.int32, 'event_id': np.int32, 'from_id': np.int32}),
+    }
+    _GROUPED[key] = table
+    return table
+
+
+def group_keys(table, bs_id=None):
+    """[(bs_id, event_id), ...] presentes na tabela (só os da BS dada, se bs_id)."""
+    groups = table['groups']
+    if bs_id is not None:
+        groups = groups[groups['bs_id'] == bs_id]
+    return list(zip(groups['bs_id'].tolist(), groups['event_id'].tolist()))
+
+
+def group_summary(table, bs_id, event_id):
+    """(datagramas recebidos, monitores únicos) de um (bs, evento); (0, 0) se ausente."""
+    groups = table['groups']
+    row = groups[(groups['bs_id'] == bs_id) & (groups['event_id'] == event_id)]
+    if row.empty:
+        return 0, 0
+    return int(row['packet_count'].iloc[0]), int(row['monitor_count'].iloc[0])
+
+
+def group_retransmitters(table, bs_id, event_id):
+    """{from_id: count} de um (bs, evento), como retransmitter_counts de ingest_base_station_log."""
+    rows = table['retransmitters']
+    rows = rows[(rows['bs_id'] == bs_id) & (rows['event_id'] == event_id)]
+    return dict(zip(rows['from_id'].tolist(), rows['count'].tolist()))
+
+
+def ingest_grouped_methods(base_log_path, methods):
+    """
+    Tabelas agrupadas do logFileBaseStation.log de cada método ({método: tabela}, métodos sem
+    log são pulados com aviso) e a união ordenada dos (bs_id, event_id) encontrados.
+    """
+    tables = {}
+    for method in methods:
+        log_path = os.path.join(base_log_path, method, "logFileBaseStation.log")
+        if not os.path.exists(log_path):
+            print(f"\nAviso: O arquivo '{log_path}' não foi encontrado. Pulando o método {method}.")
+            continue
+        print(f"Agrupando por BS e evento: {log_path}...")
+        tables[method] = ingest_grouped(log_path)
+    keys = sorted({key for table in tables.values() for key in group_keys(table)})
+    return tables, keys
+
+
+def group_output_name(filename, bs_id, event_id):
+    """'grafico.png' -> 'grafico_bs300_ev0.png': um arquivo por (bs, evento) no modo agrupado."""
+    root, ext = os.path.splitext(filename)
+    return f"{root}_bs{bs_id}_ev{event_id}{ext}"
+
+
+# --- BLOCO PRINCIPAL DE EXECUÇÃO ---
+# Gera todos os gráficos da BaseStation lendo cada log uma única vez por método.
+if __name__ == "__main__":
+    # Os módulos de análise importam 'ingestao_base_station'; usar o mesmo módulo (e não
+    # o __main__) faz com que todos compartilhem o cache em memória e o modo incremental.
+    import ingestao_base_station as ingestao
+    import analise_pacotes
+    import analise_mensagens
+    import analise_retransmissores
+    import analise_latencia
+    from batch_render import wait_figures
+    from tail_follow import follow
+
+    # =======================  CONFIGURAÇÃO  =========================
+    BASE_STATION_ID = 300
+    EVENT_ID_TO_ANALYZE = 0
+    BASE_LOG_PATH = "."
+    METHODS = ["AHP", "PROMETHEE", "TOPSIS", "BORDA"]
+    # True: retoma os agregados salvos ('.tail.pkl' e '.deliveries.bin' ao lado de cada log)
+    # e lê apenas os bytes novos; ligado automaticamente com FOLLOW_INTERVAL_S > 0
+    INCREMENTAL = False
+    # > 0: acompanha os logs de uma simulação em andamento, atualizando as métricas a cada N segundos
+    # (Ctrl+C encerra e gera os gráficos). 0 = uma única leitura.
+    FOLLOW_INTERVAL_S = 0
+    # > 0: conta os fluxos do Sankey com memória limitada (Space-Saving com até N pares)
+    FLOW_CAPACITY = 0
+    # =================================================================
+
+    ingestao.INCREMENTAL = INCREMENTAL or FOLLOW_INTERVAL_S > 0
+    ingestao.FLOW_CAPACITY = FLOW_CAPACITY
+
+    def print_live_summary():
+        for method in METHODS:
+            bs_log_path = os.path.join(BASE_LOG_PATH, method, "logFileBaseStation.log")
+            if not os.path.exists(bs_log_path):
+                continue
+            aggregates = ingestao.ingest_base_station_log(bs_log_path, BASE_STATION_ID, EVENT_ID_TO_ANALYZE)
+            top = max(aggregates['retransmitter_counts'].items(), key=lambda kv: kv[1], default=(None, 0))
+            print(f"[LIVE] {method:<10} pacotes={aggregates['packet_count']:<8} "
+                  f"monitores={len(aggregates['unique_monitors']):<5} "
+                  f"entregas={len(aggregates['deliveries']):<8} maior retransmissor={top[0]} ({top[1]})")
+        print("-" * 80)
+
+    if FOLLOW_INTERVAL_S > 0:
+        follow(print_live_summary, FOLLOW_INTERVAL_S)
+
+    packet_results = {}
+    message_results = {}
+    retransmitter_results = {}
+    flow_results = {}
+    latency_results = {}
+
+    for method in METHODS:
+        bs_log_path = os.path.join(BASE_LOG_PATH, method, "logFileBaseStation.log")
+        detection_log_path = os.path.join(BASE_LOG_PATH, method, "logFileDetectionLayer.log")
+
+        if not os.path.exists(bs_log_path):
+            print(f"\nAviso: O arquivo '{bs_log_path}' não foi encontrado. Pulando o método {method}.")
+            continue
+
+        print(f"\n--- Processando Método: {method} ---")
+        packet_results[method] = analise_pacotes.parse_log_file(bs_log_path, BASE_STATION_ID, EVENT_ID_TO_ANALYZE)
+        message_results[method] = analise_mensagens.parse_log_file(bs_log_path, BASE_STATION_ID, EVENT_ID_TO_ANALYZE)
+        retransmitter_results[method] = analise_retransmissores.parse_retransmitter_logs(bs_log_path, BASE_STATION_ID, EVENT_ID_TO_ANALYZE)
+        flow_results[method] = ingestao.ingest_base_station_log(bs_log_path, BASE_STATION_ID, EVENT_ID_TO_ANALYZE)['flows']
+
+        if os.path.exists(detection_log_path):
+            creation_times = analise_latencia.parse_creation_times(detection_log_path, EVENT_ID_TO_ANALYZE)
+            latency_results[method] = analise_latencia.calculate_latencies(
+                bs_log_path, BASE_STATION_ID, creation_times, EVENT_ID_TO_ANALYZE)
+
+    if not packet_results:
+        print("\nNenhum dado para plotar. Verifique os caminhos e IDs na seção de CONFIGURAÇÃO.")
+    else:
+        analise_pacotes.plot_bar_chart(packet_results)
+        analise_mensagens.plot_bar_chart(message_results)
+        analise_retransmissores.plot_stacked_bar_chart(retransmitter_results, METHODS)
+        if latency_results:
+            analise_latencia.plot_latency_boxplot(latency_results, METHODS)
+        # Em modo em lote (MINUET_BATCH_RENDER=1) os gráficos acima são desenhados em paralelo
+        wait_figures()
+
+        # plotly só é necessário para o diagrama de Sankey
+        import analise_fluxo
+        analise_fluxo.plot_sankey_diagram(flow_results, METHODS, BASE_STATION_ID)
@@ -0,0 +1,173 @@
+"""
+log_open.py
+Abertura transparente de logs comprimidos (gzip, zstd, xz, bzip2).
+
+open_log(caminho) detecta o formato pelos bytes mágicos do arquivo, não pela extensão
+(um 'logFileBaseStation.log' comprimido com gzip também é reconhecido), e devolve um
+arquivo de leitura sequencial com o conteúdo já descomprimido, em texto ou binário.
+Arquivos sem compressão são abertos com o open() normal.
+
+Quando há um descompressor externo no PATH, ele roda em outro processo ligado por pipe:
+a descompressão acontece em paralelo ao parse, e em várias threads quando o codec
+permite (pigz para gzip, xz -T para arquivos xz com vários blocos, lbzip2/pbzip2 para
+bzip2). Sem ele, usa os módulos da biblioteca padrão (gzip, lzma, bz2); para zstd, o
+pacote opcional 'zstandard' (ou compression.zstd do Python 3.14).
+
+Configuração por variáveis de ambiente:
+- MINUET_DECOMPRESS_THREADS=<n>: threads dos descompressores externos (padrão: CPUs, até 8)
+- MINUET_EXTERNAL_DECOMPRESS=0: usa sempre a biblioteca padrão
+
+Os fluxos comprimidos não permitem seek: quem depende de offsets no arquivo (leitura
+incremental, índices binários, conversão incremental) deve consultar is_compressed()
+e ler o fluxo inteiro.
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+import os
+import shutil
+import subprocess
+
+THREADS_ENV = 'MINUET_DECOMPRESS_THREADS'
+EXTERNAL_ENV = 'MINUET_EXTERNAL_DECOMPRESS'
+PIPE_BUFFER_BYTES = 1 << 20
+
+MAGIC_BYTES = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'BZh', 'bz2'),
+)
+
+
+def _threads():
+    return int(os.environ.get(THREADS_ENV, '0') or 0) or min(8, os.cpu_count() or 1)
+
+
+# Descompressores externos por codec, em ordem de preferência: (programa, argumentos)
+def _external_commands(codec):
+    threads = str(_threads())
+    return {
+        'gzip': [('pigz', ['-dc', '-p', threads]), ('gzip', ['-dc'])],
+        'zstd': [('zstd', ['-dcq', '-T' + threads])],
+        'xz': [('xz', ['-dcq', '-T', threads])],
+        'bz2': [('lbzip2', ['-dc', '-n', threads]), ('pbzip2', ['-dc', '-p' + threads]), ('bzip2', ['-dc'])],
+    }[codec]
+
+
+def detect_codec(path):
+    """Codec do arquivo ('gzip', 'zstd', 'xz', 'bz2') pelos bytes mágicos, ou None se não comprimido."""
+    with open(path, 'rb') as f:
+        head = f.read(6)
+    for magic, codec in MAGIC_BYTES:
+        if head.startswith(magic):
+            return codec
+    return None
+
+
+def is_compressed(path):
+    """True se o arquivo existe e está comprimido em um dos formatos suportados."""
+    try:
+        return detect_codec(path) is not None
+    except OSError:
+        return False
+
+
+def external_decompressor(codec):
+    """Primeiro descompressor externo disponível para o codec: [programa, argumentos...] ou None."""
+    if os.environ.get(EXTERNAL_ENV, '1') in ('0', ''):
+        return None
+    for program, args in _external_commands(codec):
+        executable = shutil.which(program)
+        if executable:
+            return [executable] + args
+    return None
+
+
+class DecompressorPipe(io.RawIOBase):
+    """Saída de um descompressor externo como arquivo binário somente leitura (sem seek)."""
+
+    def __init__(self, path, argv):
+        super().__init__()
+        self.name = path
+        self._argv = argv
+        self._proc = subprocess.Popen(argv + [path], stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                      stderr=subprocess.PIPE, bufsize=0)
+        self._eof = False
+
+    def readable(self):
+        return True
+
+    def fileno(self):
+        return self._proc.stdout.fileno()
+
+    def readinto(self, buffer):
+        n = self._proc.stdout.readinto(buffer)
+        if not n and not self._eof:
+            self._eof = True
+            self._check_exit()
+        return n
+
+    def _check_exit(self):
+        code = self._proc.wait()
+        if code != 0:
+            message = self._proc.stderr.read().decode('utf-8', 'replace').strip()
+            raise OSError(f"{os.path.basename(self._argv[0])} falhou ao descomprimir '{self.name}' "
+                          f"(código {code}): {message}")
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._proc.poll() is None:
+                # Leitura interrompida antes do fim: o descompressor não é mais necessário
+                self._proc.kill()
+            self._proc.wait()
+            self._proc.stdout.close()
+            self._proc.stderr.close()
+        finally:
+            super().close()
+
+
+def _stdlib_open(path, codec):
+    if codec == 'gzip':
+        return gzip.open(path, 'rb')
+    if codec == 'xz':
+        return lzma.open(path, 'rb')
+    if codec == 'bz2':
+        return bz2.open(path, 'rb')
+    try:
+        import zstandard
+        return zstandard.open(path, 'rb')
+    except ImportError:
+        pass
+    try:
+        from compression import zstd
+        return zstd.open(path, 'rb')
+    except ImportError:
+        raise OSError(f"'{path}' está comprimido com zstd: instale o programa 'zstd' "
+                      f"ou o pacote Python 'zstandard' para lê-lo") from None
+
+
+def open_log(path, mode='r', encoding=None, errors=None, newline=None):
+    """
+    Abre um log para leitura sequencial, descomprimindo-o se necessário.
+    mode: 'r'/'rt' (texto, mesmos encoding/errors/newline do open()) ou 'rb'.
+    Lança FileNotFoundError se o arquivo não existir.
+    """
+    if mode not in ('r', 'rt', 'rb'):
+        raise ValueError(f"open_log só abre logs para leitura (modo '{mode}')")
+    codec = detect_codec(path)
+    if codec is None:
+        return open(path, mode, encoding=encoding, errors=errors, newline=newline)
+
+    argv = external_decompressor(codec)
+    if argv is not None:
+        binary = io.BufferedReader(DecompressorPipe(path, argv), buffer_size=PIPE_BUFFER_BYTES)
+    else:
+        binary = _stdlib_open(path, codec)
+    if mode == 'rb':
+        return binary
+    return io.TextIOWrapper(binary, encoding=encoding, errors=errors, newline=newline)
@@ -0,0 +1,207 @@
+"""
+parser_cluster.py
+Parser vetorizado do logFileClusteringAlgorithm.log (RTT::PrintInLog):
+
+    <t>s - RTT - Node #<id> : EVENT=<NOME>;CHAVE=VALOR;...
+
+O arquivo é lido em blocos de linhas; cada bloco é tokenizado com operações
+vetorizadas do pandas (extract/split/explode/partition) e a conversão para
+float é feita apenas sobre os valores distintos de cada campo. Cada par
+CHAVE=VALOR vira a coluna chave.lower().strip() com float(valor) quando a
+conversão funciona, senão a string (a regra do parser linha a linha original).
+As colunas são tipadas: timestamp float64, node_id int32, event categórico e
+campos numéricos (rtt, size, ch_id, ...) em float64.
+
+Logs grandes são tokenizados em faixas de bytes paralelas (ver chunk_parallel); como os
+blocos de todas as faixas são concatenados na ordem do arquivo, o DataFrame é o mesmo.
+"""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+
+import stage_profile
+from chunk_parallel import map_ranges, open_range
+from log_open import open_log
+
+PARSE_CHUNK_LINES = 250_000
+
+# Equivale a line_regex.match(line.strip()): os espaços ao redor dos pares
+# CHAVE=VALOR são removidos depois, campo a campo.
+LINE_PATTERN = r"^\s*([\d\.]+)s - .*? - Node #(\d+) : (.*)"
+
+_NAN_LITERALS = ('nan', '+nan', '-nan')
+
+
+def _convert_uniques(uniques):
+    """
+    Converte os valores distintos de um campo: float quando float(valor)
+    funciona, senão a própria string.
+    Retorna (valores, todos_sao_float).
+    """
+    uniques = pd.Index(uniques, dtype=object)
+    numeric = pd.to_numeric(uniques, errors='coerce').to_numpy(dtype=np.float64)
+    failed = np.flatnonzero(np.isnan(numeric))
+    if failed.size == 0:
+        return numeric, True
+
+    values = numeric.astype(object)
+    all_float = True
+    for i in failed:
+        raw = uniques[i]
+        if raw.lower() in _NAN_LITERALS:
+            continue
+        try:
+            values[i] = float(raw)
+        except ValueError:
+            values[i] = raw
+            all_float = False
+    if all_float:
+        return values.astype(np.float64), True
+    return values, False
+
+
+def _event_names(uniques):
+    """Normaliza os nomes de evento como em parse_log_file: str(valor).strip().upper()."""
+    values, _ = _convert_uniques(uniques)
+    return [str(v).strip().upper() for v in values]
+
+
+def _tokenize_event_strings(event_strings):
+    """
+    Quebra as strings de evento distintas em pares CHAVE=VALOR.
+    Retorna (posições que têm EVENT=, nomes de evento, campos na ordem de
+    primeira aparição, {campo: coluna float64/object alinhada às posições}).
+    """
+    pairs = pd.Series(event_strings, dtype=object).str.split(';').explode()
+    pairs = pairs[pairs.str.contains('=', regex=False, na=False)]
+
+    # Muitos pares se repetem (EVENT=PACKET_SENT, TYPE=HEARTBEAT, ...): o
+    # particionamento e a normalização são feitos uma vez por par distinto.
+    pair_codes, pair_uniques = pd.factorize(pairs.to_numpy(dtype=object))
+    kv = pd.Series(pair_uniques, dtype=object).str.partition('=')
+    keys = kv[0].str.lower().str.strip().to_numpy(dtype=object)
+    values = kv[2].str.strip().to_numpy(dtype=object)
+    table = pd.DataFrame({
+        'row': pairs.index.to_numpy(),
+        'key': keys[pair_codes],
+        'value': values[pair_codes],
+    })
+
+    # Só entram as linhas com EVENT=; se a chave se repete, vale a última ocorrência
+    event_rows = table.loc[table['key'] == 'event'].drop_duplicates('row', keep='last').sort_values('row')
+    rows = event_rows['row'].to_numpy()
+    table = table[table['row'].isin(rows)]
+    field_order = [k for k in pd.unique(table['key']) if k != 'event']
+
+    event_codes, event_uniques = pd.factorize(event_rows['value'].to_numpy(dtype=object))
+    event_names = np.array(_event_names(event_uniques), dtype=object)[event_codes]
+
+    fields = {}
+    table = table[table['key'] != 'event'].drop_duplicates(['row', 'key'], keep='last')
+    for key, sub in table.groupby('key', sort=False):
+        codes, uniques = pd.factorize(sub['value'].to_numpy(dtype=object))
+        converted, all_float = _convert_uniques(uniques)
+        positions = np.searchsorted(rows, sub['row'].to_numpy())
+        if all_float:
+            column = np.full(len(rows), np.nan)
+        else:
+            column = np.full(len(rows), np.nan, dtype=object)
+        column[positions] = converted[codes]
+        fields[key] = column
+
+    return rows, event_names, field_order, fields
+
+
+def parse_chunk(lines):
+    """
+    Tokeniza um bloco de linhas. Retorna None se nenhuma linha tiver EVENT=,
+    ou um dicionário com:
+    - rows, timestamp, node_id
+    - event_codes + event_names (fatoração local dos nomes de evento)
+    - keys: campos na ordem de primeira aparição
+    - fields: {campo: array float64 ou object}
+    """
+    parts = pd.Series(lines, dtype=object).str.extract(LINE_PATTERN)
+    parts = parts[parts[0].notna()]
+    if parts.empty:
+        return None
+
+    # As strings de evento se repetem muito; cada string distinta é tokenizada
+    # uma única vez (na ordem de primeira aparição) e depois expandida pelos códigos.
+    line_codes, event_strings = pd.factorize(parts[2].to_numpy(dtype=object))
+    unique_rows, unique_events, keys, unique_fields = _tokenize_event_strings(event_strings)
+    if len(unique_rows) == 0:
+        return None
+
+    # Posição de cada string distinta entre as que têm EVENT= (-1 se não tem)
+    lookup = np.full(len(event_strings), -1, dtype=np.int64)
+    lookup[unique_rows] = np.arange(len(unique_rows))
+    selected_codes = lookup[line_codes]
+    keep = selected_codes >= 0
+    selected_codes = selected_codes[keep]
+    selected = parts[keep]
+
+    event_codes, event_names = pd.factorize(unique_events[selected_codes])
+    return {
+        'rows': len(selected),
+        'timestamp': selected[0].to_numpy(dtype=object).astype(np.float64),
+        'node_id': selected[1].to_numpy(dtype=object).astype(np.int32),
+        'event_codes': event_codes,
+        'event_names': list(event_names),
+        'keys': keys,
+        'fields': {key: column[selected_codes] for key, column in unique_fields.items()},
+    }
+
+
+def assemble_chunks(chunks):
+    """Concatena os blocos (na ordem) em um único DataFrame, ou None se não houver eventos."""
+    chunks = [c for c in chunks if c is not None]
+    if not chunks:
+        return None
+
+    categories = {}
+    event_codes = []
+    for chunk in chunks:
+        remap = np.array([categories.setdefault(name, len(categories)) for name in chunk['event_names']],
+                         dtype=np.int32)
+        event_codes.append(remap[chunk['event_codes']])
+
+    columns = {
+        'timestamp': np.concatenate([c['timestamp'] for c in chunks]),
+        'node_id': np.concatenate([c['node_id'] for c in chunks]),
+        'event': pd.Categorical.from_codes(np.concatenate(event_codes), categories=list(categories)),
+    }
+
+    keys = []
+    for chunk in chunks:
+        keys.extend(k for k in chunk['keys'] if k not in columns and k not in keys)
+    for key in keys:
+        parts = [c['fields'].get(key, np.full(c['rows'], np.nan)) for c in chunks]
+        columns[key] = np.concatenate(parts)
+
+    return pd.DataFrame(columns)
+
+
+def iter_line_chunks(f, chunk_lines=PARSE_CHUNK_LINES):
+    while True:
+        lines = list(itertools.islice(f, chunk_lines))
+        if not lines:
+            return
+        yield lines
+
+
+def tokenize_range(filepath, start, end, chunk_lines=PARSE_CHUNK_LINES):
+    """Blocos tokenizados (parse_chunk) da faixa [start, end) do log; end=None lê o log inteiro."""
+    f = open_log(filepath) if end is None else open_range(filepath, start, end)
+    with f, stage_profile.stage('parse_clustering_log.tokenize', filepath):
+        lines = stage_profile.iter_lines(f, filepath)
+        return [parse_chunk(lines) for lines in iter_line_chunks(lines, chunk_lines)]
+
+
+def parse_clustering_log(filepath, chunk_lines=PARSE_CHUNK_LINES):
+    """Retorna DataFrame com colunas: timestamp, node_id, event, ...outros campos (ou None se vazio)"""
+    chunks = [chunk for part in map_ranges(tokenize_range, filepath, chunk_lines) for chunk in part]
+    with stage_profile.stage('parse_clustering_log.assemble'):
+        return assemble_chunks(chunks)
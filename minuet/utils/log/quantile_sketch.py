@@ -0,0 +1,251 @@
+"""
+quantile_sketch.py
+Sketch de quantis KLL (Karnin, Lang e Liberty) para resumir distribuições grandes
+(latências fim a fim, RTT do clustering) sem manter todos os valores em memória.
+
+O sketch guarda níveis de amostras: um item do nível h representa 2**h valores. Quando
+um nível passa da sua capacidade (k no nível mais alto, decaindo por 2/3 a cada nível
+abaixo, mínimo 8), ele é ordenado e metade dos itens (as posições pares ou as ímpares,
+sorteadas) sobe para o nível seguinte. O sorteio usa um contador de compactações
+embaralhado (splitmix64), de modo que o mesmo fluxo de valores gera sempre o mesmo sketch.
+Com k itens no topo o sketch ocupa O(k) valores e o erro normalizado de rank fica em
+torno de rank_error(k) (~1,3% para k=200), independentemente do número de valores.
+
+Sketches com o mesmo k podem ser combinados (merge) em qualquer ordem: é assim que se
+juntam blocos, replicações (sementes) e métodos. Contagem, mínimo, máximo e soma
+(média) são exatos. Enquanto nenhum nível foi compactado os quantis também são exatos
+(mesma interpolação linear do numpy/matplotlib).
+
+Os sketches são gravados em JSON (to_dict/from_dict, save_sketch/load_sketch).
+"""
+
+import json
+import math
+import os
+
+import numpy as np
+
+SKETCH_VERSION = 1
+DEFAULT_K = 200
+MIN_LEVEL_CAPACITY = 8
+LEVEL_DECAY = 2.0 / 3.0
+_MASK64 = (1 << 64) - 1
+
+
+def rank_error(k=DEFAULT_K):
+    """Erro normalizado de rank (confiança de ~99%) de um sketch KLL com parâmetro k."""
+    return 2.296 / k ** 0.9723
+
+
+def _coin(counter):
+    """Bit pseudoaleatório (splitmix64) do contador de compactações."""
+    z = (counter * 0x9E3779B97F4A7C15) & _MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return (z ^ (z >> 31)) & 1
+
+
+class KLLSketch:
+    """Resumo de quantis mergeável de uma sequência de valores float."""
+
+    def __init__(self, k=DEFAULT_K):
+        if k < MIN_LEVEL_CAPACITY:
+            raise ValueError(f"k precisa ser >= {MIN_LEVEL_CAPACITY} (recebido {k})")
+        self.k = int(k)
+        self.n = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sum = 0.0
+        self.levels = [np.empty(0)]
+        self.compactions = 0
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def exact(self):
+        """True enquanto nenhum valor foi descartado (todos no nível 0)."""
+        return len(self.levels) == 1
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(MIN_LEVEL_CAPACITY, int(math.ceil(self.k * LEVEL_DECAY ** depth)))
+
+    def update(self, values):
+        """Inclui valores (escalar ou array); NaN e infinitos são ignorados."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return self
+        self.n += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.sum += float(values.sum())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """Combina outro sketch (mesmo k) neste. Retorna self."""
+        if other.k != self.k:
+            raise ValueError(f"Sketches com k diferentes não podem ser combinados ({self.k} != {other.k})")
+        if not other.n:
+            return self
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.sum += other.sum
+        self.compactions += other.compactions
+        self._compress()
+        return self
+
+    def _compress(self):
+        """Compacta o nível mais baixo acima da capacidade até todos caberem."""
+        while True:
+            over = [level for level, items in enumerate(self.levels) if len(items) > self._capacity(level)]
+            if not over:
+                return
+            level = over[0]
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(self.levels[level])
+            # Com quantidade ímpar o menor item fica no nível; o resto é dividido em pares
+            odd = len(items) % 2
+            self.compactions += 1
+            offset = _coin(self.compactions)
+            self.levels[level] = items[:odd]
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], items[odd + offset::2]])
+
+    def _weighted(self):
+        """Itens retidos em ordem crescente e o peso acumulado de cada um."""
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level_items), 2 ** level, dtype=np.int64)
+                                  for level, level_items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], np.cumsum(weights[order])
+
+    def quantile(self, q):
+        """Quantil(is) q em [0, 1] (escalar ou sequência); NaN se o sketch estiver vazio."""
+        q = np.asarray(q, dtype=np.float64)
+        if not self.n:
+            return np.full(q.shape, np.nan) if q.ndim else float('nan')
+        if self.exact:
+            result = np.percentile(self.levels[0], q * 100.0)
+        else:
+            items, cumulative = self._weighted()
+            index = np.searchsorted(cumulative, q * self.n, side='left')
+            result = items[np.clip(index, 0, len(items) - 1)]
+            result = np.where(q <= 0, self.min, np.where(q >= 1, self.max, result))
+        return float(result) if not q.ndim else result
+
+    def rank(self, value):
+        """Fração (aproximada) dos valores <= value."""
+        if not self.n:
+            return float('nan')
+        items, cumulative = self._weighted()
+        index = np.searchsorted(items, value, side='right')
+        return float(cumulative[index - 1] / self.n) if index else 0.0
+
+    def mean(self):
+        return self.sum / self.n if self.n else float('nan')
+
+    def rank_error(self):
+        """Erro normalizado de rank: 0 enquanto o sketch for exato."""
+        return 0.0 if self.exact else rank_error(self.k)
+
+    def boxplot_stats(self, label=None, whis=1.5):
+        """
+        Estatísticas no formato de matplotlib.cbook.boxplot_stats (para Axes.bxp).
+        Quartis e mediana vêm do sketch; os bigodes são o item retido mais extremo dentro de
+        whis * IQR (o mínimo e o máximo exatos também contam) e os outliers são os itens
+        retidos fora dos bigodes, ou seja, uma amostra dos outliers reais quando o sketch
+        já foi compactado. Sem compactação o resultado é igual ao do boxplot dos dados.
+        """
+        q1, median, q3 = self.quantile([0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        candidates = np.unique(np.concatenate(self.levels + [np.array([self.min, self.max])]))
+        low, high = q1 - whis * iqr, q3 + whis * iqr
+        inside = candidates[(candidates >= low) & (candidates <= high)]
+        whislo = float(inside.min()) if len(inside) else float(q1)
+        whishi = float(inside.max()) if len(inside) else float(q3)
+        notch = 1.57 * iqr / math.sqrt(self.n)
+        stats = {
+            'mean': self.mean(), 'med': float(median), 'q1': float(q1), 'q3': float(q3), 'iqr': float(iqr),
+            'cilo': float(median - notch), 'cihi': float(median + notch),
+            'whislo': min(whislo, float(q1)), 'whishi': max(whishi, float(q3)),
+            'fliers': self._fliers(whislo, whishi),
+        }
+        if label is not None:
+            stats['label'] = label
+        return stats
+
+    def _fliers(self, whislo, whishi):
+        if self.exact:
+            values = self.levels[0]
+            return np.concatenate([values[values < whislo], values[values > whishi]])
+        values = np.unique(np.concatenate(self.levels + [np.array([self.min, self.max])]))
+        return values[(values < whislo) | (values > whishi)]
+
+    def to_dict(self):
+        return {
+            'version': SKETCH_VERSION, 'k': self.k, 'n': self.n,
+            'min': self.min if self.n else None, 'max': self.max if self.n else None, 'sum': self.sum,
+            'levels': [items.tolist() for items in self.levels], 'compactions': self.compactions,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('version') != SKETCH_VERSION:
+            raise ValueError(f"Versão de sketch não suportada: {data.get('version')}")
+        sketch = cls(data['k'])
+        sketch.n = int(data['n'])
+        sketch.min = math.inf if data['min'] is None else float(data['min'])
+        sketch.max = -math.inf if data['max'] is None else float(data['max'])
+        sketch.sum = float(data['sum'])
+        sketch.levels = [np.asarray(items, dtype=np.float64) for items in data['levels']]
+        sketch.compactions = int(data['compactions'])
+        return sketch
+
+
+def merge_sketches(sketches, k=DEFAULT_K):
+    """Novo sketch com a combinação de todos os sketches dados (a entrada não é alterada)."""
+    merged = KLLSketch(k)
+    for sketch in sketches:
+        merged.merge(sketch)
+    return merged
+
+
+def percentile_row(sketch, percentiles=(5, 25, 50, 75, 95, 99)):
+    """{'n', 'mean', 'p<x>'..., 'max', 'rank_error'} de um sketch, para tabelas de percentis."""
+    row = {'n': sketch.n, 'mean': sketch.mean(), 'min': sketch.min if sketch.n else float('nan')}
+    values = sketch.quantile(np.asarray(percentiles, dtype=np.float64) / 100.0)
+    for percentile, value in zip(percentiles, values):
+        row[f"p{percentile}"] = float(value)
+    row['max'] = sketch.max if sketch.n else float('nan')
+    row['rank_error'] = sketch.rank_error()
+    return row
+
+
+def save_sketch(path, sketch, **metadata):
+    """Grava o sketch (e metadados, ex.: impressão digital dos logs de origem) em JSON, de forma atômica."""
+    data = dict(metadata, sketch=sketch.to_dict())
+    try:
+        with open(path + '.tmp', 'w') as f:
+            json.dump(data, f)
+        os.replace(path + '.tmp', path)
+    except OSError as e:
+        print(f"[WARNING] Could not save sketch {path}: {e}")
+
+
+def load_sketch(path):
+    """Retorna (sketch, metadados) gravados por save_sketch, ou (None, {}) se ausente ou inválido."""
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return KLLSketch.from_dict(data.pop('sketch')), data
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return None, {}
@@ -0,0 +1,218 @@
+"""
+replicas.py
+Agregação de várias replicações (sementes) de uma mesma configuração, em fluxo.
+
+Para um caminho configurado '<dir>/<log>' as replicações são o próprio '<dir>/<log>'
+(se existir) e todo '<dir>/<subdir>/<log>' (ex.: RTT/V150/RTTV0/seed01/logFileClusteringAlgorithm.log).
+As métricas de cada replicação entram em acumuladores de Welford (n, média, M2) por
+métrica; os DataFrames de cada log são descartados assim que suas métricas são extraídas.
+
+O estado fica em '<dir>/<log>.replicas.json': as métricas e a impressão digital
+(tamanho, mtime) de cada replicação já processada, os parâmetros da análise que as
+produziu e os acumuladores. Em uma nova execução só as replicações novas, alteradas ou
+processadas com outros parâmetros são lidas; as demais saem dos acumuladores pela
+inversa de Welford antes de (re)entrar.
+
+O intervalo de confiança é o de 95% da t de Student (tabela abaixo) sobre as médias
+das replicações: média ± t(n-1) * s / sqrt(n).
+
+Cada replicação pode guardar também sketches de quantis (quantile_sketch.KLLSketch) das
+suas distribuições (ex.: RTT); replicate_sketch() os combina na distribuição do par.
+Da mesma forma, a série temporal por intervalo (cluster_series) de cada replicação é
+somada por replicate_series().
+"""
+
+import glob
+import json
+import math
+import os
+
+from cluster_series import merge_series, new_series, series_from_dict
+from quantile_sketch import KLLSketch
+
+REPLICA_VERSION = 3
+CONFIDENCE = 0.95
+# Valores críticos bicaudais da t de Student para 95% (graus de liberdade -> t)
+T_TABLE_95 = {
+    1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262,
+    10: 2.228, 11: 2.201, 12: 2.179, 13: 2.160, 14: 2.145, 15: 2.131, 16: 2.120, 17: 2.110,
+    18: 2.101, 19: 2.093, 20: 2.086, 21: 2.080, 22: 2.074, 23: 2.069, 24: 2.064, 25: 2.060,
+    26: 2.056, 27: 2.052, 28: 2.048, 29: 2.045, 30: 2.042, 40: 2.021, 50: 2.009, 60: 2.000,
+    80: 1.990, 100: 1.984, 120: 1.980, 1000: 1.962,
+}
+Z_95 = 1.960
+
+
+def t_critical(dof):
+    """t bicaudal de 95%; entre duas linhas da tabela usa a de menos graus de liberdade (conservador)."""
+    if dof < 1:
+        return float('nan')
+    if dof > max(T_TABLE_95):
+        return Z_95
+    return T_TABLE_95[max(key for key in T_TABLE_95 if key <= dof)]
+
+
+# ---------------- ACUMULADORES DE WELFORD ----------------
+def accumulate(acc, value):
+    """Inclui um valor em [n, média, M2]."""
+    n, mean, m2 = acc
+    n += 1
+    delta = value - mean
+    mean += delta / n
+    acc[:] = [n, mean, m2 + delta * (value - mean)]
+
+
+def remove(acc, value):
+    """Retira um valor já incluído em [n, média, M2] (inversa de accumulate)."""
+    n, mean, m2 = acc
+    if n <= 1:
+        acc[:] = [0, 0.0, 0.0]
+        return
+    old_mean = (n * mean - value) / (n - 1)
+    acc[:] = [n - 1, old_mean, max(0.0, m2 - (value - old_mean) * (value - mean))]
+
+
+def summarize(acc):
+    """Retorna (n, média, desvio padrão amostral, meia-largura do IC de 95%)."""
+    n, mean, m2 = acc
+    if n == 0:
+        return 0, float('nan'), float('nan'), float('nan')
+    if n == 1:
+        return 1, mean, float('nan'), float('nan')
+    std = math.sqrt(m2 / (n - 1))
+    return n, mean, std, t_critical(n - 1) * std / math.sqrt(n)
+
+
+# ---------------- DESCOBERTA E ESTADO ----------------
+def discover_replicates(log_path):
+    """Retorna [(chave, caminho)] das replicações do log configurado ('.' = o próprio arquivo)."""
+    directory, filename = os.path.split(log_path)
+    replicates = []
+    if os.path.isfile(log_path):
+        replicates.append(('.', log_path))
+    for path in sorted(glob.glob(os.path.join(directory or '.', '*', filename))):
+        replicates.append((os.path.basename(os.path.dirname(path)), path))
+    return replicates
+
+
+def state_path_for(log_path):
+    return f"{log_path}.replicas.json"
+
+
+def file_fingerprint(path):
+    """Impressão digital barata de um arquivo: tamanho e mtime."""
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def new_replicate_state():
+    return {'version': REPLICA_VERSION, 'replicates': {}, 'accumulators': {}}
+
+
+def load_replicate_state(log_path):
+    """Estado salvo para o log configurado, ou um estado vazio se não houver (ou for inválido)."""
+    try:
+        with open(state_path_for(log_path), 'r') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return new_replicate_state()
+    if not isinstance(state, dict) or state.get('version') != REPLICA_VERSION:
+        return new_replicate_state()
+    return state
+
+
+def save_replicate_state(log_path, state):
+    """Grava o estado de forma atômica. Falhas de escrita (diretório só leitura) apenas geram aviso."""
+    path = state_path_for(log_path)
+    if not os.path.isdir(os.path.dirname(path) or '.'):
+        return
+    try:
+        with open(path + '.tmp', 'w') as f:
+            json.dump(state, f, indent=1)
+        os.replace(path + '.tmp', path)
+    except OSError as e:
+        print(f"[WARNING] Could not save replicate state {path}: {e}")
+
+
+def _unfold(state, key):
+    entry = state['replicates'].pop(key)
+    for metric, value in entry['metrics'].items():
+        if metric in state['accumulators'] and value is not None and math.isfinite(value):
+            remove(state['accumulators'][metric], value)
+
+
+def pending_replicates(state, replicates, series_bin_s=None, params=None):
+    """
+    Compara as replicações encontradas com o estado: as removidas ou alteradas saem dos
+    acumuladores. Com series_bin_s, as que guardam a série temporal com outro intervalo também
+    são reprocessadas; com params (parâmetros da análise, ver fold_replicate), as processadas
+    com outros parâmetros também. Retorna [(chave, caminho)] das que precisam ser (re)processadas.
+    """
+    current = dict(replicates)
+    for key in list(state['replicates']):
+        if key not in current:
+            _unfold(state, key)
+    pending = []
+    for key, path in replicates:
+        entry = state['replicates'].get(key)
+        if (entry is not None and {'size': entry['size'], 'mtime_ns': entry['mtime_ns']} == file_fingerprint(path)
+                and (series_bin_s is None or (entry.get('series') or {}).get('bin_s') == series_bin_s)
+                and (params is None or entry.get('params') == params)):
+            continue
+        if entry is not None:
+            _unfold(state, key)
+        pending.append((key, path))
+    return pending
+
+
+def fold_replicate(state, key, path, metrics, sketches=None, series=None, params=None):
+    """
+    Inclui as métricas (dicionário numérico) de uma replicação processada nos acumuladores.
+    'sketches' ({nome: KLLSketch.to_dict()}), 'series' (cluster_series.series_to_dict) e
+    'params' (dicionário serializável em JSON com os parâmetros que afetam as métricas)
+    ficam guardados com a replicação.
+    """
+    if key in state['replicates']:
+        _unfold(state, key)
+    clean = {}
+    for metric, value in metrics.items():
+        if not isinstance(value, (int, float)):
+            continue
+        value = float(value)
+        clean[metric] = value if math.isfinite(value) else None
+        if clean[metric] is not None:
+            accumulate(state['accumulators'].setdefault(metric, [0, 0.0, 0.0]), value)
+    state['replicates'][key] = dict(file_fingerprint(path), metrics=clean, sketches=sketches or {}, series=series,
+                                    params=params)
+
+
+def replicate_summary(state):
+    """{métrica: (n, média, desvio, IC 95%)} dos acumuladores."""
+    return {metric: summarize(acc) for metric, acc in state['accumulators'].items()}
+
+
+def replicate_sketch(state, name):
+    """Combinação dos sketches 'name' de todas as replicações (vazio se nenhuma tiver)."""
+    merged = None
+    for key in sorted(state['replicates']):
+        data = state['replicates'][key].get('sketches', {}).get(name)
+        if data is None:
+            continue
+        sketch = KLLSketch.from_dict(data)
+        merged = sketch if merged is None else merged.merge(sketch)
+    return merged if merged is not None else KLLSketch()
+
+
+def replicate_series(state, bin_s):
+    """
+    Soma das séries temporais (intervalo bin_s) de todas as replicações e quantas entraram
+    na soma; as contagens médias por replicação saem de cluster_series.series_view(série, n).
+    """
+    merged, count = new_series(bin_s), 0
+    for key in sorted(state['replicates']):
+        data = state['replicates'][key].get('series')
+        if data is None or data['bin_s'] != merged['bin_s']:
+            continue
+        merge_series(merged, series_from_dict(data))
+        count += 1
+    return merged, count
@@ -0,0 +1,332 @@
+"""
+score_store.py
+Armazenamento binário e incremental dos score_history_<MÉTODO>.csv (LogAllScores, fcv-utils.cc).
+
+O CSV '<csv>' é convertido para o diretório '<csv>.store/':
+    ns.bin            int64    um valor por linha
+    ID.bin            int32    um valor por linha
+    col<i>.bin        float32  critérios e score (colunas 2.. do cabeçalho)
+    group_ns.bin      int64    ns de cada grupo de linhas consecutivas com o mesmo ns
+    group_start.bin   int64    primeira linha de cada grupo (tabela de offsets)
+    meta.json         cabeçalho, linhas/grupos convertidos e byte do CSV já consumido
+
+A conversão é incremental: só as linhas acrescentadas ao CSV desde a última
+conversão são lidas (e só até a última linha completa). Se o CSV foi truncado
+ou reescrito, o armazenamento é refeito do zero. Os leitores abrem as colunas
+com np.memmap, sem nenhum parse de texto.
+
+LogAllScores acrescenta cada simulação ao mesmo CSV, então 'ns' pode voltar atrás
+e um mesmo ns pode ter vários grupos; as reduções agrupam o arquivo inteiro por ns.
+
+Um CSV comprimido (ver log_open.py) é arquivado, não cresce: ele é convertido por
+inteiro e o armazenamento é reaproveitado enquanto o arquivo comprimido não mudar
+(mesmo tamanho e mtime).
+
+Os valores vêm do ostream com 6 algarismos significativos, que o float32
+representa sem perder a ordem entre scores distintos.
+"""
+
+import io
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from log_open import is_compressed, open_log
+
+STORE_VERSION = 1
+CONVERT_BLOCK_BYTES = 64 << 20   # texto convertido por vez
+REDUCE_BLOCK_ROWS = 4_000_000    # linhas processadas por vez nas reduções
+TAIL_CHECK_BYTES = 64            # bytes antes do offset consumido usados para detectar reescrita
+
+
+def store_path_for(csv_path):
+    return f"{csv_path}.store"
+
+
+def _column_files(columns):
+    """Arquivo e dtype de cada coluna do CSV: ns, ID e col<i> (float32) para o resto."""
+    files = [('ns.bin', np.int64), ('ID.bin', np.int32)]
+    files += [(f'col{i}.bin', np.float32) for i in range(2, len(columns))]
+    return files
+
+
+def _read_meta(store_dir):
+    try:
+        with open(os.path.join(store_dir, 'meta.json'), 'r') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get('version') == STORE_VERSION else None
+
+
+def _write_meta(store_dir, meta):
+    meta_path = os.path.join(store_dir, 'meta.json')
+    with open(meta_path + '.tmp', 'w') as f:
+        json.dump(meta, f)
+    os.replace(meta_path + '.tmp', meta_path)
+
+
+def _tail_bytes(f, offset):
+    start = max(0, offset - TAIL_CHECK_BYTES)
+    f.seek(start)
+    return f.read(offset - start).hex()
+
+
+def _truncate_to(store_dir, meta):
+    """Descarta o que foi escrito depois do último meta.json (conversão interrompida)."""
+    for (name, dtype) in _column_files(meta['columns']):
+        path = os.path.join(store_dir, name)
+        expected = meta['rows'] * np.dtype(dtype).itemsize
+        if os.path.getsize(path) > expected:
+            os.truncate(path, expected)
+    for name in ('group_ns.bin', 'group_start.bin'):
+        path = os.path.join(store_dir, name)
+        expected = meta['groups'] * 8
+        if os.path.getsize(path) > expected:
+            os.truncate(path, expected)
+
+
+def _new_store(store_dir, header_bytes):
+    if os.path.exists(store_dir):
+        shutil.rmtree(store_dir)
+    os.makedirs(store_dir)
+    columns = header_bytes.decode('utf-8').strip().split(',')
+    if len(columns) < 3 or columns[0] != 'ns' or columns[1] != 'ID':
+        raise ValueError(f"Cabeçalho inesperado no score_history: {columns}")
+    for name, _ in _column_files(columns):
+        open(os.path.join(store_dir, name), 'wb').close()
+    for name in ('group_ns.bin', 'group_start.bin'):
+        open(os.path.join(store_dir, name), 'wb').close()
+    return {'version': STORE_VERSION, 'columns': columns, 'header_bytes': len(header_bytes),
+            'consumed': len(header_bytes), 'tail': header_bytes[-TAIL_CHECK_BYTES:].hex(),
+            'rows': 0, 'groups': 0, 'last_ns': None}
+
+
+def _append_block(store_dir, meta, text):
+    """Converte um bloco de linhas completas e acrescenta às colunas e à tabela de offsets."""
+    columns = meta['columns']
+    dtypes = {name: np.float64 for name in columns[2:]}
+    dtypes.update({'ns': np.int64, 'ID': np.int64})
+    df = pd.read_csv(io.BytesIO(text), header=None, names=columns, dtype=dtypes)
+    if df.empty:
+        return
+
+    ns = df['ns'].to_numpy()
+    previous = np.int64(meta['last_ns']) if meta['last_ns'] is not None else None
+
+    for (name, dtype), column in zip(_column_files(columns), columns):
+        with open(os.path.join(store_dir, name), 'ab') as f:
+            df[column].to_numpy().astype(dtype).tofile(f)
+
+    new_group = np.r_[previous is None or ns[0] != previous, ns[1:] != ns[:-1]]
+    starts = np.flatnonzero(new_group)
+    with open(os.path.join(store_dir, 'group_ns.bin'), 'ab') as f:
+        ns[starts].astype(np.int64).tofile(f)
+    with open(os.path.join(store_dir, 'group_start.bin'), 'ab') as f:
+        (starts + meta['rows']).astype(np.int64).tofile(f)
+
+    meta['rows'] += len(df)
+    meta['groups'] += len(starts)
+    meta['last_ns'] = int(ns[-1])
+
+
+def update_score_store(csv_path, block_bytes=CONVERT_BLOCK_BYTES):
+    """
+    Converte (incrementalmente) o CSV para o armazenamento binário e retorna o meta atualizado.
+    Lança FileNotFoundError se o CSV não existir e ValueError se o formato não for o esperado.
+    """
+    if is_compressed(csv_path):
+        return _update_from_archive(csv_path, block_bytes)
+    store_dir = store_path_for(csv_path)
+    with open(csv_path, 'rb') as f:
+        header_bytes = f.readline()
+        size = os.fstat(f.fileno()).st_size
+
+        meta = _read_meta(store_dir)
+        if meta is not None:
+            unchanged = (size >= meta['consumed']
+                         and len(header_bytes) == meta['header_bytes']
+                         and header_bytes.decode('utf-8').strip().split(',') == meta['columns']
+                         and _tail_bytes(f, meta['consumed']) == meta['tail'])
+            if unchanged:
+                _truncate_to(store_dir, meta)
+            else:
+                meta = None
+        if meta is None:
+            meta = _new_store(store_dir, header_bytes)
+            _write_meta(store_dir, meta)
+
+        f.seek(meta['consumed'])
+        _convert_blocks(f, store_dir, meta, block_bytes)
+    return meta
+
+
+def _convert_blocks(f, store_dir, meta, block_bytes, checkpoint=True):
+    """Converte as linhas completas lidas de 'f' (a partir da posição atual) e avança o meta."""
+    pending = b''
+    while True:
+        block = f.read(block_bytes)
+        if not block:
+            break
+        block = pending + block
+        last_newline = block.rfind(b'\n')
+        if last_newline < 0:
+            pending = block
+            continue
+        pending = block[last_newline + 1:]
+        _append_block(store_dir, meta, block[:last_newline + 1])
+        # O bloco começa exatamente no offset já consumido
+        tail = bytes.fromhex(meta['tail']) + block[:last_newline + 1]
+        meta['consumed'] += last_newline + 1
+        meta['tail'] = tail[-TAIL_CHECK_BYTES:].hex()
+        if checkpoint:
+            _write_meta(store_dir, meta)
+
+
+def _update_from_archive(csv_path, block_bytes):
+    """Converte um CSV comprimido por inteiro, a menos que o armazenamento já seja deste arquivo."""
+    store_dir = store_path_for(csv_path)
+    stat = os.stat(csv_path)
+    archive = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    meta = _read_meta(store_dir)
+    if meta is not None and meta.get('archive') == archive:
+        _truncate_to(store_dir, meta)
+        return meta
+    with open_log(csv_path, 'rb') as f:
+        meta = _new_store(store_dir, f.readline())
+        _convert_blocks(f, store_dir, meta, block_bytes, checkpoint=False)
+    # Só um armazenamento completo é marcado como pertencente ao arquivo comprimido
+    meta['archive'] = archive
+    _write_meta(store_dir, meta)
+    return meta
+
+
+def open_score_store(csv_path, update=True):
+    """
+    Abre o armazenamento do CSV (convertendo o que for novo, se 'update') e retorna um dicionário com:
+    - columns: nomes do cabeçalho; score_column: última coluna
+    - rows, ns, ID: arrays em memória mapeada
+    - values: {nome: array float32 mapeado} para os critérios e o score
+    - group_ns, group_start: tabela de offsets sobre os grupos de linhas com o mesmo ns
+      (um ns se repete se o CSV tiver várias simulações)
+    """
+    meta = update_score_store(csv_path) if update else _read_meta(store_path_for(csv_path))
+    if meta is None:
+        raise FileNotFoundError(f"Armazenamento binário não encontrado para {csv_path}")
+    store_dir = store_path_for(csv_path)
+
+    def mapped(name, dtype, length):
+        if length == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(store_dir, name), dtype=dtype, mode='r', shape=(length,))
+
+    columns = meta['columns']
+    arrays = [mapped(name, dtype, meta['rows']) for name, dtype in _column_files(columns)]
+    return {
+        'columns': columns,
+        'score_column': columns[-1],
+        'rows': meta['rows'],
+        'ns': arrays[0],
+        'ID': arrays[1],
+        'values': dict(zip(columns[2:], arrays[2:])),
+        'group_ns': mapped('group_ns.bin', np.int64, meta['groups']),
+        'group_start': mapped('group_start.bin', np.int64, meta['groups']),
+    }
+
+
+def _iter_group_blocks(store, block_rows=REDUCE_BLOCK_ROWS):
+    """Gera (primeiro_grupo, último_grupo + 1, linha_inicial, linha_final) em blocos alinhados aos grupos."""
+    group_start = store['group_start']
+    n_groups = len(group_start)
+    first = 0
+    while first < n_groups:
+        row_start = int(group_start[first])
+        last = int(np.searchsorted(group_start, row_start + block_rows, side='left'))
+        last = max(last, first + 1)
+        row_end = int(group_start[last]) if last < n_groups else store['rows']
+        yield first, last, row_start, row_end
+        first = last
+
+
+def store_winners(store, column=None):
+    """
+    Vencedor de cada ns (maior valor da coluna, por padrão o score): Series {ns: ID}.
+    Empate -> primeira linha do arquivo; NaN nunca vence um valor válido
+    (ns só com NaN -> primeira linha).
+    Se um ns tiver vários grupos (simulações acrescentadas ao CSV), os vencedores dos
+    grupos são reduzidos por ns, como o groupby('ns') sobre o arquivo inteiro.
+    """
+    values = store['values'][column or store['score_column']]
+    winners = np.empty(len(store['group_ns']), dtype=np.int64)
+    winner_values = np.empty(len(store['group_ns']), dtype=np.float64)
+    for first, last, row_start, row_end in _iter_group_blocks(store):
+        block = np.asarray(values[row_start:row_end])
+        starts = np.asarray(store['group_start'][first:last]) - row_start
+        lengths = np.diff(np.r_[starts, len(block)])
+        best = np.fmax.reduceat(block, starts)
+        is_best = block == np.repeat(best, lengths)
+        # Primeira linha que atinge o máximo em cada grupo (ou a primeira do grupo, se só houver NaN)
+        hits = np.flatnonzero(is_best)
+        hit_groups = np.searchsorted(starts, hits, side='right') - 1
+        first_hit = starts.copy()
+        unique_groups, first_positions = np.unique(hit_groups, return_index=True)
+        first_hit[unique_groups] = hits[first_positions]
+        winners[first:last] = store['ID'][row_start:row_end][first_hit]
+        winner_values[first:last] = best
+
+    group_ns = np.asarray(store['group_ns'])
+    if np.any(group_ns[1:] <= group_ns[:-1]):
+        # Ordenação estável por (ns, -valor): entre grupos empatados fica o primeiro do arquivo
+        order = np.lexsort((-np.where(np.isnan(winner_values), -np.inf, winner_values), group_ns))
+        keep = order[np.flatnonzero(np.r_[True, group_ns[order][1:] != group_ns[order][:-1]])]
+        group_ns, winners = group_ns[keep], winners[keep]
+    return pd.Series(winners, index=pd.Index(group_ns, name='ns'))
+
+
+def criterion_statistics(store):
+    """
+    Estatísticas por critério/score (contagem, NaN, média, desvio padrão amostral, mínimo, máximo)
+    calculadas bloco a bloco; os blocos são combinados pela fórmula de Chan (média e M2).
+    """
+    stats = {}
+    for name, values in store['values'].items():
+        count, mean, m2, nan_count = 0, 0.0, 0.0, 0
+        minimum, maximum = np.nan, np.nan
+        for start in range(0, store['rows'], REDUCE_BLOCK_ROWS):
+            block = np.asarray(values[start:start + REDUCE_BLOCK_ROWS], dtype=np.float64)
+            valid = block[~np.isnan(block)]
+            nan_count += len(block) - len(valid)
+            if len(valid) == 0:
+                continue
+            block_mean = valid.mean()
+            block_m2 = np.square(valid - block_mean).sum()
+            total = count + len(valid)
+            delta = block_mean - mean
+            mean += delta * len(valid) / total
+            m2 += block_m2 + delta * delta * count * len(valid) / total
+            count = total
+            minimum = np.fmin(minimum, valid.min())
+            maximum = np.fmax(maximum, valid.max())
+        stats[name] = {
+            'count': count, 'nan': nan_count,
+            'mean': mean if count else np.nan,
+            'std': np.sqrt(m2 / (count - 1)) if count > 1 else np.nan,
+            'min': minimum, 'max': maximum,
+        }
+    return pd.DataFrame.from_dict(stats, orient='index')
+
+
+if __name__ == "__main__":
+    import sys
+
+    paths = sys.argv[1:] or [f"score_history_{m}.csv" for m in ["AHP", "PROMETHEE", "TOPSIS", "BORDA"]]
+    for path in paths:
+        if not os.path.exists(path):
+            print(f"Aviso: O arquivo '{path}' não foi encontrado.")
+            continue
+        store = open_score_store(path)
+        print(f"\n{store_path_for(path)}: {store['rows']} linhas, {len(np.unique(store['group_ns']))} pontos de decisão.")
+        print(criterion_statistics(store).to_string())
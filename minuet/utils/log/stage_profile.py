@@ -0,0 +1,334 @@
+"""
+stage_profile.py
+Instrumentação opcional (desligada por padrão) das etapas dos scripts de análise.
+
+Cada etapa (parse, agregação, gráficos, tabelas...) é envolvida por stage()/profiled()
+e registra tempo de parede, tempo de CPU, pico de memória residente, linhas e bytes
+processados. Leituras longas feitas com iter_lines() mostram o progresso (MB/s,
+linhas/s e tempo restante estimado) no stderr. Ao final, write_profile() grava um
+JSON com todas as etapas da execução e, se pedido, cada etapa gera também um
+'<etapa>.prof' do cProfile (abra com pstats ou snakeviz).
+
+Ativação: configure(output_dir) no script, ou as variáveis de ambiente
+    MINUET_PROFILE=<diretório>   (também herdada pelos processos de trabalho)
+    MINUET_CPROFILE=1            (um dump do cProfile por etapa)
+Desligada, stage() e profiled() custam uma verificação e iter_lines() devolve o próprio arquivo.
+
+O pico de memória por etapa usa o VmHWM do Linux, zerado no início de cada etapa
+(/proc/self/clear_refs); sem isso, o valor é o ru_maxrss do processo (limite superior).
+"""
+
+import contextlib
+import cProfile
+import datetime
+import functools
+import json
+import os
+import re
+import resource
+import sys
+import time
+
+PROFILE_ENV = 'MINUET_PROFILE'
+CPROFILE_ENV = 'MINUET_CPROFILE'
+PROFILE_VERSION = 1
+PROGRESS_INTERVAL_S = 2.0      # intervalo mínimo entre duas linhas de progresso
+PROGRESS_TICK_LINES = 1 << 16  # linhas lidas entre duas consultas ao relógio
+
+_CONFIG = {
+    'enabled': bool(os.environ.get(PROFILE_ENV)),
+    'output_dir': os.environ.get(PROFILE_ENV) or None,
+    'cprofile': bool(os.environ.get(CPROFILE_ENV)),
+}
+_RECORDS = []        # etapas encerradas neste processo
+_OPEN = []           # pilha de etapas em andamento
+_PROFILER_ACTIVE = [False]
+_RUN_STARTED = time.time()
+_HWM_PATTERN = re.compile(r'^VmHWM:\s+(\d+) kB', re.MULTILINE)
+
+
+def enabled():
+    return _CONFIG['enabled']
+
+
+def configure(output_dir='.', cprofile=False, enable=True):
+    """Liga (ou desliga) a instrumentação; o ambiente é ajustado para os processos filhos herdarem."""
+    _CONFIG.update({'enabled': enable, 'output_dir': output_dir, 'cprofile': cprofile})
+    if enable:
+        os.environ[PROFILE_ENV] = output_dir
+        if cprofile:
+            os.environ[CPROFILE_ENV] = '1'
+    else:
+        os.environ.pop(PROFILE_ENV, None)
+        os.environ.pop(CPROFILE_ENV, None)
+
+
+# ---------------- MEMÓRIA ----------------
+def _read_hwm_mb():
+    """Pico de memória residente desde o último reset (VmHWM), ou None fora do Linux."""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            match = _HWM_PATTERN.search(f.read())
+    except OSError:
+        return None
+    return int(match.group(1)) / 1024.0 if match else None
+
+
+def _reset_hwm():
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _maxrss_mb():
+    # ru_maxrss é dado em KiB no Linux e em bytes no macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024.0 * 1024.0) if sys.platform == 'darwin' else maxrss / 1024.0
+
+
+def _fold_peak_into_open_stages():
+    """Antes de zerar o VmHWM, o pico atual é repassado às etapas abertas."""
+    peak = _read_hwm_mb()
+    if peak is not None:
+        for record in _OPEN:
+            record['peak_rss_mb'] = max(record['peak_rss_mb'], peak)
+
+
+# ---------------- ETAPAS ----------------
+@contextlib.contextmanager
+def _measured_stage(name, path):
+    _fold_peak_into_open_stages()
+    hwm_reset = _reset_hwm()
+    record = {
+        'name': name, 'parent': _OPEN[-1]['name'] if _OPEN else None, 'depth': len(_OPEN),
+        'pid': os.getpid(), 'lines': 0, 'bytes': 0,
+        'path': path, 'peak_rss_mb': 0.0,
+        'peak_rss_source': 'VmHWM' if hwm_reset else 'ru_maxrss',
+        'started': time.time(),
+    }
+    profiler = None
+    if _CONFIG['cprofile'] and not _PROFILER_ACTIVE[0]:
+        profiler = cProfile.Profile()
+        _PROFILER_ACTIVE[0] = True
+
+    _OPEN.append(record)
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield record
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            _PROFILER_ACTIVE[0] = False
+        record['wall_s'] = time.perf_counter() - wall_start
+        record['cpu_s'] = time.process_time() - cpu_start
+        _OPEN.pop()
+
+        peak = _read_hwm_mb() if hwm_reset else None
+        record['peak_rss_mb'] = max(record['peak_rss_mb'], peak if peak is not None else _maxrss_mb())
+        for parent in _OPEN:
+            parent['peak_rss_mb'] = max(parent['peak_rss_mb'], record['peak_rss_mb'])
+        if path and not record['bytes'] and os.path.exists(path):
+            record['bytes'] = os.path.getsize(path)
+        wall = max(record['wall_s'], 1e-9)
+        record['lines_per_s'] = record['lines'] / wall
+        record['mb_per_s'] = record['bytes'] / 1e6 / wall
+        if profiler is not None:
+            record['cprofile'] = _dump_cprofile(profiler, name)
+        _RECORDS.append(record)
+
+
+def stage(name, path=None):
+    """
+    Contexto que mede uma etapa. 'path' (opcional) é o arquivo de entrada: se nenhum byte
+    for contabilizado por iter_lines()/add_counts(), o tamanho dele é usado para o MB/s.
+    Retorna o registro da etapa (ou None se a instrumentação estiver desligada).
+    """
+    if not _CONFIG['enabled']:
+        return contextlib.nullcontext()
+    return _measured_stage(name, path)
+
+
+def profiled(name=None, path_arg=None):
+    """
+    Decorador: executa a função dentro de stage(name). Com path_arg, o argumento posicional
+    de índice path_arg é o arquivo de entrada da etapa.
+    """
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _CONFIG['enabled']:
+                return func(*args, **kwargs)
+            path = args[path_arg] if path_arg is not None and len(args) > path_arg else None
+            with _measured_stage(stage_name, path):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def add_counts(lines=0, nbytes=0):
+    """Soma linhas/bytes processados a todas as etapas abertas."""
+    for record in _OPEN:
+        record['lines'] += lines
+        record['bytes'] += nbytes
+
+
+# ---------------- PROGRESSO ----------------
+def _format_eta(seconds):
+    if seconds is None:
+        return '?'
+    seconds = int(seconds)
+    return f"{seconds // 3600:d}h{seconds // 60 % 60:02d}m" if seconds >= 3600 else f"{seconds // 60:d}m{seconds % 60:02d}s"
+
+
+def iter_lines(f, desc=None, total_bytes=None):
+    """
+    Itera as linhas de um arquivo aberto contabilizando linhas e bytes na etapa atual e
+    mostrando o progresso no stderr. Desligada, retorna o próprio arquivo (sem custo).
+    """
+    if not _CONFIG['enabled']:
+        return f
+    if total_bytes is None:
+        try:
+            total_bytes = os.fstat(f.fileno()).st_size
+        except (OSError, AttributeError, ValueError):
+            total_bytes = None
+    return _iter_lines_with_progress(f, desc or getattr(f, 'name', 'arquivo'), total_bytes)
+
+
+def _position(f):
+    # Posição do leitor binário por trás do arquivo texto (inclui o que já está no buffer)
+    raw = getattr(f, 'buffer', f)
+    try:
+        return raw.tell()
+    except (OSError, ValueError):
+        return None
+
+
+def _iter_lines_with_progress(f, desc, total_bytes):
+    started = time.perf_counter()
+    last_print = started
+    start_position = _position(f) or 0
+    counted_bytes = start_position
+    lines = 0
+    printed = False
+    for lines, line in enumerate(f, 1):
+        yield line
+        if lines % PROGRESS_TICK_LINES == 0:
+            position = _position(f)
+            if position is not None:
+                add_counts(PROGRESS_TICK_LINES, position - counted_bytes)
+                counted_bytes = position
+            else:
+                add_counts(PROGRESS_TICK_LINES, 0)
+            now = time.perf_counter()
+            if now - last_print >= PROGRESS_INTERVAL_S:
+                last_print = now
+                printed = True
+                _print_progress(desc, lines, counted_bytes - start_position, total_bytes, start_position,
+                                now - started)
+    position = _position(f)
+    add_counts(lines % PROGRESS_TICK_LINES, (position - counted_bytes) if position is not None else 0)
+    if printed:
+        _print_progress(desc, lines, (position or counted_bytes) - start_position, total_bytes, start_position,
+                        time.perf_counter() - started)
+        print(file=sys.stderr)
+
+
+def _print_progress(desc, lines, done_bytes, total_bytes, start_position, elapsed):
+    elapsed = max(elapsed, 1e-9)
+    rate = done_bytes / elapsed
+    text = f"\r[PERF] {desc}: {lines:,} linhas ({lines / elapsed:,.0f}/s), {rate / 1e6:.1f} MB/s"
+    if total_bytes:
+        remaining = total_bytes - start_position - done_bytes
+        percent = 100.0 * (start_position + done_bytes) / total_bytes
+        text += f", {percent:5.1f}%, faltam {_format_eta(remaining / rate if rate > 0 else None)}"
+    print(text, end='', file=sys.stderr, flush=True)
+
+
+# ---------------- cProfile / RELATÓRIO ----------------
+def _dump_cprofile(profiler, name):
+    directory = _CONFIG['output_dir'] or '.'
+    os.makedirs(directory, exist_ok=True)
+    safe_name = re.sub(r'[^\w.-]+', '_', name)
+    path = os.path.join(directory, f"{safe_name}_{os.getpid()}_{len(_RECORDS)}.prof")
+    profiler.dump_stats(path)
+    return path
+
+
+def records():
+    return list(_RECORDS)
+
+
+def merge_records(worker_records):
+    """
+    Incorpora etapas medidas em outro processo (ver call_with_records), penduradas na
+    etapa aberta atual do processo principal.
+    """
+    for record in worker_records:
+        if _OPEN:
+            record['depth'] += len(_OPEN)
+            record['parent'] = record['parent'] or _OPEN[-1]['name']
+        _RECORDS.append(record)
+
+
+def call_with_records(func, *args, **kwargs):
+    """
+    Executa func em um processo de trabalho e retorna (resultado, etapas medidas nesta chamada),
+    para que o processo principal junte tudo em um único perfil. A pilha de etapas herdada
+    do processo principal (fork) é ignorada durante a chamada.
+    """
+    first = len(_RECORDS)
+    inherited = _OPEN[:], _PROFILER_ACTIVE[0]
+    del _OPEN[:]
+    _PROFILER_ACTIVE[0] = False
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        _OPEN[:], _PROFILER_ACTIVE[0] = inherited
+    return result, _RECORDS[first:]
+
+
+def print_summary(file=sys.stderr):
+    """Tabela com as etapas encerradas (indentadas pela profundidade)."""
+    print(f"\n[PERF] {'Etapa':<40} {'parede s':>9} {'CPU s':>8} {'pico MB':>8} {'linhas/s':>12} {'MB/s':>8}", file=file)
+    for record in sorted(_RECORDS, key=lambda record: record['started']):
+        label = '  ' * record['depth'] + record['name']
+        print(f"[PERF] {label:<40} {record['wall_s']:9.3f} {record['cpu_s']:8.3f} {record['peak_rss_mb']:8.1f} "
+              f"{record['lines_per_s']:12,.0f} {record['mb_per_s']:8.1f}", file=file)
+
+
+def write_profile(script_name, path=None):
+    """
+    Grava o perfil da execução em JSON ('<output_dir>/perfil_<script>_<data-hora>.json' por padrão)
+    e imprime o resumo. Retorna o caminho gravado (None se a instrumentação estiver desligada).
+    """
+    if not _CONFIG['enabled']:
+        return None
+    if path is None:
+        directory = _CONFIG['output_dir'] or '.'
+        os.makedirs(directory, exist_ok=True)
+        stamp = datetime.datetime.fromtimestamp(_RUN_STARTED).strftime('%Y%m%d_%H%M%S')
+        path = os.path.join(directory, f"perfil_{script_name}_{stamp}.json")
+    profile = {
+        'version': PROFILE_VERSION,
+        'script': script_name,
+        'argv': sys.argv,
+        'started': datetime.datetime.fromtimestamp(_RUN_STARTED).isoformat(timespec='seconds'),
+        'wall_s': time.time() - _RUN_STARTED,
+        'cpu_s': time.process_time(),
+        'peak_rss_mb': _maxrss_mb(),
+        'stages': sorted(_RECORDS, key=lambda record: record['started']),
+    }
+    with open(path, 'w') as f:
+        json.dump(profile, f, indent=2)
+    print_summary()
+    print(f"[PERF] Perfil salvo em '{path}'", file=sys.stderr)
+    return path
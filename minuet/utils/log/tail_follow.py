@@ -0,0 +1,229 @@
+"""
+tail_follow.py
+Leitura incremental ("tail") de logs que ainda estão sendo escritos pela simulação.
+
+Para cada par (log, tag) é mantido um arquivo auxiliar '<log>.<tag>.tail.pkl'
+com o byte já consumido e o estado dos agregados do consumidor (contagens,
+conjuntos, tabelas de fluxo, mandatos de CH...). Cada chamada lê apenas os
+bytes acrescentados desde a anterior, até a última linha completa: uma linha
+parcial no fim do arquivo fica para a próxima leitura. Se o log foi truncado
+ou substituído (nova simulação no mesmo diretório), o estado é refeito do zero.
+
+O estado é serializado com pickle; os arquivos auxiliares são gerados
+localmente por estes scripts e não devem ser recebidos de terceiros.
+
+Tabelas que só crescem com o log (ex.: as entregas da BaseStation) não entram no
+pickle, que seria regravado inteiro a cada leitura: são declaradas como 'sidecars'
+de consume_log. As linhas novas de cada leitura são acrescentadas em binário (int64)
+a '<log>.<tag>.<nome>.bin' e o pickle guarda apenas o tamanho já gravado; assim cada
+leitura custa só o trecho novo. read_sidecar() devolve a tabela completa.
+
+Logs comprimidos (ver log_open.py) já estão arquivados e não permitem seek: são lidos
+por inteiro a cada chamada, sem arquivo auxiliar.
+"""
+
+import os
+import pickle
+import time
+
+import numpy as np
+
+from log_open import is_compressed, open_log
+
+TAIL_VERSION = 4
+READ_BLOCK_BYTES = 16 << 20
+TAIL_CHECK_BYTES = 64   # bytes antes do offset consumido usados para detectar reescrita do log
+
+# Estados já carregados neste processo: {(caminho absoluto, tag): estado}. No modo de
+# acompanhamento evita reler o arquivo auxiliar a cada consulta.
+_LIVE = {}
+
+
+def state_path_for(filepath, tag):
+    return f"{filepath}.{tag}.tail.pkl"
+
+
+def load_tail_state(filepath, tag):
+    """Retorna o estado salvo para (log, tag) ou None se não houver estado utilizável."""
+    path = state_path_for(filepath, tag)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            tail = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+        print(f"[TAIL] Estado inválido ignorado ({path}): {e}")
+        return None
+    if not isinstance(tail, dict) or tail.get('version') != TAIL_VERSION or tail.get('tag') != tag:
+        return None
+    return tail
+
+
+def sidecar_path_for(filepath, tag, name):
+    return f"{filepath}.{tag}.{name}.bin"
+
+
+def _reset_sidecars(filepath, tag, sidecars):
+    """Começa tabelas vazias (arquivo novo: arrays já mapeados do anterior continuam válidos)."""
+    for name in sidecars:
+        path = sidecar_path_for(filepath, tag, name)
+        open(path + '.tmp', 'wb').close()
+        os.replace(path + '.tmp', path)
+
+
+def _restore_sidecars(filepath, tag, tail):
+    """
+    Trunca cada tabela no tamanho registrado pelo último estado salvo (descarta o que foi
+    acrescentado depois dele). Retorna False se alguma estiver faltando ou menor que o registrado.
+    """
+    for name, size in tail['sidecars'].items():
+        path = sidecar_path_for(filepath, tag, name)
+        if not os.path.exists(path) or os.path.getsize(path) < size:
+            return False
+        if os.path.getsize(path) > size:
+            os.truncate(path, size)
+    return True
+
+
+def _flush_sidecars(filepath, tag, tail):
+    """Acrescenta as linhas pendentes de cada tabela ao seu arquivo e esvazia a lista do estado."""
+    state = tail['state']
+    for name in tail['sidecars']:
+        rows = state[name]
+        if not rows:
+            continue
+        path = sidecar_path_for(filepath, tag, name)
+        try:
+            with open(path, 'ab') as f:
+                # Descarta um trecho parcial de uma gravação anterior que falhou
+                f.truncate(tail['sidecars'][name])
+                np.asarray(rows, dtype=np.int64).tofile(f)
+        except OSError as e:
+            # As linhas continuam pendentes no estado (e no pickle) até a próxima gravação
+            print(f"[TAIL] Não foi possível gravar {path}: {e}")
+            continue
+        tail['sidecars'][name] += len(rows) * len(rows[0]) * 8
+        state[name] = []
+
+
+def read_sidecar(filepath, tag, name, state, width):
+    """
+    Tabela completa (linhas x width, int64) de um sidecar de consume_log: as linhas já gravadas
+    (em memória mapeada) seguidas das ainda pendentes em state[name].
+    """
+    tail = _LIVE.get((os.path.abspath(filepath), tag))
+    size = tail['sidecars'].get(name, 0) if tail is not None and tail['state'] is state else 0
+    if size:
+        rows = np.memmap(sidecar_path_for(filepath, tag, name), dtype=np.int64, mode='r',
+                         shape=(size // (8 * width), width))
+    else:
+        rows = np.empty((0, width), dtype=np.int64)
+    if state[name]:
+        rows = np.concatenate([rows, np.asarray(state[name], dtype=np.int64).reshape(-1, width)])
+    return rows
+
+
+def save_tail_state(filepath, tag, tail):
+    """Grava o estado de forma atômica. Falhas de escrita apenas geram aviso."""
+    path = state_path_for(filepath, tag)
+    try:
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(tail, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+    except OSError as e:
+        print(f"[TAIL] Não foi possível gravar {path}: {e}")
+
+
+def _tail_bytes(f, offset):
+    start = max(0, offset - TAIL_CHECK_BYTES)
+    f.seek(start)
+    return f.read(offset - start)
+
+
+def consume_log(filepath, tag, new_state, update, persist=True, block_bytes=READ_BLOCK_BYTES, sidecars=()):
+    """
+    Alimenta update(estado, linhas) apenas com as linhas completas novas do log.
+    - new_state(): cria o estado inicial (também usado quando o log foi truncado/substituído)
+    - update(state, lines): incorpora uma lista de linhas (sem o '\\n' final) ao estado
+    - sidecars: chaves do estado com listas de tuplas de inteiros de mesmo tamanho, gravadas
+      fora do pickle (com persist); leia-as com read_sidecar
+    Retorna (estado, bytes novos consumidos). Lança FileNotFoundError se o log não existir.
+    """
+    stat = os.stat(filepath)
+    if is_compressed(filepath):
+        state = new_state()
+        with open_log(filepath, 'rb') as f:
+            consumed = _feed_blocks(f, state, update, block_bytes)[0]
+        return state, consumed
+
+    key = (os.path.abspath(filepath), tag)
+    tail = _LIVE.get(key) or load_tail_state(filepath, tag)
+    with open(filepath, 'rb') as f:
+        if tail is not None:
+            rewritten = (stat.st_ino != tail['inode'] or stat.st_size < tail['offset']
+                         or _tail_bytes(f, tail['offset']) != tail['tail'])
+            if rewritten:
+                print(f"[TAIL] {filepath} foi truncado ou substituído; reiniciando a leitura do início.")
+                tail = None
+            elif key not in _LIVE and not _restore_sidecars(filepath, tag, tail):
+                print(f"[TAIL] Tabelas auxiliares de {filepath} incompletas; reiniciando a leitura do início.")
+                tail = None
+        if tail is None:
+            tail = {'version': TAIL_VERSION, 'tag': tag, 'inode': stat.st_ino,
+                    'offset': 0, 'tail': b'', 'state': new_state(),
+                    'sidecars': {name: 0 for name in sidecars} if persist else {}}
+            _reset_sidecars(filepath, tag, tail['sidecars'])
+
+        start = tail['offset']
+        f.seek(start)
+        consumed, last_bytes = _feed_blocks(f, tail['state'], update, block_bytes)
+        if consumed:
+            # Os blocos começam exatamente no offset já consumido
+            tail['tail'] = (tail['tail'] + last_bytes)[-TAIL_CHECK_BYTES:]
+            tail['offset'] += consumed
+
+    _LIVE[key] = tail
+    consumed = tail['offset'] - start
+    if persist and (consumed or not os.path.exists(state_path_for(filepath, tag))):
+        # As tabelas são gravadas antes do estado que registra o tamanho delas
+        _flush_sidecars(filepath, tag, tail)
+        save_tail_state(filepath, tag, tail)
+    return tail['state'], consumed
+
+
+def _feed_blocks(f, state, update, block_bytes):
+    """
+    Alimenta update() com as linhas completas lidas de 'f' em blocos. Retorna (bytes consumidos,
+    últimos bytes consumidos) — uma linha parcial no fim fica de fora.
+    """
+    consumed = 0
+    last_bytes = b''
+    pending = b''
+    while True:
+        block = f.read(block_bytes)
+        if not block:
+            break
+        block = pending + block
+        cut = block.rfind(b'\n') + 1
+        pending = block[cut:]
+        if cut == 0:
+            continue
+        update(state, block[:cut - 1].decode('utf-8').split('\n'))
+        last_bytes = (last_bytes + block[:cut])[-TAIL_CHECK_BYTES:]
+        consumed += cut
+    return consumed, last_bytes
+
+
+def follow(poll, interval_s):
+    """
+    Chama poll() a cada interval_s segundos até Ctrl+C (modo de acompanhamento ao vivo).
+    Retorna o resultado da última chamada.
+    """
+    result = poll()
+    try:
+        while True:
+            time.sleep(interval_s)
+            result = poll()
+    except KeyboardInterrupt:
+        print("\n[TAIL] Acompanhamento interrompido.")
+    return result
@@ -1,40 +1,136 @@
+import json
+import os
+import sys
+
+import numpy as np
 import pandas as pd
 
+# Abertura de arquivos comprimidos (gzip/zstd/xz/bzip2) compartilhada com os scripts de log
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'log'))
+from log_open import open_log
+
 # --- CONFIGURAÇÃO ---
 # 1. Coloque os IDs dos veículos que você quer encontrar
 VEHICLE_IDS_TO_FIND = [46, 92, 86, 103, 134, 96, 111, 67, 112, 130]
 
 # 2. Especifique o caminho para o seu arquivo random.txt
-RANDOM_TXT_PATH = 'random.txt' 
+RANDOM_TXT_PATH = 'random.txt'
 # --- FIM DA CONFIGURAÇÃO ---
 
+# random.txt tem uma linha por atributo (av, ec, im, tc, pv, lp, tt, vt) e uma coluna por veículo.
+# Ele é convertido uma vez em uma matriz binária transposta ('<txt>.npy', uma linha por coluna do
+# arquivo, com os atributos contíguos) mais um arquivo de rótulos ('<txt>.labels.json'). As consultas
+# abrem a matriz com memória mapeada e só leem as colunas pedidas.
+MATRIX_VERSION = 1
+
+
+def matrix_paths(txt_path):
+    return f"{txt_path}.npy", f"{txt_path}.labels.json"
+
+
+def _source_fingerprint(txt_path):
+    stat = os.stat(txt_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def convert_random_txt(txt_path=RANDOM_TXT_PATH):
+    """
+    Converte o random.txt para a matriz em memória mapeada + rótulos.
+    A matriz é int64 se todos os valores forem inteiros, senão float64.
+    Lança FileNotFoundError se o arquivo não existir e ValueError se as linhas tiverem tamanhos diferentes.
+    """
+    fingerprint = _source_fingerprint(txt_path)
+    labels = []
+    rows = []
+    with open_log(txt_path) as f:
+        for line in f:
+            parts = line.split()
+            if not parts:
+                continue
+            labels.append(parts[0])
+            rows.append(parts[1:])
+
+    n_columns = len(rows[0]) if rows else 0
+    if any(len(row) != n_columns for row in rows):
+        raise ValueError(f"'{txt_path}': as linhas não têm o mesmo número de colunas")
+    try:
+        values = np.array(rows, dtype=np.int64)
+    except ValueError:
+        values = np.array(rows, dtype=np.float64)
+    values = values.reshape(len(rows), n_columns)
+
+    npy_path, labels_path = matrix_paths(txt_path)
+    matrix = np.lib.format.open_memmap(npy_path + '.tmp', mode='w+', dtype=values.dtype,
+                                       shape=(n_columns, len(rows)))
+    matrix[:] = values.T
+    matrix.flush()
+    del matrix
+    os.replace(npy_path + '.tmp', npy_path)
+
+    meta = {'version': MATRIX_VERSION, 'source': fingerprint, 'labels': labels}
+    with open(labels_path + '.tmp', 'w') as f:
+        json.dump(meta, f)
+    os.replace(labels_path + '.tmp', labels_path)
+    return labels
+
+
+def load_vehicle_matrix(txt_path=RANDOM_TXT_PATH):
+    """
+    Retorna (rótulos, matriz) com a matriz em memória mapeada (colunas do arquivo x atributos).
+    A conversão é refeita automaticamente se o random.txt mudou.
+    """
+    npy_path, labels_path = matrix_paths(txt_path)
+    fingerprint = _source_fingerprint(txt_path)
+    meta = None
+    if os.path.exists(npy_path) and os.path.exists(labels_path):
+        with open(labels_path, 'r') as f:
+            meta = json.load(f)
+        if meta.get('version') != MATRIX_VERSION or meta.get('source') != fingerprint:
+            meta = None
+    if meta is None:
+        convert_random_txt(txt_path)
+        with open(labels_path, 'r') as f:
+            meta = json.load(f)
+    return meta['labels'], np.load(npy_path, mmap_mode='r')
+
+
+def get_vehicle_columns(vehicle_ids, txt_path=RANDOM_TXT_PATH):
+    """
+    Lê apenas as colunas dos veículos pedidos.
+    Retorna (DataFrame atributos x 'Vehicle_<id>', IDs encontrados, IDs ausentes).
+    """
+    labels, matrix = load_vehicle_matrix(txt_path)
+    results = pd.DataFrame(index=pd.Index(labels, name=0))
+    found_ids = []
+    missing_ids = []
+    for vehicle_id in vehicle_ids:
+        # O dado para o veículo com ID 'X' está na coluna de índice 'X + 1' (a coluna 0 é o rótulo)
+        column_to_access = vehicle_id + 1
+        if 1 <= column_to_access <= matrix.shape[0]:
+            results[f'Vehicle_{vehicle_id}'] = np.array(matrix[column_to_access - 1])
+            found_ids.append(vehicle_id)
+        else:
+            missing_ids.append(vehicle_id)
+    return results, found_ids, missing_ids
+
+
 def analyze_vehicle_data():
     """
     Lê o arquivo random.txt, extrai os dados para os IDs especificados
     e os imprime em um formato de tabela.
     """
     try:
-        df = pd.read_csv(RANDOM_TXT_PATH, sep=r'\s+', header=None, index_col=0)
+        results, found_ids, missing_ids = get_vehicle_columns(VEHICLE_IDS_TO_FIND, RANDOM_TXT_PATH)
     except FileNotFoundError:
         print(f"ERRO: O arquivo '{RANDOM_TXT_PATH}' não foi encontrado.")
         return
     except Exception as e:
         print(f"Ocorreu um erro ao ler o arquivo: {e}")
         return
-        
-    results = pd.DataFrame(index=df.index)
-    found_ids = []
-    
-    for vehicle_id in VEHICLE_IDS_TO_FIND:
-        # CORREÇÃO: O dado para o veículo com ID 'X' está na coluna de índice 'X + 1'
-        column_to_access = vehicle_id + 1
-        
-        if column_to_access in df.columns:
-            results[f'Vehicle_{vehicle_id}'] = df[column_to_access]
-            found_ids.append(vehicle_id)
-        else:
-            print(f"Aviso: Veículo com ID {vehicle_id} (coluna {column_to_access}) não encontrado no arquivo.")
-            
+
+    for vehicle_id in missing_ids:
+        print(f"Aviso: Veículo com ID {vehicle_id} (coluna {vehicle_id + 1}) não encontrado no arquivo.")
+
     if not found_ids:
         print("\nNenhum dos veículos especificados foi encontrado.")
         return
@@ -44,4 +140,4 @@ def analyze_vehicle_data():
 
 
 if __name__ == "__main__":
-    analyze_vehicle_data()
\ No newline at end of file
+    analyze_vehicle_data()